@@ -1,36 +1,49 @@
 import contextlib
-import csv
+import copy
+import functools
 import hashlib
 import io
 import json
 import os
 import sys
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional
 
 import click
-import jmespath
-import jwt
-import yaml
-from britive import exceptions
-from britive.britive import Britive
-from britive.helpers.utils import parse_tenant
-from colored import Fore, Style
-from jwt.exceptions import PyJWTError
-from tabulate import tabulate
 
 from . import __version__
-from .helpers import cloud_credential_printer as printer
 from .helpers.cache import Cache
 from .helpers.config import ConfigManager
-from .helpers.credentials import EncryptedFileCredentialManager, FileCredentialManager
 from .helpers.split import profile_split
 
 default_table_format = 'fancy_grid'
 debug_enabled = os.getenv('PYBRITIVE_DEBUG')
 default_browser = os.getenv('PYBRITIVE_BROWSER')
+# checkouts running at the same time when checking out many profiles at once
+max_concurrent_checkouts = 8
+# fields which can be set per profile in a checkout manifest
+checkout_manifest_fields = [
+    'alias',
+    'console',
+    'justification',
+    'mode',
+    'profile',
+    'profile_type',
+    'ticket_id',
+    'ticket_type',
+]
+# how long a validated token skips the whoami and feature flag round trips for the invocations that follow
+session_validation_ttl = 60
+# pages of the my-access listing requested ahead of the one being processed
+my_access_page_workers = 4
+# smallest page requested when my_access_retrieval_limit is low, to keep the number of round trips down
+my_access_min_page_size = 100
+# seconds the background banner request may take, the command never waits on it
+banner_request_timeout = 10
 
 
 class BritiveCli:
@@ -45,12 +58,21 @@ class BritiveCli:
     ):
         self.silent = silent
         self.from_helper_console_script = from_helper_console_script
+        self.from_agent = False
         self.output_format = None
         self.tenant_name = None
         self.tenant_alias = None
         self.token = token
         self.b = None
+        self.cache = Cache()
+        self.banner_thread = None
+        self._whoami = None
+        self._cached_session_key = None  # set while the token has only been validated by a recent invocation
+        self._revalidated = False  # the token was validated again after a rejection, done at most once per login
+        self._revalidation_lock = threading.Lock()
         self.available_profiles = None
+        self.available_profiles_complete = False  # listed without a search or profile type narrowing it down
+        self._profile_catalog = None
         self.config = ConfigManager(tenant_name=tenant_name, cli=self)
         self.list_separator = '|'
         self.passphrase = passphrase
@@ -65,10 +87,25 @@ class BritiveCli:
         self.browser = default_browser
         self.resource_profile_prefix = 'resources/'
 
+    @property
+    def profile_catalog(self):
+        if not self._profile_catalog:
+            from .helpers.catalog import ProfileCatalog  # lazy load
+
+            whoami = self.whoami()
+            self._profile_catalog = ProfileCatalog(
+                tenant=self.tenant_name,
+                identity=str(whoami.get('userId') or whoami.get('username')),
+                ttl=self.config.profile_catalog_ttl_seconds(),
+            )
+        return self._profile_catalog
+
     def set_output_format(self, output_format: str):
         self.output_format = self.config.get_output_format(output_format)
 
     def set_credential_manager(self):
+        from .helpers.credentials import EncryptedFileCredentialManager, FileCredentialManager  # lazy load
+
         if self.credential_manager:
             return
         backend = self.config.backend()
@@ -94,6 +131,8 @@ class BritiveCli:
 
     @staticmethod
     def _extract_field_from_jwt(token: str, field: str, verify: bool = False):
+        import jwt  # lazy load
+
         try:
             return jwt.decode(
                 token,
@@ -115,11 +154,25 @@ class BritiveCli:
         if explicit and self.token:
             raise click.ClickException('Interactive login unavailable when an API token is provided.')
 
+        self.b = self._authenticated_client()
+        self._revalidated = False
+        self._update_sdk_user_agent()
+        self.b.session.hooks['response'].append(self._revalidate_on_unauthorized)
+        # if user called `pybritive login` and we should get profiles...do so
+        should_get_profiles = any([self.config.auto_refresh_profile_cache(), self.config.auto_refresh_kube_config()])
+        if explicit and should_get_profiles:
+            self._set_available_profiles()  # will handle calling cache_profiles() and construct_kube_config()
+        self._display_banner()
+
+    def _authenticated_client(self):
+        from britive import exceptions  # lazy load
+        from britive.britive import Britive  # lazy load
+
         # taking a very straightforward approach here...if user provided a token and it doesn't work just exit
         if self.token:  # static token provided or BRITIVE_API_TOKEN set
             try:
-                self.b = Britive(tenant=self.tenant_name, token=self.token, query_features=True)
-                self.b.my_access.whoami()  # this is what may cause UnauthorizedRequest
+                b = Britive(tenant=self.tenant_name, token=self.token, query_features=False)
+                self._validate_token(b, token=self.token)  # this is what may cause UnauthorizedRequest
             except exceptions.UnauthorizedRequest as e:
                 raise click.ClickException('Invalid API token provided.') from e
             except exceptions.generic.BritiveGenericException as e:
@@ -127,60 +180,121 @@ class BritiveCli:
                     pass
                 else:
                     raise e
-        else:  # user is asking for an interactive login or using token stored from an interactive login
-            counter = 1
-            while True:  # will break after we successfully get logged in or 3 attempts have occurred
-                # protect against infinite loop
-                if counter > 3:
-                    raise Exception('could not login after 3 attempts')
-
-                # attempt login and making an api call to ensure the credentials we have are valid
-                try:
-                    self.set_credential_manager()
-                    token = self.credential_manager.get_token()
-                    jti = self._extract_field_from_jwt(token=token, field='jti')
-                    self.debug(f'got token jti of {jti} from credential manager')
-                    self.b = Britive(tenant=self.tenant_name, token=token, query_features=True)
-                    self.b.my_access.whoami()  # this is what may cause UnauthorizedRequest
-                    break
-                except exceptions.UnauthorizedRequest as e:
-                    if '401 - e0000' in str(e).lower():
-                        self.debug(f'attempt {counter} of 3 - login failed')
-                        self.debug(f'login error message was {e!s}')
-
-                        # we know the token is invalid since we got that API response
-                        # so we don't need to actually logout, just clear the token from
-                        # the credentials manager
-                        self._cleanup_credentials()
-                    else:
-                        raise e
-                finally:
-                    counter += 1
+            return b
 
-        self._update_sdk_user_agent()
-        # if user called `pybritive login` and we should get profiles...do so
-        should_get_profiles = any([self.config.auto_refresh_profile_cache(), self.config.auto_refresh_kube_config()])
-        if explicit and should_get_profiles:
-            self._set_available_profiles()  # will handle calling cache_profiles() and construct_kube_config()
-        self._display_banner()
+        # user is asking for an interactive login or using token stored from an interactive login
+        counter = 1
+        while True:  # will return after we successfully get logged in or 3 attempts have occurred
+            # protect against infinite loop
+            if counter > 3:
+                raise Exception('could not login after 3 attempts')
+
+            # attempt login and making an api call to ensure the credentials we have are valid
+            try:
+                self.set_credential_manager()
+                token = self.credential_manager.get_token()
+                jti = self._extract_field_from_jwt(token=token, field='jti')
+                self.debug(f'got token jti of {jti} from credential manager')
+                b = Britive(tenant=self.tenant_name, token=token, query_features=False)
+                self._validate_token(b, token=token, jti=jti)  # this is what may cause UnauthorizedRequest
+                return b
+            except exceptions.UnauthorizedRequest as e:
+                if '401 - e0000' in str(e).lower():
+                    self.debug(f'attempt {counter} of 3 - login failed')
+                    self.debug(f'login error message was {e!s}')
+
+                    # we know the token is invalid since we got that API response
+                    # so we don't need to actually logout, just clear the token from
+                    # the credentials manager
+                    self._cleanup_credentials()
+                else:
+                    raise e
+            finally:
+                counter += 1
+
+    def _session_key(self, token: str, jti: Optional[str] = None) -> str:
+        return hashlib.sha256(f'{self.tenant_name}|{jti or token}'.encode('utf-8')).hexdigest()
+
+    def _validate_token(self, b, token: str, jti: Optional[str] = None):
+        # a token validated by a recent invocation skips the whoami and feature flag round trips
+        key = self._session_key(token=token, jti=jti)
+        if session := self.cache.get_session(key):
+            self.debug('token validated by a recent invocation')
+            b.feature_flags = session['features']
+            self._whoami = session['whoami']
+            self._cached_session_key = key
+            return
+        self._cached_session_key = None
+        b.feature_flags = b.features()
+        self._whoami = b.my_access.whoami()
+        self.cache.save_session(key=key, whoami=self._whoami, features=b.feature_flags, ttl=session_validation_ttl)
+
+    def _revalidate_on_unauthorized(self, response, *args, **kwargs):
+        # the token may have been revoked since a recent invocation validated it, so the first rejected request drops
+        # that validation and validates again properly, on a client of its own so the sdk in use by other threads is
+        # left as is bar its token; requests rejected meanwhile wait for it and each is retried once
+        if response.status_code != 401 or not (self._cached_session_key or self._revalidated):
+            return response
+        with self._revalidation_lock:
+            if not self._revalidated:
+                self._revalidated = True
+                self.debug('token validated by a recent invocation was rejected, validating it again')
+                self.cache.clear_session(self._cached_session_key)
+                self._cached_session_key = None
+                b = self._authenticated_client()
+                self.b.feature_flags = b.feature_flags
+                self.b.session.headers['Authorization'] = b.session.headers['Authorization']
+        request = response.request.copy()
+        request.headers['Authorization'] = self.b.session.headers['Authorization']
+        request.hooks = {'response': [h for h in request.hooks['response'] if h != self._revalidate_on_unauthorized]}
+        return self.b.session.send(request)
+
+    def whoami(self) -> dict:
+        # fetched at most once per invocation, login already does so to validate the token
+        if self._whoami is None:
+            self._whoami = self.b.my_access.whoami()
+        return self._whoami
 
     def _display_banner(self):
         if self.silent:
             return
 
-        if not Cache().banner_expired(tenant=self.tenant_name):  # if banner is not expired yet then nothing to do
+        banner = self.cache.get_banner(tenant=self.tenant_name)
+        if banner.get('pending'):  # fetched by an earlier invocation after it had already printed its output
+            self._print_banner(banner['pending'])
+        if banner.get('expires', 0) >= int(time.time()):  # if banner is not expired yet then nothing to do
             return
 
-        # if we get here then we need to at least grab the banner and see if it has changed
-        if banner := self.b.banner():
-            banner_changed = Cache().save_banner(tenant=self.tenant_name, banner=banner)
-            msg_type = banner.get('messageType', 'UNKNOWN')
-            color = {'caution': Style.BOLD + Fore.red, 'warning': Style.BOLD + Fore.yellow}.get(
-                msg_type.lower(), Style.BOLD + Fore.blue
-            )
-            style_reset = Style.reset
-            if banner_changed:
-                self.print(f'{color}*** {msg_type}: {banner.get("message", "<no message>")} ***{style_reset}')
+        # fetch the banner alongside the actual request, it is displayed before the output if it arrives in time
+        # and by the next invocation otherwise
+        self.banner_thread = threading.Thread(target=self._fetch_banner, daemon=True)
+        self.banner_thread.start()
+
+    def _fetch_banner(self):
+        with contextlib.suppress(Exception):  # never fail or delay the command because of the banner
+            # straight on the shared sdk session (see helpers/concurrency.py) to bound it by a timeout and skip retries
+            response = self.b.session.get(f'{self.b.base_url}/banner', timeout=banner_request_timeout)
+            response.raise_for_status()
+            if banner := response.json():
+                self.cache.save_banner(tenant=self.tenant_name, banner=banner)
+
+    def _display_fetched_banner(self):
+        if not self.banner_thread or self.banner_thread.is_alive():
+            return
+        self.banner_thread = None
+        if pending := self.cache.get_banner(tenant=self.tenant_name).get('pending'):
+            self._print_banner(pending)
+
+    def _print_banner(self, banner: dict):
+        from colored import Fore, Style  # lazy load
+
+        msg_type = banner.get('messageType', 'UNKNOWN')
+        color = {'caution': Style.BOLD + Fore.red, 'warning': Style.BOLD + Fore.yellow}.get(
+            msg_type.lower(), Style.BOLD + Fore.blue
+        )
+        style_reset = Style.reset
+        self.cache.clear_pending_banner(tenant=self.tenant_name)
+        self.print(f'{color}*** {msg_type}: {banner.get("message", "<no message>")} ***{style_reset}')
 
     def _update_sdk_user_agent(self):
         # update the user agent to include the pybritive cli version
@@ -199,6 +313,9 @@ class BritiveCli:
 
     @staticmethod
     def _is_saml_user(token):
+        import jwt  # lazy load
+        from jwt.exceptions import PyJWTError  # lazy load
+
         try:
             username = jwt.decode(
                 token,
@@ -214,6 +331,9 @@ class BritiveCli:
             return False
 
     def logout(self):
+        from britive.britive import Britive  # lazy load
+        from britive.helpers.utils import parse_tenant  # lazy load
+
         # if dealing with a token there is no concept of logout
         if self.token:
             raise click.ClickException('Logout not available when using an API token.')
@@ -237,8 +357,15 @@ class BritiveCli:
                 params['type'] = 'sso'
 
             b.delete(f'https://{parse_tenant(self.tenant_name)}/api/auth', params=params)
+            self.cache.clear_session(
+                self._session_key(token=token, jti=self._extract_field_from_jwt(token=token, field='jti'))
+            )
             self._cleanup_credentials()
 
+        from .helpers.catalog import ProfileCatalog  # lazy load
+
+        ProfileCatalog.clear(tenant=self.tenant_name)
+
     def debug(self, data: object, ignore_silent: bool = False):
         if debug_enabled:
             self.print(data=data, ignore_silent=ignore_silent)
@@ -263,7 +390,11 @@ class BritiveCli:
 
     # will take a list of dicts and print to the screen based on the format specified in the config file
     # dict can only be 1 level deep (no nesting) - caller needs to massage the data accordingly
+    # an iterator of rows is written as rows arrive for the json, ndjson, csv and list formats
     def print(self, data: object, ignore_silent: bool = False):
+        from collections.abc import Iterator  # lazy load
+
+        self._display_fetched_banner()
         if self.silent and not ignore_silent:
             return
 
@@ -271,27 +402,18 @@ class BritiveCli:
             click.echo(data)
             return
 
-        if self.output_format == 'json':
+        streamable = self.output_format in ['json', 'ndjson', 'csv', 'list', 'list-profiles']
+        if streamable and isinstance(data, (list, Iterator)):
+            self._print_rows(data)
+        elif isinstance(data, Iterator):  # formats which need every row up front
+            self.print(list(data), ignore_silent=ignore_silent)
+        elif self.output_format == 'json':
             click.echo(json.dumps(data, indent=2, default=str))
-        elif self.output_format == 'list-profiles':
-            for row in data:
-                click.echo(self.list_separator.join([self.escape_profile_element(x) for x in row.values()]))
-        elif self.output_format == 'list':
-            for row in data:
-                if isinstance(row, dict):
-                    click.echo(self.list_separator.join([json.dumps(x, default=str) for x in row.values()]))
-                elif isinstance(row, list):
-                    click.echo(self.list_separator.join([json.dumps(x, default=str) for x in row]))
-                else:
-                    click.echo(row)
-        elif self.output_format == 'csv':
-            fields = list(data[0])
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=fields, delimiter=',')
-            writer.writeheader()
-            writer.writerows(data)
-            click.echo(output.getvalue())
+        elif self.output_format == 'ndjson':
+            click.echo(json.dumps(data, default=str))
         elif self.output_format.startswith('table'):
+            from tabulate import tabulate  # lazy load
+
             if isinstance(data, dict):
                 data = [data]
             tablefmt = default_table_format
@@ -300,14 +422,57 @@ class BritiveCli:
                 tablefmt = split[1]
             click.echo(tabulate(data, headers='keys', tablefmt=tablefmt))
         elif self.output_format == 'yaml':
-            y = yaml.safe_load(json.dumps(data))
-            click.echo(yaml.safe_dump(y))
+            from .helpers.output import yaml_dump  # lazy load
+
+            click.echo(yaml_dump(data))
+        elif self.output_format == 'csv':
+            self._print_rows([data] if isinstance(data, dict) else data)
+        elif self.output_format in ['list', 'list-profiles']:
+            self._print_rows(data)
         else:
             raise click.ClickException(f'Invalid output format {self.output_format} provided.')
 
+    def _print_rows(self, rows):
+        if self.output_format == 'json':
+            from .helpers.output import json_array_chunks  # lazy load
+
+            for chunk in json_array_chunks(rows):
+                click.echo(chunk, nl=False)
+            click.echo()
+        elif self.output_format == 'ndjson':
+            for row in rows:
+                click.echo(json.dumps(row, default=str))
+        elif self.output_format == 'list-profiles':
+            for row in rows:
+                click.echo(self.list_separator.join([self.escape_profile_element(x) for x in row.values()]))
+        elif self.output_format == 'list':
+            for row in rows:
+                if isinstance(row, dict):
+                    click.echo(self.list_separator.join([json.dumps(x, default=str) for x in row.values()]))
+                elif isinstance(row, list):
+                    click.echo(self.list_separator.join([json.dumps(x, default=str) for x in row]))
+                else:
+                    click.echo(row)
+        elif self.output_format == 'csv':
+            import csv  # lazy load
+
+            output = io.StringIO()
+            writer = None
+            for row in rows:
+                if not writer:
+                    writer = csv.DictWriter(output, fieldnames=list(row), delimiter=',')
+                    writer.writeheader()
+                writer.writerow(row)
+                click.echo(output.getvalue(), nl=False)
+                output.seek(0)
+                output.truncate()
+            if not writer:
+                raise click.ClickException('No rows to output as csv.')
+            click.echo()
+
     def user(self):
         self.login()
-        username = self.b.my_access.whoami()['username']
+        username = self.whoami()['username']
         alias = self.tenant_alias
         output = f'{username} @ {self.tenant_name}'
         if alias != self.tenant_name:
@@ -386,6 +551,8 @@ class BritiveCli:
         profile_type: Optional[str] = None,
         search_text: Optional[str] = None,
     ):
+        from .helpers.concurrency import run_concurrently  # lazy load
+
         self.login()
         self._set_available_profiles(profile_type=profile_type, search_text=search_text)
         data = []
@@ -394,9 +561,11 @@ class BritiveCli:
             now = datetime.utcnow()
             my_access = not profile_type or profile_type == 'my-access'
             my_resources = not profile_type or profile_type == 'my-resources'
-            list_checked_out = (self.b.my_access.list_checked_out_profiles() if my_access else []) + (
-                self.b.my_resources.list_checked_out_profiles() if my_resources else []
+            access_checked_out, resources_checked_out = run_concurrently(
+                my_access and self.b.my_access.list_checked_out_profiles,
+                my_resources and self.b.my_resources.list_checked_out_profiles,
             )
+            list_checked_out = (access_checked_out or []) + (resources_checked_out or [])
             for p in list_checked_out:
                 expiration_str = p.get('expiration', p.get('expirationDuration'))
                 expiration_timestamp = datetime.fromisoformat(expiration_str.replace('Z', ''))
@@ -437,7 +606,7 @@ class BritiveCli:
                     row.pop('Expiration', None)
                     if profile['2_part_profile_format_allowed']:
                         row.pop('Environment', None)
-                elif self.output_format == 'json':
+                elif self.output_format in ['json', 'ndjson']:
                     row['Name'] = f'{row["Application"]}/{row["Environment"]}/{row["Profile"]}'
 
                 data.append(row)
@@ -497,15 +666,28 @@ class BritiveCli:
         search_text: Optional[str] = None,
     ):
         if not self.available_profiles:
+            from .helpers.concurrency import run_concurrently  # lazy load
+
             data = []
+            access_limit = int(self.config.my_access_retrieval_limit)
+            resource_limit = int(self.config.my_resources_retrieval_limit)
+            list_my_access = list_my_resources = None
             if not profile_type or profile_type == 'my-access':
+                list_my_access = (
+                    functools.partial(self._list_my_access, search_text=search_text, access_limit=access_limit)
+                    if access_limit
+                    else functools.partial(self.b.my_access.list, search_text=search_text)
+                )
+            if self.b.feature_flags.get('server-access') and (not profile_type or profile_type == 'my-resources'):
+                list_my_resources = functools.partial(
+                    self.b.my_resources.list, search_text=search_text, size=resource_limit
+                )
+
+            # both listings are independent round trips so request them at the same time
+            access_data, resources = run_concurrently(list_my_access, list_my_resources)
+
+            if list_my_access:
                 self.listed_profiles = None
-                access_limit = int(self.config.my_access_retrieval_limit)
-                increase = 0
-                while (access_data := self.b.my_access.list(search_text=search_text, size=access_limit + increase))[
-                    'count'
-                ] > len(access_data['accesses']) and len({a['papId'] for a in access_data['accesses']}) < access_limit:
-                    increase += max(25, round(access_data['count'] * 0.25))
                 apps = {a['appContainerId']: a for a in access_data.get('apps', [])}
                 envs = {e['environmentId']: e for e in access_data.get('environments', [])}
                 profiles = {p['papId']: p for p in access_data.get('profiles', [])}
@@ -513,7 +695,11 @@ class BritiveCli:
                     ([a['appContainerId'], a['environmentId'], a['papId']]) for a in access_data.get('accesses', [])
                 ]
                 access_output = []
+                seen = set()  # the same profile can be listed more than once, keep the first occurrence
                 for app_id, env_id, profile_id in accesses:
+                    if (app_id, env_id, profile_id) in seen:
+                        continue
+                    seen.add((app_id, env_id, profile_id))
                     app = apps[app_id]
                     env = envs[env_id]
                     profile = profiles[profile_id]
@@ -535,15 +721,14 @@ class BritiveCli:
                         'profile_name': profile['papName'],
                         'session_attributes': profile['sessionAttributes'],
                     }
-                    if row not in access_output:
-                        access_output.append(row)
+                    access_output.append(row)
                 data += access_output[:access_limit] if access_limit else access_output
-            if self.b.feature_flags.get('server-access') and (not profile_type or profile_type == 'my-resources'):
-                resource_limit = int(self.config.my_resources_retrieval_limit)
-                profiles = self.b.my_resources.list(search_text=search_text, size=resource_limit)
+                if not search_text and not access_limit:  # a truncated listing would drop profiles from the catalog
+                    self.profile_catalog.save(access_output)
+            if list_my_resources:
                 if resource_limit:
-                    profiles = profiles['data']
-                for item in profiles:
+                    resources = resources['data']
+                for item in resources:
                     row = {
                         '2_part_profile_format_allowed': False,
                         'app_description': None,
@@ -563,11 +748,64 @@ class BritiveCli:
                     }
                     data.append(row)
             self.available_profiles = data
+            self.available_profiles_complete = (
+                not search_text
+                and not (list_my_access and access_limit)
+                and (not profile_type or bool(list_my_access) and not self.b.feature_flags.get('server-access'))
+            )
             if not from_cache_command and self.config.auto_refresh_profile_cache():
                 self.cache_profiles()
             if not from_cache_command and self.config.auto_refresh_kube_config():
                 self.construct_kube_config()
 
+    def _my_access_pages(self, search_text: Optional[str], page_size: int):
+        """Yield disjoint pages of the my-access listing in order, requesting the next few pages in parallel."""
+        from collections import deque  # lazy load
+        from concurrent.futures import ThreadPoolExecutor  # lazy load
+
+        url = f'{self.b.base_url}/access'
+        params = {'type': 'sdk', 'size': page_size}
+        if search_text:
+            params['search'] = search_text
+
+        first = self.b.get(url, params={**params, 'page': 0})
+        yield first
+        pages = -(-first['count'] // page_size)
+        if pages <= 1:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=my_access_page_workers)
+        try:
+            requested = deque()
+            next_page = 1
+            while next_page < pages or requested:
+                while next_page < pages and len(requested) < my_access_page_workers:
+                    requested.append(executor.submit(self.b.get, url, params={**params, 'page': next_page}))
+                    next_page += 1
+                yield requested.popleft().result()
+        finally:  # the caller may stop early, do not wait on pages it no longer needs
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _list_my_access(self, search_text: Optional[str], access_limit: int) -> dict:
+        # collect pages until enough distinct profiles are found or the listing is exhausted
+        access_data = {'count': 0, 'accesses': [], 'apps': [], 'environments': [], 'profiles': []}
+        profile_ids = set()
+        page_size = max(access_limit, my_access_min_page_size)
+        with contextlib.closing(self._my_access_pages(search_text=search_text, page_size=page_size)) as pages:
+            for number, page in enumerate(pages):
+                # the sdk does not page this listing, should the page parameter ever be ignored every page is the
+                # first one, so list everything through the sdk instead of returning duplicates
+                if number and page.get('accesses') and page['accesses'] == access_data['accesses'][:page_size]:
+                    self.debug('my-access listing did not honour the page parameter, listing every profile')
+                    return self.b.my_access.list(search_text=search_text)
+                access_data['count'] = page['count']
+                for key in ['accesses', 'apps', 'environments', 'profiles']:
+                    access_data[key] += page.get(key, [])
+                profile_ids.update(a['papId'] for a in page.get('accesses', []))
+                if len(profile_ids) >= access_limit or not page.get('accesses'):
+                    break
+        return access_data
+
     def construct_kube_config(self, from_cache_command=False):
         if self.from_helper_console_script:
             return
@@ -597,13 +835,13 @@ class BritiveCli:
         try:
             from .helpers.kube_config_builder import build_kube_config  # lazy import as not everyone will want this
 
-            build_kube_config(
-                profiles=profiles, config=self.config, username=self.b.my_access.whoami()['username'], cli=self
-            )
+            build_kube_config(profiles=profiles, config=self.config, cli=self)
         except Exception as e:  # do NOT fail the CLI invocation because of this
             self.print(f'error auto-generating the Britive managed kube config file: {e!s}')
 
     def _get_app_type(self, application_id):
+        if app_type := self.profile_catalog.app_type(application_id):
+            return app_type
         self._set_available_profiles()
         for profile in self.available_profiles:
             if profile['app_id'] == application_id:
@@ -630,6 +868,8 @@ class BritiveCli:
         gcloud_key_file,
         k8s_processor,
     ):
+        from .helpers import cloud_credential_printer as printer  # lazy load
+
         if app_type in ['AWS', 'AWS Standalone']:
             return printer.AwsCloudCredentialPrinter(
                 console=console,
@@ -727,6 +967,130 @@ class BritiveCli:
         else:
             self._access_checkin(profile=profile, console=console)
 
+    def _checked_out_targets(self, profiles: list, all_checked_out: bool, console: bool, profile_type: Optional[str]):
+        """Match the profiles to check in against the checked out profiles, fetched once for both profile types.
+
+        Returns the checkin targets and a dict of the profiles which could not be matched to their error.
+        """
+        from .helpers.concurrency import run_concurrently  # lazy load
+
+        my_access = not profile_type or profile_type == 'my-access'
+        my_resources = self.b.feature_flags.get('server-access') and (
+            not profile_type or profile_type == 'my-resources'
+        )
+        access_checked_out, resources_checked_out, _ = run_concurrently(
+            my_access and self.b.my_access.list_checked_out_profiles,
+            my_resources and self.b.my_resources.list_checked_out_profiles,
+            functools.partial(self._set_available_profiles, profile_type=profile_type),  # names and application types
+        )
+        available = {(p['profile_id'], p['env_id']): p for p in self.available_profiles}
+
+        targets = []
+        for c in access_checked_out or []:
+            row = available.get((c['papId'], c['environmentId']))
+            targets.append(
+                {
+                    'profile': f'{row["app_name"]}/{row["env_name"]}/{row["profile_name"]}'
+                    if row
+                    else c['transactionId'],
+                    'app_type': (row or {}).get('app_type') if c['accessType'] == 'PROGRAMMATIC' else None,
+                    'resource': False,
+                    'transaction_id': c['transactionId'],
+                    'match': (c['papId'], c['environmentId'], c['accessType']),
+                }
+            )
+        for c in resources_checked_out or []:
+            targets.append(
+                {
+                    'profile': f'{self.resource_profile_prefix}{c["resourceName"]}/{c["profileName"]}',
+                    'app_type': 'Resources',
+                    'resource': True,
+                    'transaction_id': c['transactionId'],
+                    'match': (c['resourceName'].lower(), c['profileName'].lower()),
+                }
+            )
+        if all_checked_out:
+            return targets, {}
+
+        selected = []
+        errors = {}
+        access_type = 'CONSOLE' if console else 'PROGRAMMATIC'
+        for profile in profiles:
+            try:
+                if self._profile_is_for_resource(profile=profile, profile_type=profile_type):
+                    resource_name, profile_name = self._split_resource_profile_into_parts(profile=profile)
+                    match = (resource_name, profile_name[0])
+                else:
+                    parts = self._split_profile_into_parts(profile)
+                    ids = self._convert_names_to_ids(
+                        profile_name=parts['profile'], environment_name=parts['env'], application_name=parts['app']
+                    )
+                    match = (ids['profile_id'], ids['environment_id'], access_type)
+                target = next(iter(t for t in targets if t['match'] == match), None)
+                if not target:
+                    raise ValueError('no checked out profile found for the given profile')
+                selected.append({**target, 'profile': profile})
+            except Exception as e:
+                errors[profile] = e
+        return selected, errors
+
+    def checkin_many(
+        self,
+        profiles: list,
+        all_checked_out: bool,
+        console: bool,
+        profile_type: Optional[str] = None,
+        workers: int = max_concurrent_checkouts,
+    ):
+        """Check in the given profiles, or every checked out profile, concurrently.
+
+        A failed checkin does not stop the others. Cached credentials and gcloud key files are cleaned up once all
+        checkins are done.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed  # lazy load
+
+        self.login()
+        targets, errors = self._checked_out_targets(
+            profiles=profiles, all_checked_out=all_checked_out, console=console, profile_type=profile_type
+        )
+        total = len(targets) + len(errors)
+        progress = self._profile_progress_printer()
+
+        def checkin(target: dict):
+            if target['resource']:
+                return self.b.my_resources.checkin(transaction_id=target['transaction_id'])
+            return self.b.my_access.checkin(transaction_id=target['transaction_id'])
+
+        checked_in = []
+        if targets:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets)))) as executor:
+                futures = {executor.submit(checkin, target): target for target in targets}
+                for future in as_completed(futures):
+                    target = futures[future]
+                    try:
+                        future.result()
+                        checked_in.append(target)
+                        progress(target['profile'], 'checked in')
+                    except Exception as e:
+                        errors[target['profile']] = e
+
+        # local clean up is done here, one profile after the other, rather than from the checkin threads
+        aliases = self.config.profile_aliases
+        for target in checked_in:
+            app_type = (target['app_type'] or '').lower()
+            names = [target['profile']] + [a for a, p in aliases.items() if p.lower() == target['profile'].lower()]
+            for name in names:
+                if app_type in ['aws', 'aws standalone']:
+                    self.clear_cached_aws_credentials(name)
+                if app_type in ['gcp']:
+                    self.clear_gcloud_auth_key_files(profile=name)
+
+        for profile, error in errors.items():
+            message = error.format_message() if isinstance(error, click.ClickException) else error
+            click.echo(f'{profile}: failed - {message}', err=True)
+        if errors:
+            raise click.ClickException(f'{len(errors)} of {total} profiles could not be checked in.')
+
     def _checkout(
         self,
         app_name,
@@ -740,27 +1104,49 @@ class BritiveCli:
         ticket_id,
         ticket_type,
         mode=None,
+        batch: Optional[dict] = None,
     ):
+        from britive import exceptions  # lazy load
+
+        batch = batch or {}
+        convert_names_to_ids = batch.get('convert_names_to_ids', self._convert_names_to_ids)
         try:
-            self.login()
+            if not batch:
+                self.login()
+
+            def checkout(ids):
+                return self.b.my_access.checkout(
+                    environment_id=ids['environment_id'],
+                    include_credentials=True,
+                    justification=justification,
+                    max_wait_time=maxpolltime,
+                    otp=otp,
+                    profile_id=ids['profile_id'],
+                    programmatic=programmatic,
+                    # callback will handle silent, isatty, etc.
+                    progress_func=batch.get('progress_func') or self.checkout_callback_printer,
+                    ticket_id=ticket_id,
+                    ticket_type=ticket_type,
+                    wait_time=blocktime,
+                )
 
-            ids = self._convert_names_to_ids(
+            ids = batch.get('ids') or convert_names_to_ids(
                 profile_name=profile_name, environment_name=env_name, application_name=app_name
             )
 
-            return self.b.my_access.checkout(
-                environment_id=ids['environment_id'],
-                include_credentials=True,
-                justification=justification,
-                max_wait_time=maxpolltime,
-                otp=otp,
-                profile_id=ids['profile_id'],
-                programmatic=programmatic,
-                progress_func=self.checkout_callback_printer,  # callback will handle silent, isatty, etc.
-                ticket_id=ticket_id,
-                ticket_type=ticket_type,
-                wait_time=blocktime,
-            )
+            try:
+                return checkout(ids)
+            except (exceptions.ForbiddenRequest, exceptions.NotFound, exceptions.ProfileNotFound):
+                if not ids.get('from_catalog'):
+                    raise
+                # the entitlement may have changed since the catalog was saved so resolve the ids again from a
+                # fresh listing and try once more
+                self.profile_catalog.invalidate()
+                return checkout(
+                    convert_names_to_ids(
+                        profile_name=profile_name, environment_name=env_name, application_name=app_name
+                    )
+                )
         except exceptions.ApprovalRequiredButNoJustificationProvided as e:
             if mode == 'awscredentialprocess':
                 raise e
@@ -787,14 +1173,15 @@ class BritiveCli:
                         ticket_id,
                         ticket_type,
                         mode,
+                        batch,
                     ),
                     'console-fallback': True,
                 }
             raise e
 
     @staticmethod
-    def _should_check_force_renew(app, force_renew, console):
-        return app in ['AWS', 'AWS Standalone'] and force_renew and not console
+    def _should_check_force_renew(app, force_renew, console, mode=None):
+        return (app in ['AWS', 'AWS Standalone'] or mode == 'kube-exec') and force_renew and not console
 
     def _split_profile_into_parts(self, profile):
         profile_real = self.config.profile_aliases.get(profile.lower(), profile)
@@ -833,16 +1220,23 @@ class BritiveCli:
         real_profile_name = self.config.profile_aliases.get(profile.lower(), profile).lower()
         return real_profile_name.startswith(self.resource_profile_prefix)
 
-    def _resource_checkout(self, blocktime, justification, maxpolltime, profile, ticket_id, ticket_type):
+    def _resource_checkout(
+        self, blocktime, justification, maxpolltime, profile, ticket_id, ticket_type, batch: Optional[dict] = None
+    ):
+        from britive import exceptions  # lazy load
+
+        batch = batch or {}
         try:
-            self.login()
+            if not batch:
+                self.login()
             resource_name, profile_name = self._split_resource_profile_into_parts(profile=profile)
             return self.b.my_resources.checkout_by_name(
                 include_credentials=True,
                 justification=justification,
                 max_wait_time=maxpolltime,
                 profile_name=profile_name[0],
-                progress_func=self.checkout_callback_printer,  # callback will handle silent, isatty, etc.
+                # callback will handle silent, isatty, etc.
+                progress_func=batch.get('progress_func') or self.checkout_callback_printer,
                 resource_name=resource_name,
                 response_template=profile_name[1] if len(profile_name) > 1 else None,
                 ticket_id=ticket_id,
@@ -854,6 +1248,28 @@ class BritiveCli:
         except exceptions.StepUpAuthRequiredButNotProvided as e:
             raise click.ClickException('Step Up Authentication required and no OTP provided.') from e
 
+    def _refresh_cached_credentials_if_due(self, alias, credentials, mode, passphrase, profile):
+        import jmespath  # lazy load
+
+        from .helpers.credential_refresh import refresh_args, refresh_if_due  # lazy load
+
+        args = {
+            # kube-exec picks the profile up from the inherited environment
+            'profile': alias or profile if mode == 'awscredentialprocess' else None,
+            'tenant': self.config.tenant_name,
+            'federation_provider': self.federation_provider,
+        }
+        refresh_if_due(
+            mode=mode,
+            expiration_time=jmespath.search(
+                expression=self.cachable_modes[mode]['expiration_jmespath'], data=credentials
+            ),
+            args=refresh_args(args),
+            passphrase=passphrase,
+            token=self.token,
+            window=self.config.credential_refresh_ahead_seconds(mode=mode),
+        )
+
     def _access_checkout(
         self,
         alias,
@@ -870,7 +1286,11 @@ class BritiveCli:
         ticket_id,
         ticket_type,
         verbose,
+        renew: bool = False,
+        batch: Optional[dict] = None,
     ):
+        import jmespath  # lazy load
+
         # handle this special use case and quit
         if extend:
             self._extend_checkout(profile, console)
@@ -886,7 +1306,8 @@ class BritiveCli:
         # handle kube-exec since the profile is actually going to be passed in via another method
         # and perform some basic validation so we don't waste time performing a checkout when we
         # will not be able to return a response back to kubectl via the exec command
-        if mode == 'kube-exec':
+        # (the agent is handed the profile by a client which has already done this)
+        if mode == 'kube-exec' and not self.from_agent:
             from .helpers.k8s_exec_credential_builder import KubernetesExecCredentialProcessor
 
             k8s_processor = KubernetesExecCredentialProcessor()
@@ -902,12 +1323,22 @@ class BritiveCli:
 
         self._validate_justification(justification)
 
+        if renew:
+            # renewing ahead of expiration extends the checkout and fetches its credentials again, as checking the
+            # profile in would revoke the credentials already handed out while they are still valid
+            from britive.exceptions import TransactionNotFound  # lazy load
+
+            with contextlib.suppress(TransactionNotFound):  # no longer checked out so a new checkout follows
+                self._extend_checkout(profile, console)
+
         if mode in self.cachable_modes:
             self.silent = True  # CANNOT output anything other than the expected JSON
             # we need to check the cache for the credentials first and then check to see if they are expired
             # if not simply return those credentials, if they are expired, continue to do an actual checkout
             app_type = self.cachable_modes[mode]['app_type']
-            credentials = Cache(passphrase=passphrase).get_credentials(profile_name=alias or profile, mode=mode)
+            credentials = None
+            if not renew:
+                credentials = Cache(passphrase=passphrase).get_credentials(profile_name=alias or profile, mode=mode)
             if credentials:
                 expiration_timestamp_str = jmespath.search(
                     expression=self.cachable_modes[mode]['expiration_jmespath'], data=credentials
@@ -936,41 +1367,49 @@ class BritiveCli:
             'ticket_type': ticket_type,
         }
 
+        get_app_type = (batch or {}).get('get_app_type', self._get_app_type)
+        checkin = (batch or {}).get('checkin', self.checkin)
         if not cached_credentials_found:  # nothing found in cache, cache is expired, or not a cachable mode
-            response = self._checkout(**params)
-            app_type = self._get_app_type(response['appContainerId'])
+            response = self._checkout(**params, batch=batch)
+            app_type = get_app_type(response['appContainerId'])
             credentials = response['credentials']
             console_fallback = response.get('console-fallback')
 
         # this handles the --force-renew flag
         # lets check to see if we should checkin this profile first and check it out again
-        if self._should_check_force_renew(app_type, force_renew, console):
+        if self._should_check_force_renew(app_type, force_renew, console, mode):
             expiration = datetime.fromisoformat(credentials['expirationTime'].replace('Z', ''))
             now = datetime.utcnow()
             diff = (expiration - now).total_seconds() / 60.0
             if diff < force_renew:  # time to checkin the profile so we can refresh creds
                 self.print('checking in the profile to get renewed credentials....standby')
-                self.checkin(profile=profile, console=console)
-                response = self._checkout(**params)
+                checkin(profile=profile, console=console)
+                response = self._checkout(**params, batch=batch)
                 cached_credentials_found = False  # need to write new creds to cache
                 credentials = response['credentials']
                 console_fallback = response.get('console-fallback')
 
         if mode in self.cachable_modes and not cached_credentials_found:
             Cache(passphrase=passphrase).save_credentials(
-                profile_name=alias or profile, credentials=credentials, mode=mode
+                profile_name=alias or profile,
+                credentials=credentials,
+                mode=mode,
+                refresh_ahead_seconds=self.config.credential_refresh_ahead_seconds(mode=mode),
+            )
+        elif mode in self.cachable_modes and not force_renew and not self.from_agent:  # the agent refreshes itself
+            # hand back the still valid credentials and renew them in the background if they expire soon
+            self._refresh_cached_credentials_if_due(
+                alias=alias, credentials=credentials, mode=mode, passphrase=passphrase, profile=profile
             )
         return app_type, console_fallback, credentials, k8s_processor
 
-    def checkout(
+    def _checkout_profile(
         self,
         alias,
-        aws_credentials_file,
         blocktime,
         console,
         extend,
         force_renew,
-        gcloud_key_file,
         justification,
         maxpolltime,
         mode,
@@ -981,11 +1420,13 @@ class BritiveCli:
         ticket_id: Optional[str] = None,
         ticket_type: Optional[str] = None,
         profile_type: str = 'my-access',
+        renew: bool = False,
+        batch: Optional[dict] = None,
     ):
+        # a batch of concurrent checkouts has logged in already and hands each checkout the `ids` it resolved up front,
+        # its own `progress_func`, and the lookups (`convert_names_to_ids`, `get_app_type`, `checkin`) to make on the
+        # batch's cli one at a time so the profiles are never listed by more than one thread
         if self._profile_is_for_resource(profile=profile, profile_type=profile_type):
-            app_type = 'Resources'
-            k8s_processor = None
-            console_fallback = False
             credentials = self._resource_checkout(
                 blocktime=blocktime,
                 justification=justification,
@@ -993,24 +1434,67 @@ class BritiveCli:
                 profile=profile,
                 ticket_id=ticket_id,
                 ticket_type=ticket_type,
+                batch=batch,
             )
-        else:
-            app_type, console_fallback, credentials, k8s_processor = self._access_checkout(
-                alias=alias,
-                blocktime=blocktime,
-                console=console,
-                extend=extend,
-                force_renew=force_renew,
-                justification=justification,
-                maxpolltime=maxpolltime,
-                mode=mode,
-                otp=otp,
-                passphrase=passphrase,
-                profile=profile,
-                ticket_id=ticket_id,
-                ticket_type=ticket_type,
-                verbose=verbose,
-            )
+            return 'Resources', False, credentials, None
+        return self._access_checkout(
+            alias=alias,
+            blocktime=blocktime,
+            console=console,
+            extend=extend,
+            force_renew=force_renew,
+            justification=justification,
+            maxpolltime=maxpolltime,
+            mode=mode,
+            otp=otp,
+            passphrase=passphrase,
+            profile=profile,
+            ticket_id=ticket_id,
+            ticket_type=ticket_type,
+            verbose=verbose,
+            renew=renew,
+            batch=batch,
+        )
+
+    def checkout(
+        self,
+        alias,
+        aws_credentials_file,
+        blocktime,
+        console,
+        extend,
+        force_renew,
+        gcloud_key_file,
+        justification,
+        maxpolltime,
+        mode,
+        otp,
+        passphrase,
+        profile,
+        verbose,
+        ticket_id: Optional[str] = None,
+        ticket_type: Optional[str] = None,
+        profile_type: str = 'my-access',
+        renew: bool = False,
+    ):
+        app_type, console_fallback, credentials, k8s_processor = self._checkout_profile(
+            alias=alias,
+            blocktime=blocktime,
+            console=console,
+            extend=extend,
+            force_renew=force_renew,
+            justification=justification,
+            maxpolltime=maxpolltime,
+            mode=mode,
+            otp=otp,
+            passphrase=passphrase,
+            profile=profile,
+            verbose=verbose,
+            ticket_id=ticket_id,
+            ticket_type=ticket_type,
+            profile_type=profile_type,
+            renew=renew,
+        )
 
         # do this down here, so we know that the profile is valid and a checkout was successful
         self._save_alias(alias=alias, profile=profile)
@@ -1027,6 +1511,188 @@ class BritiveCli:
             k8s_processor,
         ).print()
 
+    def _locked_lookups(self) -> dict:
+        """Return the lookups concurrent checkouts make on this instance, made one at a time.
+
+        Handed to `_checkout_profile` as part of a batch, so the profiles are never listed by more than one thread.
+        """
+        lookup_lock = threading.Lock()
+
+        def locked_lookup(method):
+            def lookup(*args, **kwargs):
+                with lookup_lock:
+                    return method(*args, **kwargs)
+
+            return lookup
+
+        return {
+            'convert_names_to_ids': locked_lookup(self._convert_names_to_ids),
+            'get_app_type': locked_lookup(self._get_app_type),
+            'checkin': locked_lookup(self.checkin),
+        }
+
+    def _profile_progress_printer(self):
+        """Return a thread safe callable writing `profile: message` lines to stderr, skipping repeated messages."""
+        lock = threading.Lock()
+        last_messages = {}
+
+        def progress(profile: str, message: str):
+            if self.silent or message == 'complete' or last_messages.get(profile) == message:
+                return
+            with lock:
+                last_messages[profile] = message
+                click.echo(f'{profile}: {message}', err=True)
+
+        return progress
+
+    @staticmethod
+    def _load_checkout_manifest(manifest: Optional[str]) -> list:
+        if not manifest:
+            return []
+
+        import yaml  # lazy load - json manifests are valid yaml too
+
+        from .choices.mode import mode_choices  # lazy load
+
+        try:
+            content = yaml.safe_load(Path(manifest).expanduser().read_text(encoding='utf-8'))
+        except (OSError, yaml.YAMLError) as e:
+            raise click.ClickException(f'unable to read checkout manifest {manifest}: {e!s}') from e
+        if isinstance(content, dict):
+            content = content.get('profiles')
+        if not isinstance(content, list):
+            raise click.ClickException(f'checkout manifest {manifest} must contain a list of profiles.')
+
+        entries = []
+        for item in content:
+            entry = {'profile': item} if isinstance(item, str) else item
+            if not isinstance(entry, dict) or not entry.get('profile'):
+                raise click.ClickException(f'checkout manifest entry {item} is missing the profile.')
+            if unknown := set(entry) - set(checkout_manifest_fields):
+                raise click.ClickException(
+                    f'checkout manifest entry for {entry["profile"]} has unknown fields {", ".join(sorted(unknown))}.'
+                )
+            if entry.get('mode') and entry['mode'] not in mode_choices.choices:
+                raise click.ClickException(f'checkout manifest entry for {entry["profile"]} has invalid mode.')
+            entries.append(entry)
+        return entries
+
+    def checkout_many(
+        self,
+        profiles: list,
+        manifest: Optional[str],
+        aws_credentials_file,
+        blocktime,
+        console,
+        force_renew,
+        gcloud_key_file,
+        justification,
+        maxpolltime,
+        mode,
+        otp,
+        passphrase,
+        verbose,
+        ticket_id: Optional[str] = None,
+        ticket_type: Optional[str] = None,
+        profile_type: str = 'my-access',
+        workers: int = max_concurrent_checkouts,
+    ):
+        """Check out every profile given on the command line and in the manifest concurrently.
+
+        Command line options are the defaults for each manifest entry. Credentials are printed in the order the
+        profiles were given once all checkouts are done, and a failed checkout does not stop the others.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed  # lazy load
+
+        defaults = {
+            'console': console,
+            'justification': justification,
+            'mode': mode,
+            'profile_type': profile_type,
+            'ticket_id': ticket_id,
+            'ticket_type': ticket_type,
+        }
+        entries = [{**defaults, 'alias': None, **entry} for entry in self._load_checkout_manifest(manifest)]
+        entries = [{**defaults, 'alias': None, 'profile': p} for p in profiles] + entries
+        if any(e['mode'] == 'kube-exec' for e in entries):
+            raise click.ClickException('mode kube-exec can only be used when checking out a single profile.')
+        if otp and len(entries) > 1:  # a one time password is accepted by a single checkout
+            raise click.ClickException('--otp can only be used when checking out a single profile.')
+
+        self.login()
+
+        # resolve every profile up front so all checkouts share a single catalog lookup or profile listing
+        resolved = {}
+        errors = {}
+        for i, entry in enumerate(entries):
+            if self._profile_is_for_resource(profile=entry['profile'], profile_type=entry['profile_type']):
+                continue
+            try:
+                parts = self._split_profile_into_parts(entry['profile'])
+                resolved[i] = self._convert_names_to_ids(
+                    profile_name=parts['profile'], environment_name=parts['env'], application_name=parts['app']
+                )
+            except Exception as e:
+                errors[i] = e
+
+        progress = self._profile_progress_printer()
+        lookups = self._locked_lookups()
+
+        def checkout(i: int, entry: dict):
+            # each checkout mutates cli state (silent, browser, ...) so works on its own shallow copy which shares
+            # the authenticated sdk client, config, cache and profile catalog
+            worker = copy.copy(self)
+            return worker, worker._checkout_profile(
+                **{k: entry[k] for k in checkout_manifest_fields},
+                blocktime=blocktime,
+                extend=False,
+                force_renew=force_renew,
+                maxpolltime=maxpolltime,
+                otp=otp,
+                passphrase=passphrase,
+                verbose=verbose,
+                batch={
+                    **lookups,
+                    'ids': resolved.get(i),
+                    'progress_func': functools.partial(progress, entry['alias'] or entry['profile']),
+                },
+            )
+
+        results = {}
+        pending = [i for i in range(len(entries)) if i not in errors]
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+                futures = {executor.submit(checkout, i, entries[i]): i for i in pending}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                        progress(entries[i]['alias'] or entries[i]['profile'], 'checked out')
+                    except Exception as e:
+                        errors[i] = e
+
+        for i, entry in enumerate(entries):
+            if i in errors:
+                message = errors[i].format_message() if isinstance(errors[i], click.ClickException) else errors[i]
+                click.echo(f'{entry["alias"] or entry["profile"]}: failed - {message}', err=True)
+                continue
+            worker, (app_type, console_fallback, credentials, k8s_processor) = results[i]
+            worker._save_alias(alias=entry['alias'], profile=entry['profile'])
+            worker.__get_cloud_credential_printer(
+                app_type,
+                entry['console'] or console_fallback,
+                entry['mode'],
+                entry['alias'] or entry['profile'],
+                worker.silent,
+                credentials,
+                aws_credentials_file,
+                gcloud_key_file,
+                k8s_processor,
+            ).print()
+
+        if errors:
+            raise click.ClickException(f'{len(errors)} of {len(entries)} profiles could not be checked out.')
+
     def configure_tenant(self, tenant, alias, output_format):
         self.config.save_tenant(tenant=tenant, alias=alias, output_format=output_format)
 
@@ -1034,6 +1700,8 @@ class BritiveCli:
         self.config.save_global(default_tenant_name=default_tenant_name, output_format=output_format, backend=backend)
 
     def viewsecret(self, path, blocktime, justification, otp, maxpolltime):
+        from britive import exceptions  # lazy load
+
         self._validate_justification(justification)
         self.login()
 
@@ -1064,6 +1732,8 @@ class BritiveCli:
         self.print(value, ignore_silent=True)
 
     def downloadsecret(self, path, blocktime, justification, otp, maxpolltime, file):
+        from britive import exceptions  # lazy load
+
         self._validate_justification(justification)
         self.login()
 
@@ -1115,7 +1785,11 @@ class BritiveCli:
 
             profile += self.escape_profile_element(p['profile_name'])
             profiles.append(profile)
-        Cache().save_profiles(profiles)
+        self.cache.save_profiles(profiles)
+        if self.tenant_name and self.available_profiles_complete:  # a partial listing would prune profiles
+            from .helpers.completion_index import ProfileCompletionIndex  # lazy load
+
+            ProfileCompletionIndex(self.tenant_name).save(profiles)
 
     @staticmethod
     def escape_profile_element(element):
@@ -1132,6 +1806,31 @@ class BritiveCli:
     def clear_kubeconfig():
         Cache().clear_kubeconfig()
 
+    def agent_start(self):
+        from .helpers.agent import CredentialAgent, socket_path  # lazy load
+
+        self.login()
+        self._set_available_profiles()  # hold the profile catalog in memory for the lifetime of the agent
+        self.from_agent = True
+        self.print(f'agent listening on {socket_path()}')
+        try:
+            CredentialAgent(cli=self, passphrase=self.passphrase).serve_forever()
+        except RuntimeError as e:
+            raise click.ClickException(str(e)) from e
+
+    def agent_stop(self):
+        from .helpers.agent import request  # lazy load
+
+        if not request({'op': 'stop'}, timeout=5):
+            raise click.ClickException('no agent is running.')
+        self.print('agent stopped')
+
+    def agent_status(self):
+        from .helpers.agent import request, socket_path  # lazy load
+
+        status = request({'op': 'ping'}, timeout=5)
+        self.print({'running': bool(status), 'socket': socket_path(), **(status or {})})
+
     def configure_update(self, section, field, value):
         self.config.update(section=section, field=field, value=value)
 
@@ -1206,15 +1905,17 @@ class BritiveCli:
                     self.print(f'could not reset gcloud CLI active account due to issue: {e!s}')
         self.config.clear_gcloud_auth_key_files(profile=profile)
 
-    def api(self, method, parameters: dict, query=None):
-        self.login()
-
+    @staticmethod
+    def _api_parameters(parameters: dict):
         # clean up parameters - need to load json as dict if json string is provided and handle file inputs
         computed_parameters = {}
         open_file_keys = []
         try:
             for key, value in parameters.items():
                 computed_key = key.replace('-', '_')
+                if not isinstance(value, str):  # already parsed, from a batch file
+                    computed_parameters[computed_key] = value
+                    continue
                 computed_value = value
 
                 if value.lower() == 'none':
@@ -1240,6 +1941,12 @@ class BritiveCli:
                     computed_parameters[computed_key] = computed_value
         except AttributeError as e:
             raise click.ClickException(f'invalid parameters {parameters} provided.') from e
+        return computed_parameters, open_file_keys
+
+    def _api_call(self, method: str, parameters: dict, query: Optional[str] = None, stream: bool = False):
+        import jmespath  # lazy load
+
+        computed_parameters, open_file_keys = self._api_parameters(parameters)
 
         # determine the sdk method we need to execute, starting at the base Britive class
         func = self.b
@@ -1249,22 +1956,135 @@ class BritiveCli:
         except Exception as e:
             raise click.ClickException(f'invalid method {method} provided.') from e
 
+        if stream:
+            from .helpers.paging import streamable_methods  # lazy load
+
+            stream = method in streamable_methods
+
         # execute the method with the computed parameters
-        response = func(**computed_parameters)
+        try:
+            if stream:  # the listing is consumed page by page as the output is written
+                try:
+                    endpoint, params = streamable_methods[method](**computed_parameters)
+                except TypeError as e:
+                    raise click.ClickException(f'invalid parameters {parameters} provided.') from e
+                response = self._inline_pages(f'{self.b.base_url}/{endpoint}', params)
+            else:
+                response = func(**computed_parameters)
+        finally:
+            # close any files we opened due to fileb:// prefix
+            for key in open_file_keys:
+                with contextlib.suppress(Exception):
+                    computed_parameters[key].close()
+
+        if stream:
+            return self._stream_api_response(response, query)
+
+        # optionally filter based on provided jmespath query/search
+        return jmespath.search(query, response) if query else response
+
+    def _inline_pages(self, url: str, params: dict):
+        from britive.helpers.utils import check_response_for_error, handle_response  # lazy load
+
+        from .helpers.paging import inline_pages  # lazy load
+
+        def get_page(url: str, params: dict) -> dict:
+            response = self.b.session.get(url, params=params)
+            page = handle_response(response)
+            check_response_for_error(response.status_code, page)
+            return page
+
+        return inline_pages(get_page, url, params)
+
+    @staticmethod
+    def _stream_api_response(response, query: Optional[str]):
+        import jmespath  # lazy load
+
+        from .helpers.paging import is_element_wise  # lazy load
 
-        # close any files we opened due to fileb:// prefix
-        for key in open_file_keys:
-            with contextlib.suppress(Exception):
-                computed_parameters[key].close()
+        if not query:
+            return iter(response)
+        expression = jmespath.compile(query)
+        if not is_element_wise(expression.parsed):  # needs every element, e.g. length(@) or sort_by(...)
+            return expression.search(list(response))
+        return (item for page in response.pages() for item in expression.search(page) or [])
 
-        # output the response, optionally filtering based on provided jmespath query/search
-        self.print(jmespath.search(query, response) if query else response, ignore_silent=True)
+    def api(self, method, parameters: dict, query=None, stream: bool = False):
+        self.login()
+        self.print(self._api_call(method=method, parameters=parameters, query=query, stream=stream), ignore_silent=True)
+
+    @staticmethod
+    def _parse_api_batch_line(line: str) -> dict:
+        try:
+            call = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise click.ClickException(f'invalid json: {e}') from e
+        if not isinstance(call, dict) or not isinstance(call.get('method'), str):
+            raise click.ClickException('each line must be a json object with a method.')
+        unknown = set(call) - {'id', 'method', 'parameters', 'query'}
+        if unknown:
+            raise click.ClickException(f'unknown fields {", ".join(sorted(unknown))}.')
+        if not isinstance(call.get('parameters') or {}, dict):
+            raise click.ClickException('parameters must be a json object.')
+        return call
+
+    def api_batch(self, batch, query: Optional[str] = None, workers: int = 8, ordered: bool = False):
+        """Run one SDK call per line of `batch` over a single authenticated session.
+
+        Each line is a json object with a `method` and optionally `parameters`, `query` (defaulting to the `--query`
+        option) and an `id` echoed back in the result. A json object is written per call, as calls complete or in
+        input order when `ordered`, holding the `line`, `id` and `method` and either the `response` or the `error`.
+        """
+        from .helpers.concurrency import run_bounded  # lazy load
+
+        self.login()
+
+        def parse():
+            for number, line in enumerate(batch, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, self._parse_api_batch_line(line)
+                except click.ClickException as e:
+                    yield number, e
+
+        def call(item: tuple):
+            parsed = item[1]
+            if isinstance(parsed, Exception):
+                raise parsed
+            return self._api_call(
+                method=parsed['method'], parameters=parsed.get('parameters') or {}, query=parsed.get('query', query)
+            )
+
+        calls = 0
+        failures = 0
+        for (number, parsed), future in run_bounded(call, parse(), workers=workers, ordered=ordered):
+            calls += 1
+            result = {'line': number}
+            if isinstance(parsed, dict):
+                result.update({k: parsed[k] for k in ('id', 'method') if k in parsed})
+            try:
+                result['response'] = future.result()
+            except Exception as e:
+                failures += 1
+                result['error'] = e.format_message() if isinstance(e, click.ClickException) else str(e)
+            click.echo(json.dumps(result, default=str))
+        if failures:
+            raise click.ClickException(f'{failures} of {calls} batch calls failed.')
 
     # yes - this method exits in b.my_access as _get_profile_and_environment_ids_given_names
     # but we are doing additional business logic here to enhance the cli experience so there is
     # a need to duplicate some of this logic (although we are doing additional work here so the logic is
     # not 100% duplicated)
     def _convert_names_to_ids(self, profile_name: str, environment_name: str, application_name: str) -> dict:
+        # the local catalog saves listing every profile when the names resolve to exactly one profile
+        if not self.available_profiles and (
+            ids := self.profile_catalog.lookup(
+                application=application_name, environment=environment_name, profile=profile_name
+            )
+        ):
+            return {'profile_id': ids['profile_id'], 'environment_id': ids['environment_id'], 'from_catalog': True}
+
         # set the available profiles if this is not already done
         self._set_available_profiles()
 
@@ -1346,15 +2166,10 @@ class BritiveCli:
             raise ValueError('justification cannot be longer than 255 characters.')
 
     def ssh_aws_ssm_proxy(self, username, hostname, push_public_key, port_number, key_source):
+        from .helpers.ssh import parse_aws_hostname, ssm_proxy_command  # lazy load
+
         self.silent = True
-        helper = hostname.split('.')
-        instance_id = helper[0]
-        aws_profile = None  # will drop to using standard aws boto3/cli profile provider chain
-        aws_region = None  # will drop to using standard aws boto3/cli region provider chain
-        if len(helper) > 1:
-            aws_profile = helper[1]
-        if len(helper) > 2:
-            aws_region = helper[2]
+        instance_id, aws_profile, aws_region = parse_aws_hostname(hostname)
 
         if push_public_key:
             details = self._ssh_generate_key(username=username, hostname=hostname, key_source=key_source)
@@ -1366,115 +2181,40 @@ class BritiveCli:
                 key_pair=details['key_pair'],
             )
 
-        commands = [
-            'aws',
-            'ssm',
-            'start-session',
-            f'--parameters portNumber={port_number}',
-            '--document-name AWS-StartSSHSession',
-            f'--target {instance_id}',
-        ]
-
-        if aws_profile:
-            commands.append(f'--profile {aws_profile}')
-        if aws_region:
-            commands.append(f'--region {aws_region}')
-
-        self.print(' '.join(commands), ignore_silent=True)
+        self.print(ssm_proxy_command(instance_id, port_number, aws_profile, aws_region), ignore_silent=True)
 
     @staticmethod
     def _ssh_generate_key_pair():
-        # doing imports here as these packages are not a requirement to use pybritive in general
-        from cryptography.hazmat.primitives import serialization
-        from cryptography.hazmat.primitives.asymmetric import rsa
-
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        from .helpers.ssh import generate_key_pair  # lazy load
 
-        pem_private_key = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption(),
-        )
-
-        pem_public_key = private_key.public_key().public_bytes(
-            encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH
-        )
-
-        return {'private': pem_private_key, 'public': pem_public_key}
+        return generate_key_pair()
 
     def _ssh_generate_key(self, username, hostname, key_source):
-        # doing imports here as these packages are not a requirement to use pybritive in general
+        from .helpers.ssh import generate_key  # lazy load
 
-        # these 3 ship with python3.x
-        import glob
-        import subprocess
-        import time
-
-        key_pair = self._ssh_generate_key_pair()
-
-        # let's do the right thing and clean up old ephemeral keys
         ssh_dir = Path(self.config.path).parent.absolute() / 'ssh'
-        ssh_dir.mkdir(exist_ok=True, parents=True)  # create the directory if it doesn't exist already
-        if key_source == 'ssh-agent':
-            # cleanup any old ssh keys that were randomly generated
-            now = int(time.time())
-            for key in glob.glob(f'{ssh_dir!s}/random-*'):
-                file = key.split('/')[-1].split('.')[0]
-                expiration = int(file.split('-')[2])
-                if expiration < now:
-                    Path(key).unlink(missing_ok=True)
-
-            pem_file = ssh_dir / f'random-{uuid.uuid4().hex}-{now + 60}.pem'
-        elif key_source == 'static':
-            # clean up the specific key if it exists, so we can create a new one
-            pem_file = ssh_dir / f'{hostname}.{username}.pem'
-            pem_file.unlink(missing_ok=True)
-        else:
-            raise ValueError(f'invalid --key-source value {key_source}')
-
-        # we only need to persist the private key locally
-        # as the public key is just pushed to the ec2 instance
-        # as a string in the ec2 instance connect api call (no file
-        # reference)
-        with open(str(pem_file), 'w', encoding='utf-8') as f:
-            f.write(key_pair['private'].decode())
-        os.chmod(pem_file, 0o400)
-
-        # and if we are using ssh-agent we need to add the private key via ssh-add
-        if key_source == 'ssh-agent':
-            subprocess.run(['ssh-add', '-t', '60', '-q', str(pem_file)], check=False)
-
-        return {'private_key_filename': pem_file, 'key_pair': key_pair}
+        return generate_key(ssh_dir=ssh_dir, username=username, hostname=hostname, key_source=key_source)
 
     @staticmethod
     def build_import_exception_message(extras: str):
         return f'required packages not found. run `pip3 install pybritive[{extras}]`'
 
-    @staticmethod
-    def _ssh_aws_push_key(aws_profile, aws_region, instance_id, username, key_pair):
+    def _ssh_aws_push_key(self, aws_profile, aws_region, instance_id, username, key_pair):
+        from .helpers.ssh import push_aws_key  # lazy load
+
         try:
-            import boto3
+            push_aws_key(
+                cache=self.cache,
+                ttl=self.config.cloud_lookup_ttl_seconds(),
+                aws_profile=aws_profile,
+                aws_region=aws_region,
+                instance_id=instance_id,
+                username=username,
+                key_pair=key_pair,
+            )
         except ImportError as e:
             raise click.ClickException(BritiveCli.build_import_exception_message('aws')) from e
 
-        # we know we will be pushing the key to the instance so establish the
-        # boto3 clients which are required to perform those actions
-        session = boto3.Session(profile_name=aws_profile, region_name=aws_region)
-        eic = session.client('ec2-instance-connect')
-        ec2 = session.client('ec2')
-
-        # now push the key
-        az = ec2.describe_instances(InstanceIds=[instance_id])['Reservations'][0]['Instances'][0]['Placement'][
-            'AvailabilityZone'
-        ]
-
-        eic.send_ssh_public_key(
-            InstanceId=instance_id,
-            InstanceOSUser=username,
-            SSHPublicKey=key_pair['public'].decode(),
-            AvailabilityZone=az,
-        )
-
     def ssh_aws_openssh_config(self, push_public_key, key_source):
         lines = ['Match host i-*,mi-*']
         if push_public_key:
@@ -1563,25 +2303,53 @@ class BritiveCli:
 
     def clear_cached_aws_credentials(self, profile):
         # start with the profile name that was passed in from the command
-        Cache().clear_credentials(profile_name=profile)
+        self.cache.clear_credentials(profile_name=profile)
 
         # then we can try to split it into parts and clear that version of the
         # profile name as well - it will not hurt anything to try to clear
         # both versions
         parts = self._split_profile_into_parts(profile)
-        Cache().clear_credentials(profile_name=f'{parts["app"]}/{parts["env"]}/{parts["profile"]}')
-
-    def ssh_gcp_identity_aware_proxy(self, username, hostname, push_public_key, port_number, key_source):
-        self.silent = True
-        helper = hostname.split('.')
-        instance_name = helper[1]
-        project = helper[2]
-
-        import shlex
-        import subprocess
+        self.cache.clear_credentials(profile_name=f'{parts["app"]}/{parts["env"]}/{parts["profile"]}')
+
+    def _gcp_instance_zone(self, instance_name: str, project: str, with_metadata: bool = False):
+        """Return the zone of the instance and, when asked for, its current metadata.
+
+        The zone is cached, so only the first connection to an instance lists instances, filtered down to the one
+        instance. The metadata is never cached as the ssh keys in it are rewritten from it.
+        """
+        import subprocess  # lazy load
+
+        key = f'{project}/{instance_name}'
+        cached = self.cache.get_lookup('gcp-instance-zones', key)
+        if cached and not with_metadata:
+            return cached['zone'], None
+        if cached:
+            command = [
+                'gcloud',
+                'compute',
+                'instances',
+                'describe',
+                instance_name,
+                f'--zone={cached["zone"]}',
+                f'--project={project}',
+                '--format=json',
+            ]
+            try:
+                instance = json.loads(subprocess.check_output(command, stderr=subprocess.DEVNULL).decode('utf-8'))
+                return cached['zone'], instance.get('metadata')
+            except subprocess.CalledProcessError:  # the instance moved or is gone, look it up again
+                self.cache.clear_lookup('gcp-instance-zones', key)
 
-        command = f'gcloud compute instances list --format json --project {project}'
-        instances = json.loads(subprocess.check_output(shlex.split(command)).decode('utf-8'))
+        command = [
+            'gcloud',
+            'compute',
+            'instances',
+            'list',
+            f'--filter=name=({instance_name})',
+            '--format=json',
+            f'--project={project}',
+        ]
+        instances = json.loads(subprocess.check_output(command).decode('utf-8'))
 
         zone = None
         metadata = None
@@ -1592,6 +2360,51 @@ class BritiveCli:
 
         if not zone:
             raise click.BadParameter(f'no zone found for instance {instance_name} in project {project}')
+        self.cache.save_lookup(
+            'gcp-instance-zones', key, value={'zone': zone}, ttl=self.config.cloud_lookup_ttl_seconds()
+        )
+        return zone, metadata
+
+    def _gcloud_active_account(self) -> str:
+        """Return the active gcloud account, remembered until the gcloud configuration changes."""
+        import subprocess  # lazy load
+
+        config_dir = Path(os.getenv('CLOUDSDK_CONFIG') or Path.home() / '.config' / 'gcloud')
+        if sys.platform == 'win32' and not os.getenv('CLOUDSDK_CONFIG'):
+            config_dir = Path(os.getenv('APPDATA', '')) / 'gcloud'
+        # gcloud records the active account in these files, any change to them is a change of account
+        modified = []
+        for path in [config_dir / 'active_config', *sorted(config_dir.glob('configurations/config_*'))]:
+            with contextlib.suppress(OSError):
+                modified.append([str(path), path.stat().st_mtime_ns])
+        signature = hashlib.sha256(
+            json.dumps([os.getenv('CLOUDSDK_CORE_ACCOUNT'), os.getenv('CLOUDSDK_ACTIVE_CONFIG_NAME'), modified]).encode(
+                'utf-8'
+            )
+        ).hexdigest()
+
+        cached = self.cache.get_lookup('gcloud-accounts', signature)
+        if cached:
+            return cached['account']
+        command = ['gcloud', 'auth', 'list', '--filter=status:ACTIVE', '--format=value(account)', '--quiet']
+        account = subprocess.check_output(command).decode('utf-8').strip()
+        self.cache.save_lookup(
+            'gcloud-accounts', signature, value={'account': account}, ttl=self.config.cloud_lookup_ttl_seconds()
+        )
+        return account
+
+    def ssh_gcp_identity_aware_proxy(self, username, hostname, push_public_key, port_number, key_source):
+        self.silent = True
+        helper = hostname.split('.')
+        instance_name = helper[1]
+        project = helper[2]
+
+        import shlex
+        import subprocess
+
+        zone, metadata = self._gcp_instance_zone(
+            instance_name=instance_name, project=project, with_metadata=push_public_key == 'instance-metadata'
+        )
 
         if push_public_key:
             details = self._ssh_generate_key(username=username, hostname=hostname, key_source=key_source)
@@ -1627,8 +2440,7 @@ class BritiveCli:
                             if should_carry_forward:
                                 future_keys.append(key)
 
-                    command = 'gcloud auth list --filter=status:ACTIVE --format="value(account)" --quiet'
-                    active_gcloud_user = subprocess.check_output(shlex.split(command)).decode('utf-8').strip()
+                    active_gcloud_user = self._gcloud_active_account()
 
                     # format is 2023-05-16T20:15:22+0000
                     google_ssh_data = {
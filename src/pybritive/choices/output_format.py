@@ -5,6 +5,7 @@ output_format_choices = click.Choice(
         'csv',
         'json',
         'list',
+        'ndjson',
         'table',
         'table-double_grid',
         'table-double_outline',
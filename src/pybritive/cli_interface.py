@@ -3,20 +3,8 @@ import sys
 
 import click
 
-from pybritive.commands.api import api as command_api
-from pybritive.commands.aws import aws as group_aws
-from pybritive.commands.cache import cache as group_cache
-from pybritive.commands.checkin import checkin as command_checkin
-from pybritive.commands.checkout import checkout as command_checkout
-from pybritive.commands.clear import clear as group_clear
-from pybritive.commands.configure import configure as group_configure
-from pybritive.commands.login import login as command_login
-from pybritive.commands.logout import logout as command_logout
-from pybritive.commands.ls import ls as group_ls
-from pybritive.commands.request import request as group_request
-from pybritive.commands.secret import secret as group_secret
-from pybritive.commands.ssh import ssh as group_ssh
-from pybritive.commands.user import user as command_user
+import pybritive.completers  # noqa: F401 - registers the custom shell completion classes
+from pybritive.helpers.lazy_group import LazyGroup
 from pybritive.options.britive_options import britive_options
 
 
@@ -32,8 +20,28 @@ def safe_cli():
         raise e from None
 
 
+# commands are only imported when invoked, so each invocation only pays for the command it runs
+commands = {
+    'agent': 'pybritive.commands.agent:agent',
+    'api': 'pybritive.commands.api:api',
+    'aws': 'pybritive.commands.aws:aws',
+    'cache': 'pybritive.commands.cache:cache',
+    'checkin': 'pybritive.commands.checkin:checkin',
+    'checkout': 'pybritive.commands.checkout:checkout',
+    'clear': 'pybritive.commands.clear:clear',
+    'configure': 'pybritive.commands.configure:configure',
+    'login': 'pybritive.commands.login:login',
+    'logout': 'pybritive.commands.logout:logout',
+    'ls': 'pybritive.commands.ls:ls',
+    'request': 'pybritive.commands.request:request',
+    'secret': 'pybritive.commands.secret:secret',
+    'ssh': 'pybritive.commands.ssh:ssh',
+    'user': 'pybritive.commands.user:user',
+}
+
+
 # this is the "main" app - it really does nothing but print the overview/help section
-@click.group()
+@click.group(cls=LazyGroup, lazy_subcommands=commands)
 @britive_options(names='version')
 def cli(version):
     """
@@ -41,21 +49,5 @@ def cli(version):
     """
 
 
-cli.add_command(command_user)
-cli.add_command(group_ls)
-cli.add_command(command_login)
-cli.add_command(command_logout)
-cli.add_command(command_checkout)
-cli.add_command(group_configure)
-cli.add_command(command_checkin)
-cli.add_command(group_secret)
-cli.add_command(group_cache)
-cli.add_command(group_request)
-cli.add_command(group_clear)
-cli.add_command(command_api)
-cli.add_command(group_ssh)
-cli.add_command(group_aws)
-
-
 if __name__ == '__main__':
     safe_cli()
@@ -0,0 +1,40 @@
+import click
+
+from pybritive.helpers.build_britive import build_britive
+from pybritive.options.britive_options import britive_options
+
+
+@click.group()
+def agent():
+    """Run a local agent which serves cached credentials to the helper console scripts."""
+    pass
+
+
+@agent.command()
+@build_britive
+@britive_options(names='tenant,token,passphrase,federation_provider')
+def start(ctx, tenant, token, passphrase, federation_provider):
+    """Start the agent in the foreground.
+
+    `pybritive-aws-cred-process` and `pybritive-kube-exec` will ask the agent for credentials before falling back to
+    checking out the profile themselves.
+
+    The agent hands credentials to any process running as the same user without asking for the passphrase, even if
+    the credential cache is encrypted with one.
+    """
+    ctx.obj.britive.agent_start()
+
+
+@agent.command()
+@build_britive
+def stop(ctx):
+    """Stop the running agent."""
+    ctx.obj.britive.agent_stop()
+
+
+@agent.command()
+@build_britive
+@britive_options(names='format')
+def status(ctx, output_format):
+    """Show whether an agent is running."""
+    ctx.obj.britive.agent_status()
@@ -13,9 +13,25 @@ command_api_patch_shell_complete(Command)
 
 @click.command(context_settings={'ignore_unknown_options': True, 'allow_extra_args': True})
 @build_britive
-@britive_options(names='query,output_format,tenant,token,silent,passphrase,federation_provider')
+@britive_options(
+    names='query,output_format,stream,batch,workers,ordered,tenant,token,silent,passphrase,federation_provider'
+)
 @click_smart_api_method_argument  # need to gracefully handle older version of click
-def api(ctx, query, output_format, tenant, token, silent, passphrase, federation_provider, method):
+def api(  # noqa: PLR0913
+    ctx,
+    query,
+    output_format,
+    stream,
+    batch,
+    workers,
+    ordered,
+    tenant,
+    token,
+    silent,
+    passphrase,
+    federation_provider,
+    method,
+):
     """Exposes the Britive Python SDK methods to the CLI.
 
     Documentation on each SDK method can be found inside the Python SDK itself and on Github
@@ -41,6 +57,18 @@ def api(ctx, query, output_format, tenant, token, silent, passphrase, federation
 
     * pybritive api application_management.profiles.create --application-id <id> --name testprofile
 
+    * pybritive api identity_management.users.list --stream --query '[].email' --format ndjson
+
+    * pybritive api --batch calls.jsonl --workers 16
+
     """
+    if batch:
+        if method or ctx.args or stream:
+            raise click.UsageError('METHOD, parameters and --stream cannot be provided with --batch.')
+        ctx.obj.britive.api_batch(batch=batch, query=query, workers=workers, ordered=ordered)
+        return
+    if not method:
+        raise click.UsageError("Missing argument 'METHOD'.")
+
     parameters = {ctx.args[i][2:]: ctx.args[i + 1] for i in range(0, len(ctx.args), 2)}
-    ctx.obj.britive.api(method=method, parameters=parameters, query=query)
+    ctx.obj.britive.api(method=method, parameters=parameters, query=query, stream=stream)
@@ -1,18 +1,48 @@
 import click
 
 from pybritive.helpers.build_britive import build_britive
-from pybritive.helpers.profile_argument_decorator import click_smart_profile_argument
+from pybritive.helpers.profile_argument_decorator import click_smart_profiles_argument
 from pybritive.options.britive_options import britive_options
 
 
 @click.command()
 @build_britive
-@britive_options(names='console,profile_type,tenant,token,silent,passphrase,federation_provider')
-@click_smart_profile_argument
-def checkin(ctx, console, profile_type, tenant, token, silent, passphrase, federation_provider, profile):
-    """Checkin a profile.
+@britive_options(
+    names='all_checked_out,console,profile_type,workers,tenant,token,silent,passphrase,federation_provider'
+)
+@click_smart_profiles_argument
+def checkin(
+    ctx,
+    all_checked_out,
+    console,
+    profile_type,
+    workers,
+    tenant,
+    token,
+    silent,
+    passphrase,
+    federation_provider,
+    profile,
+):
+    """Checkin one or more profiles.
 
-    This command takes 1 required argument `PROFILE`. This should be a string representation of the profile
+    This command takes 1 or more `PROFILE` arguments. Each should be a string representation of the profile
     that should be checked in. Format is `application name/environment name/profile name`.
+
+    Multiple profiles, or every checked out profile with `--all`, are checked in concurrently.
     """
-    ctx.obj.britive.checkin(profile=profile, console=console, profile_type=profile_type)
+    if all_checked_out or len(profile) > 1:
+        if all_checked_out and profile:
+            raise click.UsageError('PROFILE arguments cannot be provided with --all.')
+        ctx.obj.britive.checkin_many(
+            profiles=list(profile),
+            all_checked_out=all_checked_out,
+            console=console,
+            profile_type=profile_type,
+            workers=workers,
+        )
+        return
+    if not profile:
+        raise click.UsageError("Missing argument 'PROFILE...'.")
+
+    ctx.obj.britive.checkin(profile=profile[0], console=console, profile_type=profile_type)
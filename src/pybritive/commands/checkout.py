@@ -1,7 +1,7 @@
 import click
 
 from pybritive.helpers.build_britive import build_britive
-from pybritive.helpers.profile_argument_decorator import click_smart_profile_argument
+from pybritive.helpers.profile_argument_decorator import click_smart_profiles_argument
 from pybritive.options.britive_options import britive_options
 
 
@@ -9,9 +9,9 @@ from pybritive.options.britive_options import britive_options
 @build_britive
 @britive_options(
     names='alias,blocktime,console,justification,ticket_type,ticket_id,otp,mode,maxpolltime,silent,force_renew,aws_credentials_file,'
-    'gcloud_key_file,verbose,extend,profile_type,tenant,token,passphrase,federation_provider'
+    'gcloud_key_file,verbose,extend,profile_type,manifest,workers,tenant,token,passphrase,federation_provider'
 )
-@click_smart_profile_argument
+@click_smart_profiles_argument
 def checkout(  # noqa: PLR0913
     ctx,
     alias,
@@ -30,18 +30,49 @@ def checkout(  # noqa: PLR0913
     verbose,
     extend,
     profile_type,
+    manifest,
+    workers,
     tenant,
     token,
     passphrase,
     federation_provider,
     profile,
 ):
-    """Checkout a profile.
+    """Checkout one or more profiles.
 
-    This command takes 1 required argument `PROFILE`. This should be a string representation of the profile
+    This command takes 1 or more `PROFILE` arguments. Each should be a string representation of the profile
     that should be checked out. Format is `application name/environment name/profile name`.
+
+    Multiple profiles, given as arguments and/or listed in a `--manifest` file, are checked out concurrently and their
+    credentials printed in order once all checkouts are done.
     """
 
+    if manifest or len(profile) > 1:
+        if alias or extend:
+            raise click.UsageError('--alias and --extend can only be used when checking out a single profile.')
+        ctx.obj.britive.checkout_many(
+            profiles=list(profile),
+            manifest=manifest,
+            blocktime=blocktime,
+            console=console,
+            justification=justification,
+            ticket_type=ticket_type,
+            ticket_id=ticket_id,
+            otp=otp,
+            mode=mode,
+            maxpolltime=maxpolltime,
+            passphrase=passphrase,
+            force_renew=force_renew,
+            aws_credentials_file=aws_credentials_file,
+            gcloud_key_file=gcloud_key_file,
+            verbose=verbose,
+            profile_type=profile_type,
+            workers=workers,
+        )
+        return
+    if not profile:
+        raise click.UsageError("Missing argument 'PROFILE...'.")
+
     # silent will get passed in via @build_britive
     ctx.obj.britive.checkout(
         alias=alias,
@@ -53,7 +84,7 @@ def checkout(  # noqa: PLR0913
         otp=otp,
         mode=mode,
         maxpolltime=maxpolltime,
-        profile=profile,
+        profile=profile[0],
         passphrase=passphrase,
         force_renew=force_renew,
         aws_credentials_file=aws_credentials_file,
@@ -20,7 +20,7 @@ def cache(ctx):
 @clear.command(name='kubeconfig')
 @build_britive
 def clear_kubeconfig(ctx):
-    """Clears the local .britive/kube/config file."""
+    """Clears the local .britive/kube/config file and any per tenant kube config files."""
     ctx.obj.britive.clear_kubeconfig()
 
 
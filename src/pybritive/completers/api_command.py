@@ -1,76 +1,17 @@
-import contextlib
-import inspect
 from importlib.metadata import version
 
-from britive.britive import Britive
-
-from pybritive.completers import get_tenant_for_api_completion
+from pybritive.completers.api_index import parameters
 
 
 def get_dynamic_method_parameters(method):
     try:
-        # create an instance of the Britive class, so we can inspect it
-        # using the user's configured tenant to avoid DNS resolution issues
-        tenant = get_tenant_for_api_completion()
-        if not tenant:
+        params = parameters(method)
+        if params is None:
             return []
-        b = Britive(token='ignore', tenant=tenant, query_features=False)
-
-        # parse the method, so we can determine where in the "hierarchy" we are
-        # and what commands/subcommands the user should be presented with
-
-        for part in method.split('.'):
-            b = getattr(b, part)
-
-        params = {}
-        spec = inspect.getfullargspec(b)
-        # reformat parameters into a more consumable dict while holds all the required details
-        helper = spec[6]
-        helper.pop('return', None)
-
-        for param in helper:
-            params[param] = {}
-
-        defaults = [] if spec[3] is None else list(spec[3])
-        names = [] if spec[0] is None else list(spec[0])
-
-        if len(defaults) > 0:
-            for i in range(1, len(defaults) + 1):
-                name = names[-1 * i]
-                default = defaults[-1 * i]
-                params[name]['default'] = '<empty string>' if default == '' else default
-
-        # we don't REALLY need the doc string so if there are errors just eat them and move on
-        with contextlib.suppress(Exception):
-            doc_lines = inspect.getdoc(b)
-            doc_lines = doc_lines.replace(':returns:', 'RETURNSPLIT')
-            doc_lines = doc_lines.replace(':return:', 'RETURNSPLIT')
-            doc_lines = doc_lines.split('RETURNSPLIT', maxsplit=1)[0].split(':param ')[1:]
-
-            for line in doc_lines:
-                helper = line.split(':')
-                name = helper[0].strip()
-                help_text = ''.join(helper[1].strip().splitlines()).replace('    ', ' ')
-                params[name]['help'] = help_text
-
-        param_list = []
-
-        for name, values in params.items():
-            help_text = values.get('help') or ''
-
-            if 'default' in values:  # cannot do a .get('default') as the default value could be False/None/etc.
-                preamble = f'[optional: default = {values["default"]}]'
-                help_text = preamble if help_text == '' else f'{preamble} - {help_text}'
-
-            param = {'flag': f'--{name.replace("_", "-")}', 'help': help_text}
-
-            param_list.append(param)
-
-        param_list.append(
-            {'flag': '---------------------', 'help': 'separator between sdk parameters and cli parameters'}
-        )
-
-        return param_list
+        return [
+            *params,
+            {'flag': '---------------------', 'help': 'separator between sdk parameters and cli parameters'},
+        ]
     except Exception:
         return []
 
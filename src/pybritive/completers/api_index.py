@@ -0,0 +1,172 @@
+import bisect
+import json
+import os
+from importlib.metadata import version
+from pathlib import Path
+from typing import Optional
+
+from pybritive.helpers.storage import atomic_write
+
+# bump when the layout of the index changes so indexes written by older releases are rebuilt
+index_format = 1
+
+_index = None
+
+
+def index_path() -> Path:
+    """Path of the index for the installed SDK, under ~/.britive/cache/completion."""
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    return Path(home) / '.britive' / 'cache' / 'completion' / f'api-{version("britive")}-{index_format}.json'
+
+
+def method_parameters(func) -> list:
+    """Describe the parameters of an SDK method as `--flag` completion items, using its signature and docstring."""
+    import contextlib  # lazy load
+    import inspect  # lazy load
+
+    params = {}
+    spec = inspect.getfullargspec(func)
+    # reformat parameters into a more consumable dict while holds all the required details
+    helper = spec[6]
+    helper.pop('return', None)
+
+    for param in helper:
+        params[param] = {}
+
+    defaults = [] if spec[3] is None else list(spec[3])
+    names = [] if spec[0] is None else list(spec[0])
+
+    if len(defaults) > 0:
+        for i in range(1, len(defaults) + 1):
+            name = names[-1 * i]
+            default = defaults[-1 * i]
+            params.setdefault(name, {})['default'] = '<empty string>' if default == '' else default
+
+    # we don't REALLY need the doc string so if there are errors just eat them and move on
+    with contextlib.suppress(Exception):
+        doc_lines = inspect.getdoc(func)
+        doc_lines = doc_lines.replace(':returns:', 'RETURNSPLIT')
+        doc_lines = doc_lines.replace(':return:', 'RETURNSPLIT')
+        doc_lines = doc_lines.split('RETURNSPLIT', maxsplit=1)[0].split(':param ')[1:]
+
+        for line in doc_lines:
+            helper = line.split(':')
+            name = helper[0].strip()
+            help_text = ''.join(helper[1].strip().splitlines()).replace('    ', ' ')
+            params[name]['help'] = help_text
+
+    param_list = []
+
+    for name, values in params.items():
+        help_text = values.get('help') or ''
+
+        if 'default' in values:  # cannot do a .get('default') as the default value could be False/None/etc.
+            preamble = f'[optional: default = {values["default"]}]'
+            help_text = preamble if help_text == '' else f'{preamble} - {help_text}'
+
+        param_list.append({'flag': f'--{name.replace("_", "-")}', 'help': help_text})
+
+    return param_list
+
+
+def build_index(tenant: str) -> dict:
+    """Walk the SDK from the base Britive class, recording every group and method with its first doc line.
+
+    Methods also record their parameters. Paths are kept sorted by their lowercased form for prefix lookups.
+    """
+    import contextlib  # lazy load
+    import inspect  # lazy load
+
+    from britive.britive import Britive  # lazy load
+
+    entries = {}
+
+    def first_doc_line(obj, default: str) -> str:
+        with contextlib.suppress(Exception):
+            return inspect.getdoc(obj).split('\n')[0]
+        return default
+
+    def walk(obj, prefix: str, seen: set):
+        for var, value in vars(obj).items():
+            # filter out things which should not show as completion items
+            if not str(value).startswith('<britive.') or var == 'britive' or id(value) in seen:
+                continue
+            path = f'{prefix}.{var}' if prefix else var
+            entries[path] = [path, first_doc_line(value, f'methods related to {var}'), None]
+            walk(value, path, seen | {id(value)})
+
+        # methods are only offered below the base level
+        if not prefix:
+            return
+        for func in dir(obj):
+            if func.startswith('_') or f'{prefix}.{func}' in entries or not callable(getattr(obj, func)):
+                continue
+            path = f'{prefix}.{func}'
+            params = None
+            with contextlib.suppress(Exception):
+                params = method_parameters(getattr(obj, func))
+            entries[path] = [path, first_doc_line(getattr(obj, func), f'no docs found for {path}'), params]
+
+    # using the user's configured tenant to avoid DNS resolution issues
+    walk(Britive(token='ignore', tenant=tenant, query_features=False), '', set())
+    ordered = sorted(entries.values(), key=lambda e: e[0].lower())
+    return {
+        'format': index_format,
+        'britive': version('britive'),
+        'keys': [e[0].lower() for e in ordered],
+        'entries': ordered,
+    }
+
+
+def load_index() -> Optional[dict]:
+    """Load the index of the installed SDK, building it on first use. None if it cannot be built."""
+    global _index  # noqa: PLW0603
+    if _index is not None:
+        return _index
+    path = index_path()
+    try:
+        _index = json.loads(path.read_text(encoding='utf-8'))
+        return _index
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        pass
+
+    from pybritive.completers import get_tenant_for_api_completion  # lazy load
+
+    tenant = get_tenant_for_api_completion()
+    if not tenant:
+        return None
+    _index = build_index(tenant)
+    atomic_write(str(path), json.dumps(_index, separators=(',', ':'), default=str))
+    for stale in path.parent.glob('api-*.json'):  # indexes of previously installed SDK versions
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return _index
+
+
+def complete(incomplete: str) -> list:
+    """Groups and methods one level below the parent of `incomplete` whose path starts with it, case insensitively."""
+    index = load_index()
+    if not index:
+        return []
+    prefix = incomplete.lower()
+    depth = prefix.count('.')
+    keys = index['keys']
+    matches = []
+    i = bisect.bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix):
+        if keys[i].count('.') == depth:
+            matches.append(index['entries'][i])
+        i += 1
+    return matches
+
+
+def parameters(method: str) -> Optional[list]:
+    """Parameters of the given SDK method, None when the method is not in the index."""
+    index = load_index()
+    if not index:
+        return None
+    keys = index['keys']
+    i = bisect.bisect_left(keys, method.lower())
+    if i < len(keys) and keys[i] == method.lower() and index['entries'][i][0] == method:
+        return index['entries'][i][2]
+    return None
@@ -1,19 +1,20 @@
-from pybritive.helpers.cache import Cache
-from pybritive.helpers.config import ConfigManager
+from pybritive.helpers.completion_index import ProfileCompletionIndex, tenant_for_completion
 
 
 def profile_completer(ctx, param, incomplete):
-    profiles = Cache().get_profiles()
+    # scoped to the tenant given on the command line, or the one the command would default to
     try:
-        config = ConfigManager(None)
-        config.load()
-        aliases = config.profile_aliases
-        alias_list = []
-        if aliases:
-            alias_list = list(aliases.keys())
+        completion = tenant_for_completion(tenant=ctx.params.get('tenant') if ctx else None)
     except Exception:
-        alias_list = []
+        completion = {'tenant': None, 'aliases': []}
+    needle = incomplete.lower()
+    aliases = [a for a in completion['aliases'] if needle in a.lower()]
 
-    options = profiles + alias_list
+    index = ProfileCompletionIndex(completion['tenant']) if completion['tenant'] else None
+    if index and index.exists():
+        return index.search(incomplete) + aliases
 
-    return [o for o in options if incomplete.lower() in o.lower()]
+    # no index written for the tenant yet, fall back to the profiles cached for every tenant
+    from pybritive.helpers.cache import Cache  # lazy load
+
+    return [p for p in Cache().get_profiles() if needle in p.lower()] + aliases
@@ -0,0 +1,246 @@
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+# checkouts can sit in an approval or polling loop for a while so be patient before giving up on the agent
+default_request_timeout = 300
+
+
+def socket_path() -> str:
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    return str(Path(home) / '.britive' / 'pybritive.agent.sock')
+
+
+def supported() -> bool:
+    import socket  # lazy load
+
+    return hasattr(socket, 'AF_UNIX')
+
+
+def request(payload: dict, timeout: float = default_request_timeout) -> Optional[dict]:
+    """Send a single request to the running agent, returning None if no agent is available."""
+    path = socket_path()
+    if not os.path.exists(path):  # no agent running - keep this path as cheap as possible
+        return None
+
+    import json  # lazy load
+    import socket  # lazy load
+
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(path)
+            client.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+            with client.makefile('rb') as response:
+                line = response.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):  # stale socket, agent went away mid-request, etc.
+        return None
+
+
+def get_credentials(mode: str, profile: str, tenant: Optional[str] = None) -> Optional[dict]:
+    response = request({'op': 'credentials', 'mode': mode, 'profile': profile, 'tenant': tenant})
+    return (response or {}).get('credentials')
+
+
+class CredentialAgent:
+    """Long lived local process answering credential requests over a Unix domain socket.
+
+    The agent keeps the authenticated session of the BritiveCli instance it was started with, along with the
+    profile catalog and the decrypted credentials it has handed out, in memory. The helper console scripts ask it
+    for credentials first and fall back to doing the work themselves when it is not running or returns an error.
+
+    Any process of the same user can connect to the socket and is handed credentials without a passphrase.
+    """
+
+    def __init__(self, cli, passphrase: Optional[str] = None):
+        self.cli = cli
+        self.passphrase = passphrase
+        self.path = socket_path()
+        self.credentials = {}
+        self.tenants = {}
+        self.refreshing = set()
+        self.logins = 0  # logins done since starting, after the token expired or was revoked
+        self.authentication_error = None
+        self.login_lock = threading.Lock()
+        # checkouts of different profiles run side by side, those of one profile one at a time
+        self.profile_locks = {}
+        self.profile_locks_lock = threading.Lock()
+        self.lookups = cli._locked_lookups()  # the profiles are listed by one checkout at a time
+        self.server = None
+
+    def serve_forever(self):
+        import json  # lazy load
+        import socketserver  # lazy load
+
+        agent = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    response = agent.handle(json.loads(self.rfile.readline()))
+                except Exception as e:
+                    response = {'error': str(e)}
+                self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+
+        if not supported():
+            raise RuntimeError('the agent requires Unix domain socket support')
+        if request({'op': 'ping'}, timeout=1):
+            raise RuntimeError(f'an agent is already listening on {self.path}')
+
+        Path(self.path).parent.mkdir(exist_ok=True, parents=True)
+        Path(self.path).unlink(missing_ok=True)  # left behind by an agent which did not shut down cleanly
+        umask = os.umask(0o177)  # only the current user may connect
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            Path(self.path).unlink(missing_ok=True)
+
+    def shutdown(self):
+        if self.server:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def handle(self, payload: dict) -> dict:
+        op = payload.get('op')
+        if op == 'ping':
+            status = {
+                'pid': os.getpid(),
+                'tenant': self.cli.tenant_name,
+                'credentials': len(self.credentials),
+                'authenticated': not self.authentication_error,
+                'logins': self.logins,
+            }
+            if self.authentication_error:
+                status['error'] = self.authentication_error
+            return status
+        if op == 'stop':
+            self.shutdown()
+            return {'stopped': True}
+        if op == 'credentials':
+            return {
+                'credentials': self.get_credentials(
+                    mode=payload.get('mode'), profile=payload['profile'], tenant=payload.get('tenant')
+                )
+            }
+        return {'error': f'unknown operation {op}'}
+
+    def serves_tenant(self, tenant: Optional[str]) -> bool:
+        if tenant not in self.tenants:
+            from .config import ConfigManager  # lazy load
+
+            try:
+                name = ConfigManager(cli=None, tenant_name=tenant).get_tenant()['name']
+            except Exception:
+                name = None
+            self.tenants[tenant] = (name or '').lower() == (self.cli.tenant_name or '').lower()
+        return self.tenants[tenant]
+
+    def profile_lock(self, mode: str, profile: str, tenant: Optional[str] = None) -> threading.Lock:
+        from .lock import credential_lock_key  # lazy load
+
+        key = credential_lock_key(tenant=tenant, mode=mode, profile=profile)
+        with self.profile_locks_lock:
+            return self.profile_locks.setdefault(key, threading.Lock())
+
+    def get_credentials(self, mode: str, profile: str, tenant: Optional[str] = None) -> dict:
+        from .cache import credential_modes  # lazy load
+        from .credential_refresh import within_refresh_window  # lazy load
+        from .lock import credential_lock  # lazy load
+
+        if mode not in credential_modes:
+            raise ValueError(f'mode {mode} is not served by the agent')
+        if not self.serves_tenant(tenant):
+            raise ValueError(f'the agent is not serving tenant {tenant}')
+
+        key = (mode, profile.lower())
+        credentials = self._valid(self.credentials.get(key))
+        if not credentials:
+            profile_lock = self.profile_lock(mode=mode, profile=profile, tenant=tenant)
+            with profile_lock, credential_lock(tenant=tenant, mode=mode, profile=profile):
+                credentials = self._valid(self.credentials.get(key)) or self._checkout(mode, profile)
+                self.credentials[key] = credentials
+
+        window = self.cli.config.credential_refresh_ahead_seconds(mode=mode)  # loaded once for the agent
+        if window and within_refresh_window(credentials['expirationTime'], window) and key not in self.refreshing:
+            self.refreshing.add(key)
+            threading.Thread(target=self._refresh, args=(key, profile, tenant, window), daemon=True).start()
+        return credentials
+
+    @staticmethod
+    def _valid(credentials: Optional[dict]) -> Optional[dict]:
+        from .credential_refresh import seconds_remaining  # lazy load
+
+        if credentials and seconds_remaining(credentials['expirationTime']) > 0:
+            return credentials
+        return None
+
+    def _checkout(self, mode: str, profile: str, renew: bool = False) -> dict:
+        from britive.exceptions import UnauthorizedRequest  # lazy load
+
+        if self.authentication_error:  # the helpers fall back to logging in themselves
+            raise RuntimeError(f'the agent is no longer authenticated: {self.authentication_error}')
+        logins = self.logins
+        try:
+            return self._access_checkout(mode, profile, renew)
+        except UnauthorizedRequest:
+            # the token expired or was revoked while the agent was running, log in again and retry once, checkouts
+            # rejected alongside this one retry with that login
+            with self.login_lock:
+                if self.authentication_error:
+                    raise RuntimeError(f'the agent is no longer authenticated: {self.authentication_error}') from None
+                if self.logins == logins:
+                    try:
+                        self.cli.login()
+                    except Exception as e:
+                        self.authentication_error = str(e) or type(e).__name__
+                        raise
+                    self.logins += 1
+            return self._access_checkout(mode, profile, renew)
+
+    def _access_checkout(self, mode: str, profile: str, renew: bool) -> dict:
+        # the regular checkout path also reads and writes the local cache so helpers running without the agent
+        # see the same credentials, as a batch it skips logging in again and makes its lookups one at a time
+        return self.cli._access_checkout(
+            alias=None,
+            blocktime=None,
+            console=False,
+            extend=False,
+            force_renew=None,
+            justification=None,
+            maxpolltime=None,
+            mode=mode,
+            otp=None,
+            passphrase=self.passphrase,
+            profile=profile,
+            ticket_id=None,
+            ticket_type=None,
+            verbose=None,
+            renew=renew,
+            batch=self.lookups,
+        )[2]
+
+    def _refresh(self, key: tuple, profile: str, tenant: Optional[str], window: int):
+        from .credential_refresh import within_refresh_window  # lazy load
+        from .lock import credential_lock  # lazy load
+
+        mode = key[0]
+        try:
+            profile_lock = self.profile_lock(mode=mode, profile=profile, tenant=tenant)
+            with profile_lock, credential_lock(tenant=tenant, mode=mode, profile=profile):
+                credentials = self._checkout(mode, profile)  # pick up a renewal done by another process
+                if within_refresh_window(credentials['expirationTime'], window):
+                    credentials = self._checkout(mode, profile, renew=True)
+                self.credentials[key] = credentials
+        except Exception:  # the credentials already handed out are still valid, the next request will try again
+            pass
+        finally:
+            self.refreshing.discard(key)
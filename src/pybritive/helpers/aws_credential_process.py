@@ -4,8 +4,6 @@ import os
 import sys
 from sys import argv
 
-from click.exceptions import ClickException
-
 
 def _fallback_input(prompt='', stream=None):
     if not stream:
@@ -122,16 +120,27 @@ def get_args():
     options = getopt(
         argv[1:],
         't:T:p:f:P:F:hv',
-        ['tenant=', 'token=', 'passphrase=', 'force-renew=', 'profile=', 'federation-provider=', 'help', 'version'],
+        [
+            'tenant=',
+            'token=',
+            'passphrase=',
+            'force-renew=',
+            'profile=',
+            'federation-provider=',
+            'help',
+            'version',
+            'refresh',
+        ],
     )[0]
 
     args = {
         'tenant': None,
-        'token': None,
+        'token': os.getenv('BRITIVE_API_TOKEN'),
         'passphrase': os.getenv('PYBRITIVE_ENCRYPTED_CREDENTIAL_PASSPHRASE'),
         'force_renew': None,
         'profile': None,
         'federation_provider': None,
+        'refresh': False,  # internal - set when renewing credentials inside the refresh ahead window
     }
 
     for opt, arg in options:
@@ -147,6 +156,8 @@ def get_args():
             args['profile'] = arg
         if opt in ('-F', '--federation-provider'):
             args['federation_provider'] = arg
+        if opt == '--refresh':
+            args['refresh'] = True
         if opt in ('-h', '--help'):
             usage()
         if opt in ('-v', '--version'):
@@ -184,7 +195,101 @@ def perform_checkout(b, args, otp=None, justification=None):
         verbose=None,
         extend=False,
         otp=otp,
+        renew=args['refresh'],
+    )
+
+
+def get_cached_entry(args):
+    from pybritive.helpers.cache import Cache  # lazy load
+
+    entry = Cache(passphrase=args['passphrase']).get_credentials_entry(
+        profile_name=args['profile'], mode='awscredentialprocess'
     )
+    if entry:
+        from datetime import datetime  # lazy load
+
+        expiration = datetime.fromisoformat(entry['credentials']['expirationTime'].replace('Z', ''))
+        now = datetime.utcnow()
+        if now > expiration:  # creds have expired so set to none so new one get checked out
+            entry = None
+    return entry
+
+
+def get_cached_credentials(args):
+    entry = get_cached_entry(args)
+    return entry['credentials'] if entry else None
+
+
+def get_agent_credentials(args):
+    if args['token']:  # the agent serves its own identity so leave static tokens to the regular path
+        return None
+
+    from pybritive.helpers.agent import get_credentials  # lazy load
+
+    return get_credentials(mode='awscredentialprocess', profile=args['profile'], tenant=args['tenant'])
+
+
+def print_credentials(creds):
+    # not importing json library on purpose to keep imports down for speed
+    json = '{'
+    json += f'"AccessKeyId": "{creds["accessKeyID"]}",'
+    json += f'"SecretAccessKey": "{creds["secretAccessKey"]}",'
+    json += f'"SessionToken": "{creds["sessionToken"]}",'
+    json += f'"Expiration": "{creds["expirationTime"]}",'
+    json += '"Version": 1}'
+    print(json)
+
+
+def checkout(args):
+    from britive import exceptions
+    from click.exceptions import ClickException  # lazy load
+
+    from pybritive.britive_cli import BritiveCli  # lazy load for performance purposes
+
+    b = BritiveCli(
+        tenant_name=args['tenant'],
+        token=args['token'],
+        passphrase=args['passphrase'],
+        federation_provider=args['federation_provider'],
+        silent=True,
+        from_helper_console_script=True,
+    )
+    b.config.get_tenant()  # have to load the config here as that work is generally done
+
+    try:
+        perform_checkout(b, args)
+    except (exceptions.StepUpAuthRequiredButNotProvided, ClickException) as e:
+        if 'step up authentication required' not in str(e).lower() or args['refresh']:
+            raise SystemExit(e) from e
+        perform_checkout(b, args, otp=get_input(prompt='(pybritive) Enter OTP:'))
+    except (
+        exceptions.ApprovalRequiredButNoJustificationProvided,
+        exceptions.badrequest.MissingJustificationError,
+    ) as e:
+        if args['refresh']:  # nobody is around to answer prompts in the background
+            raise SystemExit(e) from e
+        try:
+            perform_checkout(b, args, justification=get_input(prompt='(pybritive) Enter Justification: '))
+        except exceptions.ProfileApprovalMaxBlockTimeExceeded as e:
+            b.request_withdraw(profile=args['profile'])
+            raise SystemExit('approval not settled before blocktime exceeded - request withdrawn') from e
+
+
+def refresh(args):
+    from pybritive.helpers.credential_refresh import refresh_ahead_seconds, within_refresh_window  # lazy load
+    from pybritive.helpers.lock import credential_lock  # lazy load
+
+    lock = credential_lock(tenant=args['tenant'], mode='awscredentialprocess', profile=args['profile'])
+    if not lock.acquire(blocking=False):  # a checkout of this profile is already in flight
+        return
+    try:
+        window = refresh_ahead_seconds(mode='awscredentialprocess')
+        creds = get_cached_credentials(args)
+        if creds and not within_refresh_window(creds['expirationTime'], window):
+            return  # another process already renewed them
+        checkout(args)  # with --refresh the checkout is extended, the credentials handed out stay valid
+    finally:
+        lock.release()
 
 
 def main():
@@ -193,61 +298,43 @@ def main():
         print('-P/--profile is required')
         usage()
 
-    creds = None
-    if not args['force_renew']:  # if force renew let's defer to that the full package vs. this helper
-        from pybritive.helpers.cache import Cache  # lazy load
+    if args['refresh']:
+        refresh(args)
+        raise SystemExit
 
-        creds = Cache(passphrase=args['passphrase']).get_credentials(
-            profile_name=args['profile'], mode='awscredentialprocess'
-        )
-        if creds:
-            from datetime import datetime  # lazy load
-
-            expiration = datetime.fromisoformat(creds['expirationTime'].replace('Z', ''))
-            now = datetime.utcnow()
-            if now > expiration:  # creds have expired so set to none so new one get checked out
-                creds = None
-            else:  # not importing json library on purpose to keep imports down for speed
-                json = '{'
-                json += f'"AccessKeyId": "{creds["accessKeyID"]}",'
-                json += f'"SecretAccessKey": "{creds["secretAccessKey"]}",'
-                json += f'"SessionToken": "{creds["sessionToken"]}",'
-                json += f'"Expiration": "{creds["expirationTime"]}",'
-                json += '"Version": 1}'
-                print(json)
-                raise SystemExit
-    if not creds:
-        from britive import exceptions
-
-        from pybritive.britive_cli import BritiveCli  # lazy load for performance purposes
-
-        b = BritiveCli(
-            tenant_name=args['tenant'],
-            token=args['token'],
+    # a running agent already holds the session and decrypted credentials in memory
+    if not args['force_renew'] and (creds := get_agent_credentials(args)):
+        print_credentials(creds)
+        raise SystemExit
+
+    # if force renew let's defer to that the full package vs. this helper
+    if not args['force_renew'] and (entry := get_cached_entry(args)):
+        print_credentials(entry['credentials'])
+        from pybritive.helpers.credential_refresh import refresh_args, refresh_if_due  # lazy load
+
+        # hand back the still valid credentials right away and renew them in the background if they expire soon
+        refresh_if_due(
+            mode='awscredentialprocess',
+            expiration_time=entry['credentials']['expirationTime'],
+            args=refresh_args(args),
             passphrase=args['passphrase'],
-            federation_provider=args['federation_provider'],
-            silent=True,
-            from_helper_console_script=True,
+            token=args['token'],
+            window=entry['refresh_ahead_seconds'],
         )
-        b.config.get_tenant()  # have to load the config here as that work is generally done
+        raise SystemExit
 
-        try:
-            perform_checkout(b, args)
-        except (exceptions.StepUpAuthRequiredButNotProvided, ClickException) as e:
-            if 'step up authentication required' not in str(e).lower():
-                raise SystemExit(e) from e
-            perform_checkout(b, args, otp=get_input(prompt='(pybritive) Enter OTP:'))
-        except (
-            exceptions.ApprovalRequiredButNoJustificationProvided,
-            exceptions.badrequest.MissingJustificationError,
-        ):
-            try:
-                perform_checkout(b, args, justification=get_input(prompt='(pybritive) Enter Justification: '))
-            except exceptions.ProfileApprovalMaxBlockTimeExceeded as e:
-                b.request_withdraw(profile=args['profile'])
-                raise SystemExit('approval not settled before blocktime exceeded - request withdrawn') from e
+    from pybritive.helpers.lock import credential_lock  # lazy load
 
-        raise SystemExit
+    # only one process checks out a given profile at a time - any others wait here and then pick up
+    # the credentials the first process wrote to the cache
+    with credential_lock(tenant=args['tenant'], mode='awscredentialprocess', profile=args['profile']):
+        if not args['force_renew'] and (creds := get_cached_credentials(args)):
+            print_credentials(creds)
+            raise SystemExit
+
+        checkout(args)
+
+    raise SystemExit
 
 
 if __name__ == '__main__':
@@ -1,102 +1,239 @@
 import hashlib
 import json
 import os
+import shutil
 import time
 from pathlib import Path
 from typing import Optional
 
-from .encryption import InvalidPassphraseException, StringEncryption
+from .storage import atomic_write, locked
+
+credential_modes = ['awscredentialprocess', 'kube-exec']
 
 
 class Cache:
+    """Local cache persisted as small per-item files under ~/.britive/cache.
+
+    Layout:
+        profiles.json                      list of profile names used for auto-completion
+        banners.json                       banner hashes and expiration times keyed by tenant
+        sessions.json                      recently validated tokens with their whoami and feature flags
+        lookups/<kind>.json                cloud lookups used by ssh, e.g. instance zones, with expiration times
+        <mode>/<sha256 of profile>.json    one encrypted credential entry per (mode, profile)
+    """
+
     def __init__(self, passphrase: Optional[str] = None):
         self.passphrase = passphrase
-        self.string_encryptor = StringEncryption(passphrase=self.passphrase)
+        self._string_encryptor = None
         home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
         self.base_path = str(Path(home) / '.britive')
-        self.path = str(Path(self.base_path) / 'pybritive.cache')  # handle os specific separators properly
-        self.cache = {}
-        self.default_key_values = {'profiles': [], 'awscredentialprocess': {}, 'kube-exec': {}, 'banners': {}}
-        self.load()
-
-    def load(self):
-        path = Path(self.path)
-        if not path.is_file():  # cache file does not yet exist, create it as an empty file
-            path.parent.mkdir(exist_ok=True, parents=True)
-            cache = {'profiles': []}
-            path.write_text(json.dumps(cache, indent=2, default=str), encoding='utf-8')
-
-        with open(str(self.path), encoding='utf-8') as f:
-            try:
-                self.cache = json.loads(f.read())
-            except json.decoder.JSONDecodeError:
-                self.cache = {}
-
-        self.cache = {**self.default_key_values, **self.cache}
-
-    def write(self):
-        # write the new cache file
-        with open(str(self.path), 'w', encoding='utf-8') as f:
-            f.write(json.dumps(self.cache, indent=2, default=str))
+        self.path = str(Path(self.base_path) / 'cache')  # handle os specific separators properly
+        self.legacy_path = str(Path(self.base_path) / 'pybritive.cache')
+        self.profiles_path = str(Path(self.path) / 'profiles.json')
+        self.banners_path = str(Path(self.path) / 'banners.json')
+        self.sessions_path = str(Path(self.path) / 'sessions.json')
+        self.migrate()
+
+    @property
+    def string_encryptor(self):
+        # only pay for importing cryptography and deriving the machine passphrase when credentials are touched
+        if not self._string_encryptor:
+            from .encryption import StringEncryption  # lazy load
+
+            self._string_encryptor = StringEncryption(
+                passphrase=self.passphrase, referenced_keys=self.credential_key_ids
+            )
+        return self._string_encryptor
+
+    def credential_key_ids(self) -> set:
+        # the keyring keys cached credentials are encrypted with, which must stay in the keyring
+        key_ids = set()
+        for mode in credential_modes:
+            for path in Path(self.path, mode).glob('*.json'):
+                ciphertext = self._read(str(path), {}).get('ciphertext') or ''
+                key_ids.add(self.string_encryptor.key_id(ciphertext))
+        key_ids.discard(None)
+        return key_ids
+
+    @staticmethod
+    def _read(path: str, default):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return default
+
+    @staticmethod
+    def _write(path: str, data):
+        atomic_write(path, json.dumps(data, default=str))
+
+    def credentials_path(self, profile_name: str, mode: str = 'awscredentialprocess') -> str:
+        profile_hash = hashlib.sha256(profile_name.lower().encode('utf-8')).hexdigest()
+        return str(Path(self.path) / mode / f'{profile_hash}.json')
+
+    def migrate(self):
+        # split the legacy single file cache into the per-item layout
+        if not Path(self.legacy_path).is_file():
+            return
+        with locked(self.legacy_path):
+            if not Path(self.legacy_path).is_file():  # another process migrated it while we waited
+                return
+            legacy = self._read(self.legacy_path, {})
+            if legacy.get('profiles'):
+                self.save_profiles(legacy['profiles'])
+            if legacy.get('banners'):
+                with locked(self.banners_path):
+                    self._write(self.banners_path, {**self._read(self.banners_path, {}), **legacy['banners']})
+            for mode in credential_modes:
+                for profile_name, ciphertext in legacy.get(mode, {}).items():
+                    self._write(
+                        self.credentials_path(profile_name, mode), {'profile': profile_name, 'ciphertext': ciphertext}
+                    )
+            Path(self.legacy_path).unlink(missing_ok=True)
 
     def get_profiles(self):
-        return self.cache.get('profiles', [])
+        return self._read(self.profiles_path, [])
 
     def save_profiles(self, profiles: list):
-        self.cache['profiles'] += profiles
         # dedup the list of profiles
-        self.cache['profiles'] = list(dict.fromkeys(self.cache['profiles']))
-        self.write()
+        with locked(self.profiles_path):
+            self._write(self.profiles_path, list(dict.fromkeys(self.get_profiles() + profiles)))
 
     def clear(self):
-        # write empty cache file
-        self.cache = self.default_key_values
-        self.write()
+        # remove all cached items
+        shutil.rmtree(self.path, ignore_errors=True)
+        Path(self.legacy_path).unlink(missing_ok=True)
 
     def clear_kubeconfig(self):
-        # delete kube config if it exists
-        kubeconfig = Path(self.base_path) / 'kube' / 'config'
-        kubeconfig.unlink(missing_ok=True)
+        # delete kube config if it exists, along with the per tenant kube configs and their index
+        kube_dir = Path(self.base_path) / 'kube'
+        for name in ['config', 'tenants.json', 'kubeconfig-path', 'state.json']:
+            (kube_dir / name).unlink(missing_ok=True)
+        shutil.rmtree(kube_dir / 'tenants', ignore_errors=True)
 
     def get_credentials(self, profile_name: str, mode: str = 'awscredentialprocess'):
+        entry = self.get_credentials_entry(profile_name=profile_name, mode=mode)
+        return entry['credentials'] if entry else None
+
+    def get_credentials_entry(self, profile_name: str, mode: str = 'awscredentialprocess') -> Optional[dict]:
+        """The decrypted `credentials` and the `refresh_ahead_seconds` saved with them, from a single read.
+
+        The window is None for entries saved without one.
+        """
+        from .encryption import InvalidPassphraseException  # lazy load
+
         try:
-            ciphertext = self.cache[mode].get(profile_name.lower())
+            entry = self._read(self.credentials_path(profile_name, mode), {})
+            ciphertext = entry.get('ciphertext')
             if not ciphertext:
                 return None
-            return json.loads(self.string_encryptor.decrypt(ciphertext))
+            credentials = json.loads(self.string_encryptor.decrypt(ciphertext))
+            if self.string_encryptor.is_legacy(ciphertext):  # transparently move the entry to the keyed format
+                self.save_credentials(
+                    profile_name=profile_name,
+                    credentials=credentials,
+                    mode=mode,
+                    refresh_ahead_seconds=entry.get('refresh_ahead_seconds'),
+                )
+            return {'credentials': credentials, 'refresh_ahead_seconds': entry.get('refresh_ahead_seconds')}
         except InvalidPassphraseException:  # if we cannot decrypt don't error - just make the API call to get the creds
             return None
 
-    def save_credentials(self, profile_name: str, credentials: dict, mode: str = 'awscredentialprocess'):
+    def save_credentials(
+        self,
+        profile_name: str,
+        credentials: dict,
+        mode: str = 'awscredentialprocess',
+        refresh_ahead_seconds: Optional[int] = None,
+    ):
         ciphertext = self.string_encryptor.encrypt(json.dumps(credentials, default=str))
-        self.cache[mode][profile_name.lower()] = ciphertext
-        self.write()
+        entry = {'profile': profile_name.lower(), 'ciphertext': ciphertext}
+        if refresh_ahead_seconds is not None:  # saves the helpers reading the config on every cache hit
+            entry['refresh_ahead_seconds'] = refresh_ahead_seconds
+        self._write(self.credentials_path(profile_name, mode), entry)
 
     def clear_credentials(self, profile_name: str, mode: str = 'awscredentialprocess'):
-        self.cache[mode].pop(profile_name.lower(), None)
-        self.write()
+        Path(self.credentials_path(profile_name, mode)).unlink(missing_ok=True)
 
     @staticmethod
     def hash_banner(banner: dict) -> str:
         return hashlib.sha512(json.dumps(banner, default=str)).hexdigest()
 
+    def get_banner(self, tenant: str) -> dict:
+        return self._read(self.banners_path, {}).get(tenant) or {}
+
     def banner_expired(self, tenant: str) -> bool:
-        cached_banner_data = self.cache.get('banners', {}).get(tenant)
-        expires = 0
-        if cached_banner_data is not None:
-            expires = cached_banner_data.get('expires', 0)
-        return expires < int(time.time())
+        return self.get_banner(tenant).get('expires', 0) < int(time.time())
 
     def save_banner(self, tenant: str, banner: dict) -> bool:
         # if someone called this then we simply save the banner
         # regardless of whether the cached record has expired yet
         # as we assume the caller knows what they are doing
 
-        cached_banner_data = self.cache.get('banners', {}).get(tenant, {})
-        cached_hash = cached_banner_data.get('hash', '')
         new_hash = hashlib.sha512(json.dumps(banner, default=str, sort_keys=True).encode('utf-8')).hexdigest()
-        self.cache['banners'][tenant] = {'hash': new_hash, 'expires': int(time.time()) + (5 * 60)}
-        self.write()
+        with locked(self.banners_path):
+            banners = self._read(self.banners_path, {})
+            cached = banners.get(tenant, {})
+            banners[tenant] = {'hash': new_hash, 'expires': int(time.time()) + (5 * 60)}
+            # a changed banner is kept until it has been displayed, which may be by a later invocation
+            if cached.get('hash', '') != new_hash:
+                banners[tenant]['pending'] = banner
+            elif cached.get('pending'):
+                banners[tenant]['pending'] = cached['pending']
+            self._write(self.banners_path, banners)
 
         # return True if the hashes have changed, False is they are equal
-        return cached_hash != new_hash
+        return cached.get('hash', '') != new_hash
+
+    def clear_pending_banner(self, tenant: str):
+        with locked(self.banners_path):
+            banners = self._read(self.banners_path, {})
+            if banners.get(tenant, {}).pop('pending', None) is not None:
+                self._write(self.banners_path, banners)
+
+    def get_session(self, key: str) -> Optional[dict]:
+        session = self._read(self.sessions_path, {}).get(key)
+        if session and session.get('expires', 0) > int(time.time()):
+            return session
+        return None
+
+    def save_session(self, key: str, whoami: dict, features: dict, ttl: int):
+        now = int(time.time())
+        with locked(self.sessions_path):
+            # drop the expired entries while we are here so the file does not grow with every login
+            sessions = {k: v for k, v in self._read(self.sessions_path, {}).items() if v.get('expires', 0) > now}
+            sessions[key] = {'expires': now + ttl, 'whoami': whoami, 'features': features}
+            self._write(self.sessions_path, sessions)
+
+    def clear_session(self, key: str):
+        with locked(self.sessions_path):
+            sessions = self._read(self.sessions_path, {})
+            if sessions.pop(key, None) is not None:
+                self._write(self.sessions_path, sessions)
+
+    def lookups_path(self, kind: str) -> str:
+        return str(Path(self.path) / 'lookups' / f'{kind}.json')
+
+    def get_lookup(self, kind: str, key: str) -> Optional[dict]:
+        lookup = self._read(self.lookups_path(kind), {}).get(key)
+        if lookup and lookup.get('expires', 0) > int(time.time()):
+            return lookup['value']
+        return None
+
+    def save_lookup(self, kind: str, key: str, value: dict, ttl: int):
+        if not ttl:
+            return
+        now = int(time.time())
+        path = self.lookups_path(kind)
+        with locked(path):
+            # drop the expired entries while we are here so the file does not grow with every new host
+            lookups = {k: v for k, v in self._read(path, {}).items() if v.get('expires', 0) > now}
+            lookups[key] = {'expires': now + ttl, 'value': value}
+            self._write(path, lookups)
+
+    def clear_lookup(self, kind: str, key: str):
+        path = self.lookups_path(kind)
+        with locked(path):
+            lookups = self._read(path, {})
+            if lookups.pop(key, None) is not None:
+                self._write(path, lookups)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from .storage import atomic_write
+
+# an hour is long enough to skip the listing for a working session, new entitlements are picked up on a miss anyway
+default_ttl = 3600
+
+# separates the parts of an index key - a control character so names containing / or | cannot collide
+key_separator = '\x1f'
+
+
+def index_key(application: str, profile: str) -> str:
+    return f'{application}{key_separator}{profile}'.lower()
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.lower().encode('utf-8')).hexdigest()
+
+
+def catalog_dir(tenant: str) -> Path:
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    return Path(home) / '.britive' / 'cache' / 'catalog' / _hash(tenant)
+
+
+class ProfileCatalog:
+    """Per tenant and identity index of the my-access profiles, persisted under ~/.britive/cache/catalog.
+
+    The index maps lowercased (application, profile) names to the environments the profile is available in, each
+    with the profile ID, environment ID, application type and the lowercased environment name and short name, so a
+    checkout can resolve IDs without listing every profile the identity has access to.
+    """
+
+    def __init__(self, tenant: str, identity: str, ttl: int = default_ttl):
+        # keyed by identity as well so a different user logging in to the tenant never resolves to profiles they
+        # do not have access to
+        self.path = str(catalog_dir(tenant) / f'{_hash(identity)}.json')
+        self.ttl = ttl
+        self._data = None
+
+    @staticmethod
+    def clear(tenant: str):
+        # remove the catalogs of every identity of the tenant
+        shutil.rmtree(catalog_dir(tenant), ignore_errors=True)
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(Path(self.path).read_text(encoding='utf-8'))
+            except (FileNotFoundError, json.decoder.JSONDecodeError):
+                self._data = {}
+            if self._data.get('fetched', 0) + self.ttl < int(time.time()):  # stale, behave as if nothing is cached
+                self._data = {}
+        return self._data
+
+    def save(self, profiles: list):
+        if not self.ttl:
+            return
+        index = {}
+        app_types = {}
+        for p in profiles:
+            if not p['app_id']:  # only my-access profiles are resolved through the catalog
+                continue
+            app_types[p['app_id']] = p['app_type']
+            index.setdefault(index_key(p['app_name'], p['profile_name']), []).append(
+                [p['profile_id'], p['env_id'], p['app_type'], p['env_name'].lower(), p['env_short_name'].lower()]
+            )
+        self._data = {'fetched': int(time.time()), 'index': index, 'app_types': app_types}
+        atomic_write(self.path, json.dumps(self._data))
+
+    def invalidate(self):
+        self._data = {}
+        Path(self.path).unlink(missing_ok=True)
+
+    def lookup(self, application: str, environment: str, profile: str) -> Optional[dict]:
+        """Return the IDs of the single profile matching the names, or None if it is unknown or ambiguous.
+
+        Ambiguous names are left to the full listing so the error reported to the user does not change.
+        """
+        if not self.ttl:
+            return None
+        entries = self._load().get('index', {}).get(index_key(application.strip(), profile.strip()), [])
+        if len({e[0] for e in entries}) != 1:
+            return None
+        environment = environment.lower().strip()
+        matches = [e for e in entries if environment in (e[1].lower(), e[3], e[4])]
+        if len(matches) != 1:
+            return None
+        profile_id, environment_id, app_type = matches[0][:3]
+        return {'profile_id': profile_id, 'environment_id': environment_id, 'app_type': app_type}
+
+    def app_type(self, app_id: str) -> Optional[str]:
+        if not self.ttl:
+            return None
+        return self._load().get('app_types', {}).get(app_id)
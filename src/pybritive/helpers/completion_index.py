@@ -0,0 +1,113 @@
+import bisect
+import hashlib
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .storage import atomic_write
+
+
+def completion_path(name: str) -> Path:
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    return Path(home) / '.britive' / 'cache' / 'completion' / name
+
+
+class ProfileCompletionIndex:
+    """Per tenant index of the profile names offered by shell completion, persisted under ~/.britive/cache/completion.
+
+    Unlike the shared profiles.json it is replaced on every refresh, so profiles which are no longer available drop
+    out. Names are stored sorted by, and alongside, their lowercased form so a prefix is found by bisection and a
+    substring by a single scan over the joined lowercased names.
+    """
+
+    def __init__(self, tenant: str):
+        tenant_hash = hashlib.sha256(tenant.lower().encode('utf-8')).hexdigest()
+        self.path = completion_path(f'profiles-{tenant_hash}.json')
+        self._names = None
+        self._lowered = None
+        self._joined = None
+        self._starts = None
+
+    def save(self, profiles: list):
+        names = sorted(set(profiles), key=str.lower)
+        atomic_write(str(self.path), json.dumps({'names': names, 'lowered': [n.lower() for n in names]}))
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def _load(self):
+        if self._names is not None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            data = {}
+        self._names = data.get('names', [])
+        self._lowered = data.get('lowered', [])
+        self._joined = '\n'.join(self._lowered)
+        # offset of each name within the joined names
+        self._starts = [0, *itertools.accumulate(len(n) + 1 for n in self._lowered)][: len(self._lowered)]
+
+    def search(self, incomplete: str) -> list:
+        """Names containing `incomplete`, case insensitively, those starting with it first."""
+        self._load()
+        needle = incomplete.lower()
+        if not needle:
+            return list(self._names)
+
+        i = bisect.bisect_left(self._lowered, needle)
+        prefixed = []
+        while i < len(self._lowered) and self._lowered[i].startswith(needle):
+            prefixed.append(i)
+            i += 1
+
+        contained = []
+        if '\n' not in needle:
+            position = self._joined.find(needle)
+            while position != -1:
+                index = bisect.bisect_right(self._starts, position) - 1
+                if self._starts[index] != position:  # matches at the start of a name were found by bisection
+                    contained.append(index)
+                # continue with the next name
+                next_start = self._starts[index + 1] if index + 1 < len(self._starts) else len(self._joined)
+                position = self._joined.find(needle, next_start)
+
+        return [self._names[i] for i in prefixed] + [self._names[i] for i in contained]
+
+
+def tenant_for_completion(tenant: Optional[str] = None) -> Optional[dict]:
+    """The tenant name and profile aliases which completion should use.
+
+    These come from the config file, which is only parsed when it has changed since the details were last cached.
+    """
+    from .config import ConfigManager  # lazy load
+
+    config = ConfigManager(None)
+    cached_path = completion_path('config.json')
+    try:
+        stat = Path(config.path).stat()
+        signature = [stat.st_mtime_ns, stat.st_size]
+    except FileNotFoundError:
+        signature = None
+
+    try:
+        cached = json.loads(cached_path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        cached = {}
+    if not signature or cached.get('signature') != signature:
+        config.load()
+        cached = {
+            'signature': signature,
+            'default_tenant': config.default_tenant,
+            'tenants': {alias: item.get('name', alias) for alias, item in config.tenants.items()},
+            'aliases': list(config.profile_aliases),
+        }
+        if signature:
+            atomic_write(str(cached_path), json.dumps(cached))
+
+    name = (tenant or os.getenv('BRITIVE_TENANT') or '').lower() or cached['default_tenant']
+    if not name and len(cached['tenants']) == 1:
+        name = next(iter(cached['tenants']))
+    return {'tenant': cached['tenants'].get(name, name), 'aliases': cached['aliases']}
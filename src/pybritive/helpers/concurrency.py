@@ -0,0 +1,62 @@
+from typing import Callable, Iterable, Iterator
+
+# every thread pool in pybritive shares the one sdk session, this is safe: each request is sent on a connection checked
+# out of urllib3's thread safe pool, and the api authenticates by header so the cookie jar (locked anyway) holds no
+# state; changing the session itself (headers, adapters, hooks) is not, so that only happens before workers start or
+# under the login lock. the pool keeps up to 10 connections per host, any opened by more workers are closed after use
+
+# independent api calls made at the same time
+max_workers = 4
+
+
+def run_concurrently(*calls: Callable) -> list:
+    """Run the given zero argument callables on a bounded thread pool and return their results in order.
+
+    Calls which are None are skipped and return None. The first exception raised by a call is re-raised. A single
+    call is made on the current thread.
+    """
+    pending = [(i, call) for i, call in enumerate(calls) if call]
+    results = [None] * len(calls)
+    if len(pending) <= 1:
+        for i, call in pending:
+            results[i] = call()
+        return results
+
+    from concurrent.futures import ThreadPoolExecutor  # lazy load
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+        futures = [(i, executor.submit(call)) for i, call in pending]
+        for i, future in futures:
+            results[i] = future.result()
+    return results
+
+
+def run_bounded(func: Callable, items: Iterable, workers: int = max_workers, ordered: bool = False) -> Iterator:
+    """Apply `func` to each item on a pool of `workers` threads, yielding `(item, future)` pairs.
+
+    Items are consumed lazily, keeping a few per worker in flight, so a large or unbounded iterable can be used.
+    Pairs are yielded as calls complete, or in the order of `items` when `ordered`. Errors are left on the future.
+    """
+    from collections import deque  # lazy load
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # lazy load
+
+    workers = max(1, workers)
+    pending = deque()
+
+    def drain(limit: int):
+        while len(pending) > limit:
+            if ordered:
+                pair = pending.popleft()
+                wait([pair[1]])
+                yield pair
+                continue
+            done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+            for pair in [pair for pair in pending if pair[1] in done]:
+                pending.remove(pair)
+                yield pair
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            yield from drain(limit=workers * 4)
+        yield from drain(limit=0)
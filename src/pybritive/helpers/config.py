@@ -1,17 +1,14 @@
 import configparser
+import contextlib
+import io
 import json
 import os
 import shutil
 from pathlib import Path
 from typing import Optional
 
-import click
-from britive.helpers.utils import parse_tenant
-
-from pybritive.choices.backend import backend_choices
-from pybritive.choices.mode import mode_choices
-from pybritive.choices.output_format import output_format_choices
 from pybritive.helpers.split import profile_split
+from pybritive.helpers.storage import atomic_write, locked
 
 
 def extract_tenant(tenant_key):
@@ -42,12 +39,18 @@ non_tenant_sections = ['global', 'profile-aliases', 'aws', 'gcp']
 global_fields = [
     'auto_refresh_kube_config',
     'auto_refresh_profile_cache',
+    'awscredentialprocess_refresh_ahead_seconds',
     'ca_bundle',
+    'cloud_lookup_ttl_seconds',
     'credential_backend',
+    'credential_refresh_ahead_seconds',
     'default_tenant',
+    'kube_config_layout',
+    'kube_exec_refresh_ahead_seconds',
     'output_format',
     'my_access_retrieval_limit',
     'my_resources_retrieval_limit',
+    'profile_catalog_ttl_seconds',
 ]
 
 tenant_fields = ['name', 'output_format', 'sso_idp']
@@ -130,6 +133,8 @@ class ConfigManager:
         self.loaded = True
 
     def get_tenant(self):
+        import click  # lazy load
+
         # load up the config - doing it here instead of __init__ for the configure commands since config won't
         # yet exist and we don't want to error
         self.load()  # will set self.config and other variables
@@ -161,25 +166,40 @@ class ConfigManager:
         return self.aliases_and_names.get(provided_tenant_name, {'name': name, 'alias': name})
 
     def save(self):
+        with locked(self.path):
+            self._write()
+
+    def _write(self):
         self.validate()  # ensure we are actually writing a valid config
         config = configparser.ConfigParser()
         config.optionxform = str  # maintain key case
         config.read_dict(self.config)
 
-        # write the new credentials file
-        with open(str(self.path), 'w', encoding='utf-8') as f:
-            config.write(f, space_around_delimiters=False)
+        # write the new config file
+        output = io.StringIO()
+        config.write(output, space_around_delimiters=False)
+        atomic_write(self.path, output.getvalue())
+
+    @contextlib.contextmanager
+    def _modifying(self):
+        # hold the lock across the whole read-modify-write and start from what is on disk now, so concurrent
+        # configure calls do not lose each other's changes
+        alias = self.alias
+        with locked(self.path):
+            self.load(force=True)
+            self.alias = alias
+            yield
+            self._write()
 
     def save_tenant(self, tenant: str, alias: Optional[str] = None, output_format: Optional[str] = None):
-        self.load()
         if not alias:
             alias = tenant
-        if f'tenant-{alias}' not in self.config:
-            self.config[f'tenant-{alias}'] = {}
-        self.config[f'tenant-{alias}']['name'] = tenant
-        if output_format:
-            self.config[f'tenant-{alias}']['output_format'] = output_format
-        self.save()
+        with self._modifying():
+            if f'tenant-{alias}' not in self.config:
+                self.config[f'tenant-{alias}'] = {}
+            self.config[f'tenant-{alias}']['name'] = tenant
+            if output_format:
+                self.config[f'tenant-{alias}']['output_format'] = output_format
 
     def save_global(
         self,
@@ -190,15 +210,15 @@ class ConfigManager:
         self.load()
         if not default_tenant_name and not output_format and not backend:
             return
-        if 'global' not in self.config:
-            self.config['global'] = {}
-        if default_tenant_name:
-            self.config['global']['default_tenant'] = default_tenant_name
-        if output_format:
-            self.config['global']['output_format'] = output_format
-        if backend:
-            self.config['global']['credential_backend'] = backend
-        self.save()
+        with self._modifying():
+            if 'global' not in self.config:
+                self.config['global'] = {}
+            if default_tenant_name:
+                self.config['global']['default_tenant'] = default_tenant_name
+            if output_format:
+                self.config['global']['output_format'] = output_format
+            if backend:
+                self.config['global']['credential_backend'] = backend
 
     def get_profile_aliases(self, reverse_keys: bool = False):
         self.load()
@@ -208,9 +228,9 @@ class ConfigManager:
         return aliases
 
     def save_profile_alias(self, alias, profile):
-        self.profile_aliases[alias] = profile
-        self.config['profile-aliases'] = self.profile_aliases
-        self.save()
+        with self._modifying():
+            self.profile_aliases[alias] = profile
+            self.config['profile-aliases'] = self.profile_aliases
 
     def backend(self):
         self.load()
@@ -225,15 +245,16 @@ class ConfigManager:
         return self.config.get('gcp', {}).get('gcloud_default_account', None)
 
     def update(self, section, field, value):
-        self.load()
-        if section not in self.config:
-            self.config[section] = {}
-        if field not in self.config[section]:
-            self.config[section][field] = ''
-        self.config[section][field] = value
-        self.save()
+        with self._modifying():
+            if section not in self.config:
+                self.config[section] = {}
+            if field not in self.config[section]:
+                self.config[section][field] = ''
+            self.config[section][field] = value
 
     def list(self, section: str, field: str):
+        import click  # lazy load
+
         self.load()
         try:
             if field:
@@ -245,6 +266,8 @@ class ConfigManager:
             raise click.ClickException(f'{e} does not exist') from e
 
     def validate(self):
+        import click  # lazy load
+
         self.validation_error_messages = []
         for section, fields in self.config.items():
             if section not in non_tenant_sections and not section.startswith('tenant-'):
@@ -266,6 +289,9 @@ class ConfigManager:
             raise click.ClickException('\n'.join(errors))
 
     def validate_global(self, section, fields):
+        from pybritive.choices.backend import backend_choices  # lazy load
+        from pybritive.choices.output_format import output_format_choices  # lazy load
+
         for field, value in fields.items():
             if field.replace('-', '_') not in global_fields:
                 self.validation_error_messages.append(f'Invalid {section} field {field} provided.')
@@ -281,6 +307,9 @@ class ConfigManager:
             if field.replace('-', '_') == 'auto_refresh_kube_config' and value not in ['true', 'false']:
                 error = f'Invalid {section} field {field} value {value} provided. Invalid value choice.'
                 self.validation_error_messages.append(error)
+            if field.replace('-', '_') == 'kube_config_layout' and value not in ['shared', 'per-tenant']:
+                error = f'Invalid {section} field {field} value {value} provided. Invalid value choice.'
+                self.validation_error_messages.append(error)
             if field == 'default_tenant':
                 tenant_aliases_from_sections = [extract_tenant(t) for t in self.config if t.startswith('tenant-')]
                 if value not in tenant_aliases_from_sections:
@@ -294,6 +323,9 @@ class ConfigManager:
             if field in ['my_access_retrieval_limit', 'my_resources_retrieval_limit'] and not value.isnumeric():
                 error = f'Invalid {section} field {field} value {value} provided. Must be an integer.'
                 self.validation_error_messages.append(error)
+            if field.endswith('_seconds') and not value.isnumeric():
+                error = f'Invalid {section} field {field} value {value} provided. Must be an integer.'
+                self.validation_error_messages.append(error)
 
     def validate_profile_aliases(self, section, fields):
         for field, value in fields.items():
@@ -305,6 +337,8 @@ class ConfigManager:
                 self.validation_error_messages.append(error)
 
     def validate_aws(self, section, fields):
+        from pybritive.choices.mode import mode_choices  # lazy load
+
         for field, value in fields.items():
             if field not in aws_fields:
                 self.validation_error_messages.append(f'Invalid {section} field {field} provided.')
@@ -318,6 +352,11 @@ class ConfigManager:
                 self.validation_error_messages.append(f'Invalid {section} field {field} provided.')
 
     def validate_tenant(self, section, fields):
+        import click  # lazy load
+        from britive.helpers.utils import parse_tenant  # lazy load
+
+        from pybritive.choices.output_format import output_format_choices  # lazy load
+
         for field, value in fields.items():
             if field not in tenant_fields:
                 self.validation_error_messages.append(f'Invalid {section} field {field} provided.')
@@ -343,3 +382,31 @@ class ConfigManager:
             'auto_refresh_kube_config', self.config.get('global', {}).get('auto-refresh-kube-config', 'false')
         )
         return value == 'true'
+
+    def kube_config_layout(self) -> str:
+        # shared merges every tenant into kube/config, per-tenant writes one kube config file per tenant
+        self.load()
+        value = self.config.get('global', {}).get('kube_config_layout', 'shared')
+        return value if value in ['shared', 'per-tenant'] else 'shared'
+
+    def credential_refresh_ahead_seconds(self, mode: str) -> int:
+        # a per mode setting takes precedence over the global setting, 0 disables refreshing ahead of expiration
+        self.load()
+        settings = self.config.get('global', {})
+        value = settings.get(
+            f'{mode.replace("-", "_")}_refresh_ahead_seconds', settings.get('credential_refresh_ahead_seconds', '0')
+        )
+        return int(value) if value.isnumeric() else 0
+
+    def cloud_lookup_ttl_seconds(self) -> int:
+        # instances rarely move between zones or accounts, so lookups made for ssh can be reused for a while
+        self.load()
+        value = self.config.get('global', {}).get('cloud_lookup_ttl_seconds', '86400')
+        return int(value) if value.isnumeric() else 86400
+
+    def profile_catalog_ttl_seconds(self) -> int:
+        from .catalog import default_ttl  # lazy load
+
+        self.load()
+        value = self.config.get('global', {}).get('profile_catalog_ttl_seconds', str(default_ttl))
+        return int(value) if value.isnumeric() else default_ttl
@@ -0,0 +1,81 @@
+import contextlib
+import os
+import sys
+from datetime import datetime
+from typing import Optional
+
+# the console script helpers which know how to renew the cached credentials of each mode
+helper_modules = {
+    'awscredentialprocess': 'pybritive.helpers.aws_credential_process',
+    'kube-exec': 'pybritive.helpers.k8s_exec',
+}
+
+
+def refresh_ahead_seconds(mode: str) -> int:
+    from .config import ConfigManager  # lazy load
+
+    return ConfigManager(cli=None).credential_refresh_ahead_seconds(mode=mode)
+
+
+def seconds_remaining(expiration_time: str) -> float:
+    expiration = datetime.fromisoformat(expiration_time.replace('Z', ''))
+    return (expiration - datetime.utcnow()).total_seconds()
+
+
+def within_refresh_window(expiration_time: str, window: int) -> bool:
+    # still valid, but close enough to expiring that a renewal should be kicked off
+    return 0 < seconds_remaining(expiration_time) <= window
+
+
+def refresh_args(args: dict) -> list:
+    # the command line of the refresh child - the token and passphrase are handed over through the environment
+    options = {'profile': '--profile', 'tenant': '--tenant', 'federation_provider': '--federation-provider'}
+    return [part for key, option in options.items() if args.get(key) for part in (option, args[key])]
+
+
+def spawn_refresh(mode: str, args: list, passphrase: Optional[str] = None, token: Optional[str] = None):
+    """Renew the credentials of `mode` in a detached process so the caller is not blocked by the checkout.
+
+    The child is the helper console script of the mode run with `--refresh`, so it takes the same credential
+    lock as any other checkout of the profile and quietly exits if one is already in flight.
+    """
+    import subprocess  # lazy load
+
+    env = dict(os.environ)
+    # keep secrets out of the process list, where other local users can read them
+    if passphrase:
+        env['PYBRITIVE_ENCRYPTED_CREDENTIAL_PASSPHRASE'] = passphrase
+    if token:
+        env['BRITIVE_API_TOKEN'] = token
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    # the credentials being returned are still valid so if this fails the next call will simply try again
+    with contextlib.suppress(OSError):
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, '-m', helper_modules[mode], *args, '--refresh'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            env=env,
+            **kwargs,
+        )
+
+
+def refresh_if_due(
+    mode: str,
+    expiration_time: str,
+    args: list,
+    passphrase: Optional[str] = None,
+    token: Optional[str] = None,
+    window: Optional[int] = None,
+) -> bool:
+    if window is None:  # not known to the caller, so read it from the config
+        window = refresh_ahead_seconds(mode)
+    if not window or not within_refresh_window(expiration_time, window):
+        return False
+    spawn_refresh(mode=mode, args=args, passphrase=passphrase, token=token)
+    return True
@@ -1,6 +1,7 @@
 import base64
 import configparser
 import hashlib
+import io
 import json
 import os
 import random
@@ -21,6 +22,7 @@ from dateutil import parser
 from requests.adapters import HTTPAdapter, Retry
 
 from .encryption import InvalidPassphraseException, StringEncryption
+from .storage import atomic_write, locked
 
 interactive_login_fields_to_pop = [
     'challengeParameters',
@@ -302,22 +304,25 @@ class FileCredentialManager(CredentialManager):
         return credentials.get(self.alias, None)
 
     def save(self, credentials: dict):
-        full_credentials = self.load(full=True)
-        if credentials is None:
-            full_credentials.pop(self.alias, None)
-            self.credentials = None
-        else:
-            full_credentials[self.alias] = credentials
-            # effectively a deep copy
-            self.credentials = json.loads(json.dumps(credentials))
+        # hold the lock across the read-modify-write so concurrent saves for other tenants are not lost
+        with locked(self.path):
+            full_credentials = self.load(full=True)
+            if credentials is None:
+                full_credentials.pop(self.alias, None)
+                self.credentials = None
+            else:
+                full_credentials[self.alias] = credentials
+                # effectively a deep copy
+                self.credentials = json.loads(json.dumps(credentials))
 
-        config = configparser.ConfigParser()
-        config.optionxform = str  # maintain key case
-        config.read_dict(full_credentials)
+            config = configparser.ConfigParser()
+            config.optionxform = str  # maintain key case
+            config.read_dict(full_credentials)
 
-        # write the new credentials file
-        with open(str(self.path), 'w', encoding='utf-8') as f:
-            config.write(f, space_around_delimiters=False)
+            # write the new credentials file
+            output = io.StringIO()
+            config.write(output, space_around_delimiters=False)
+            atomic_write(self.path, output.getvalue(), mode=0o600)
 
         jti = self.extract_field_from_jwt(token=(self.credentials or {}).get('accessToken'), verify=False, field='jti')
         self.cli.debug(f'credentials.py::FileCredentialManager::save - set credentials to jwt id {jti}')
@@ -357,7 +362,9 @@ class EncryptedFileCredentialManager(CredentialManager):
                 return self.get_token()
 
     def encrypt(self, decrypted_access_token: str):
-        return self.string_encryptor.encrypt(plaintext=decrypted_access_token)
+        # keep the token in the self-contained salted format - a keyed value can no longer be decrypted once its key
+        # is pruned or the keyring is removed, which would lose the login
+        return self.string_encryptor.encrypt_legacy(plaintext=decrypted_access_token)
 
     def load(self, full=False):
         path = Path(self.path)
@@ -380,23 +387,28 @@ class EncryptedFileCredentialManager(CredentialManager):
         return self.decrypt(self.credentials['accessToken'])
 
     def save(self, credentials: dict):
-        full_credentials = self.load(full=True)
-        if credentials is None:
-            full_credentials.pop(self.alias, None)
-            self.credentials = None
-        else:
+        if credentials is not None:
             credentials['accessToken'] = self.encrypt(credentials['accessToken'])
-            full_credentials[self.alias] = credentials
-            # effectively a deep copy
-            self.credentials = json.loads(json.dumps(credentials))
 
-        config = configparser.ConfigParser()
-        config.optionxform = str  # maintain key case
-        config.read_dict(full_credentials)
-
-        # write the new credentials file
-        with open(str(self.path), 'w', encoding='utf-8') as f:
-            config.write(f, space_around_delimiters=False)
+        # hold the lock across the read-modify-write so concurrent saves for other tenants are not lost
+        with locked(self.path):
+            full_credentials = self.load(full=True)
+            if credentials is None:
+                full_credentials.pop(self.alias, None)
+                self.credentials = None
+            else:
+                full_credentials[self.alias] = credentials
+                # effectively a deep copy
+                self.credentials = json.loads(json.dumps(credentials))
+
+            config = configparser.ConfigParser()
+            config.optionxform = str  # maintain key case
+            config.read_dict(full_credentials)
+
+            # write the new credentials file
+            output = io.StringIO()
+            config.write(output, space_around_delimiters=False)
+            atomic_write(self.path, output.getvalue(), mode=0o600)
 
         jti = self.extract_field_from_jwt(token=(self.credentials or {}).get('accessToken'), verify=False, field='jti')
         self.cli.debug(f'credentials.py::FileCredentialManager::save - set credentials to jwt id {jti}')
@@ -1,53 +1,242 @@
 import base64
+import functools
 import hashlib
+import json
 import os
-import platform
+import time
 from getpass import getuser
-from typing import Optional
+from pathlib import Path
+from typing import Callable, Optional
 
 from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from .storage import atomic_write, locked
+
+kdf_iterations = 100000
+# the machine passphrase is derived from values anyone able to read ~/.britive can look up, so stretching it protects
+# nothing - a single round lets every new helper process unwrap the data key without tens of milliseconds of PBKDF2
+machine_kdf_iterations = 1
+keyed_prefix = 'v2'
+# keys no cached entry is encrypted with are dropped once they are this old, leaving time for the entry to be written
+keyring_prune_age = 86400
+
+# wrapping keys and verifiers derived from a passphrase during this process, keyed by
+# (keyring path, salt, iterations, passphrase)
+_derived_keys = {}
+# data keys unwrapped during this process, keyed by (keyring path, key id, passphrase)
+_unwrapped_keys = {}
+
 
 class InvalidPassphraseException(Exception):
     pass
 
 
+def _machine_identity() -> list:
+    # platform.uname() shells out to `uname -p` every time it is called, so remember its answer next to the
+    # os.uname() values it was derived from and only ask again when those change
+    if not hasattr(os, 'uname'):  # windows
+        import platform  # lazy load
+
+        return list(platform.uname()._asdict().values())
+
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    path = Path(home) / '.britive' / 'cache' / 'machine.json'
+    current = list(os.uname())
+    try:
+        cached = json.loads(path.read_text(encoding='utf-8'))
+        if cached['uname'] == current:
+            return cached['identity']
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    import platform  # lazy load
+
+    identity = list(platform.uname()._asdict().values())
+    atomic_write(str(path), json.dumps({'uname': current, 'identity': identity}))
+    return identity
+
+
+@functools.lru_cache(maxsize=None)
+def machine_passphrase() -> str:
+    # the default passphrase when none is provided, tied to the current user and machine
+    return hashlib.sha256('|'.join([getuser(), *_machine_identity()]).replace(' ', '').encode('utf-8')).hexdigest()
+
+
 class StringEncryption:
-    def __init__(self, passphrase: Optional[str] = None):
-        self.passphrase = (
-            passphrase
-            or hashlib.sha256(
-                '|'.join([getuser(), *platform.uname()._asdict().values()]).replace(' ', '').encode('utf-8')
-            ).hexdigest()
-        )
+    """Encrypts strings with a per-keyring data key which is wrapped by a key derived from the passphrase.
+
+    Ciphertexts are formatted as `v2:<key id>:<fernet token>`. The key derived from the passphrase also yields a
+    verifier stored next to each wrapped data key, so the key of a passphrase is found with a single derivation however
+    many keys the keyring holds. Self-contained `<ciphertext>:<salt>` values, which derive a key from the passphrase for
+    every single entry, are still written by `encrypt_legacy` for values which must not depend on the keyring, and both
+    formats are decrypted by `decrypt`.
+
+    `referenced_keys` returns the ids of the keys still in use. Without it no key is ever removed from the keyring.
+    """
+
+    def __init__(
+        self,
+        passphrase: Optional[str] = None,
+        keyring_path: Optional[str] = None,
+        referenced_keys: Optional[Callable[[], set]] = None,
+    ):
+        self.iterations = kdf_iterations if passphrase else machine_kdf_iterations
+        self.passphrase = passphrase or machine_passphrase()
+        home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+        self.keyring_path = keyring_path or str(Path(home) / '.britive' / 'pybritive.keyring')
+        self.referenced_keys = referenced_keys
 
     @staticmethod
     def _salt():
         return base64.b64encode(os.urandom(32)).decode('utf-8')
 
-    def _key(self, salt: str):
+    def _key(self, salt: str, iterations: int = kdf_iterations):
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
             salt=base64.b64decode(salt.encode()),
-            iterations=100000,
-            backend=default_backend(),
+            iterations=iterations,
         )
         return base64.urlsafe_b64encode(kdf.derive(self.passphrase.encode()))
 
+    def _derive(self, salt: str, iterations: int) -> tuple:
+        # one derivation gives both the wrapping key and the verifier telling which keyring entry it unwraps
+        memo_key = (self.keyring_path, salt, iterations, self.passphrase)
+        if memo_key not in _derived_keys:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=64,
+                salt=base64.b64decode(salt.encode()),
+                iterations=iterations,
+            )
+            derived = kdf.derive(self.passphrase.encode())
+            _derived_keys[memo_key] = (base64.urlsafe_b64encode(derived[:32]), hashlib.sha256(derived[32:]).hexdigest())
+        return _derived_keys[memo_key]
+
+    @staticmethod
+    def is_legacy(ciphertext: str) -> bool:
+        return not ciphertext.startswith(f'{keyed_prefix}:')
+
+    @staticmethod
+    def key_id(ciphertext: str) -> Optional[str]:
+        """The id of the keyring key a ciphertext is encrypted with, None for self-contained values."""
+        if StringEncryption.is_legacy(ciphertext):
+            return None
+        return ciphertext.split(':')[1]
+
+    def _load_keyring(self) -> dict:
+        try:
+            keyring = json.loads(Path(self.keyring_path).read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            keyring = {}
+        return {'keys': {}, **keyring}
+
+    def _write_keyring(self, keyring: dict):
+        atomic_write(self.keyring_path, json.dumps(keyring, indent=2), mode=0o600)
+
+    def _unwrap(self, key_id: str, keyring: Optional[dict] = None) -> Fernet:
+        memo_key = (self.keyring_path, key_id, self.passphrase)
+        if memo_key not in _unwrapped_keys:
+            keyring = keyring or self._load_keyring()
+            entry = keyring['keys'].get(key_id)
+            if not entry:  # the key this was encrypted with no longer exists
+                raise InvalidPassphraseException
+            if 'verifier' in entry:
+                wrapping_key, verifier = self._derive(keyring['salt'], entry['iterations'])
+                if verifier != entry['verifier']:
+                    raise InvalidPassphraseException
+            else:  # written by an earlier release, wrapped with a salt of its own
+                wrapping_key = self._key(entry['salt'], iterations=entry.get('iterations', kdf_iterations))
+            try:
+                data_key = Fernet(wrapping_key).decrypt(entry['wrapped_key'].encode('utf-8'))
+            except InvalidToken as e:
+                raise InvalidPassphraseException from e
+            if 'verifier' not in entry:
+                self._upgrade_key(key_id, data_key)
+            _unwrapped_keys[memo_key] = Fernet(data_key)
+        return _unwrapped_keys[memo_key]
+
+    def _upgrade_key(self, key_id: str, data_key: bytes):
+        # wrap the key again under the same id, the entries encrypted with it stay as they are
+        with locked(self.keyring_path):
+            keyring = self._load_keyring()
+            if 'verifier' not in keyring['keys'].get(key_id, {'verifier': None}):
+                self._add_key(keyring, key_id, data_key)
+
+    def _find_key(self, keyring: dict) -> Optional[tuple]:
+        if 'salt' not in keyring:
+            return None
+        _, verifier = self._derive(keyring['salt'], self.iterations)
+        for key_id, entry in keyring['keys'].items():
+            if entry.get('verifier') == verifier and entry.get('iterations') == self.iterations:
+                return key_id, self._unwrap(key_id, keyring)
+        return None
+
+    def _add_key(self, keyring: dict, key_id: str, data_key: bytes):
+        # called with the keyring lock held and the keyring freshly loaded
+        keyring.setdefault('salt', self._salt())
+        wrapping_key, verifier = self._derive(keyring['salt'], self.iterations)
+        keyring['keys'][key_id] = {
+            'verifier': verifier,
+            'iterations': self.iterations,
+            'wrapped_key': Fernet(wrapping_key).encrypt(data_key).decode('utf-8'),
+            'created': int(time.time()),
+        }
+        if self.referenced_keys:
+            # keys of mistyped or abandoned passphrases are dropped, never one a cached entry is still encrypted with
+            referenced = self.referenced_keys()
+            cutoff = int(time.time()) - keyring_prune_age
+            keyring['keys'] = {
+                k: e
+                for k, e in keyring['keys'].items()
+                if k == key_id or k in referenced or e.get('created', 0) > cutoff
+            }
+        self._write_keyring(keyring)
+
+    def _data_key(self) -> tuple:
+        found = self._find_key(self._load_keyring())
+        if found:
+            return found
+
+        # the lock ensures processes racing to mint a key for the same passphrase all end up sharing one
+        with locked(self.keyring_path):
+            keyring = self._load_keyring()
+            found = self._find_key(keyring)
+            if found:
+                return found
+            import uuid  # lazy load
+
+            key_id = uuid.uuid4().hex[:16]
+            data_key = Fernet.generate_key()
+            self._add_key(keyring, key_id, data_key)
+        _unwrapped_keys[(self.keyring_path, key_id, self.passphrase)] = Fernet(data_key)
+        return key_id, _unwrapped_keys[(self.keyring_path, key_id, self.passphrase)]
+
     def encrypt(self, plaintext: str) -> str:
+        key_id, fernet = self._data_key()
+        return f'{keyed_prefix}:{key_id}:{fernet.encrypt(plaintext.encode("utf-8")).decode("utf-8")}'
+
+    def decrypt(self, ciphertext: str):
+        if self.is_legacy(ciphertext):
+            return self.decrypt_legacy(ciphertext)
+        try:
+            _, key_id, token = ciphertext.split(':')
+            return self._unwrap(key_id).decrypt(token.encode('utf-8')).decode('utf-8')
+        except (InvalidToken, ValueError) as e:
+            raise InvalidPassphraseException from e
+
+    def encrypt_legacy(self, plaintext: str) -> str:
         salt = self._salt()
         key = self._key(salt)
         ciphertext = Fernet(key).encrypt(plaintext.encode('utf-8'))
         return f'{base64.b64encode(ciphertext).decode("utf-8")}:{salt}'
 
-    def decrypt(self, ciphertext: str):
+    def decrypt_legacy(self, ciphertext: str):
         try:
             ciphertext, b64salt = ciphertext.split(':')
             key = self._key(b64salt)
             return Fernet(key).decrypt(base64.b64decode(ciphertext.encode())).decode('utf-8')
-        except InvalidToken as e:
+        except (InvalidToken, ValueError) as e:  # ValueError covers malformed values, including bad base64
             raise InvalidPassphraseException from e
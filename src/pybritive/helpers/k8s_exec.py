@@ -6,14 +6,17 @@ def get_args():
     from getopt import getopt  # lazy load
 
     options = getopt(
-        argv[1:], 't:T:p:F:hv', ['tenant=', 'token=', 'passphrase=', 'federation-provider=', 'help', 'version']
+        argv[1:],
+        't:T:p:F:hv',
+        ['tenant=', 'token=', 'passphrase=', 'federation-provider=', 'help', 'version', 'refresh'],
     )[0]
 
     args = {
         'tenant': None,
-        'token': None,
+        'token': os.getenv('BRITIVE_API_TOKEN'),
         'passphrase': os.getenv('PYBRITIVE_ENCRYPTED_CREDENTIAL_PASSPHRASE'),
         'federation_provider': None,
+        'refresh': False,  # internal - set when renewing credentials inside the refresh ahead window
     }
 
     for opt, arg in options:
@@ -25,6 +28,8 @@ def get_args():
             args['passphrase'] = arg
         if opt in ('-F', '--federation-provider'):
             args['federation_provider'] = arg
+        if opt == '--refresh':
+            args['refresh'] = True
         if opt in ('-h', '--help'):
             usage()
         if opt in ('-v', '--version'):
@@ -43,6 +48,84 @@ def usage():
     exit(0)
 
 
+def get_cached_entry(args, k8s_processor):
+    from .cache import Cache  # lazy load
+
+    entry = Cache(passphrase=args['passphrase']).get_credentials_entry(
+        profile_name=k8s_processor.profile, mode='kube-exec'
+    )
+    if entry:
+        from datetime import datetime  # lazy load
+
+        expiration = datetime.fromisoformat(entry['credentials']['expirationTime'].replace('Z', ''))
+        now = datetime.utcnow()
+        if now > expiration:  # creds have expired so set to none so new one get checked out
+            entry = None
+    return entry
+
+
+def get_cached_credentials(args, k8s_processor):
+    entry = get_cached_entry(args, k8s_processor)
+    return entry['credentials'] if entry else None
+
+
+def get_agent_credentials(args, k8s_processor):
+    if args['token']:  # the agent serves its own identity so leave static tokens to the regular path
+        return None
+
+    from .agent import get_credentials  # lazy load
+
+    return get_credentials(mode='kube-exec', profile=k8s_processor.profile, tenant=args['tenant'])
+
+
+def checkout(args, k8s_processor, renew=False):
+    from pybritive.britive_cli import BritiveCli  # lazy load for performance purposes
+
+    b = BritiveCli(
+        tenant_name=args['tenant'],
+        token=args['token'],
+        passphrase=args['passphrase'],
+        federation_provider=args['federation_provider'],
+        silent=True,
+        from_helper_console_script=True,
+    )
+    b.config.get_tenant()  # have to load the config here as that work is generally done elsewhere
+    b.checkout(
+        alias=None,
+        blocktime=None,
+        console=False,
+        justification=None,
+        mode='kube-exec',
+        maxpolltime=None,
+        profile=k8s_processor.profile,
+        passphrase=args['passphrase'],
+        force_renew=None,
+        aws_credentials_file=None,
+        gcloud_key_file=None,
+        verbose=None,
+        extend=False,
+        otp=None,
+        renew=renew,
+    )
+
+
+def refresh(args, k8s_processor):
+    from .credential_refresh import refresh_ahead_seconds, within_refresh_window  # lazy load
+    from .lock import credential_lock  # lazy load
+
+    lock = credential_lock(tenant=args['tenant'], mode='kube-exec', profile=k8s_processor.profile)
+    if not lock.acquire(blocking=False):  # a checkout of this profile is already in flight
+        return
+    try:
+        window = refresh_ahead_seconds(mode='kube-exec')
+        creds = get_cached_credentials(args, k8s_processor)
+        if creds and not within_refresh_window(creds['expirationTime'], window):
+            return  # another process already renewed them
+        checkout(args, k8s_processor, renew=True)  # extends the checkout, the credentials handed out stay valid
+    finally:
+        lock.release()
+
+
 def main():
     args = get_args()
 
@@ -50,50 +133,42 @@ def main():
 
     k8s_processor = KubernetesExecCredentialProcessor()
 
-    from .cache import Cache  # lazy load
-
-    creds = Cache(passphrase=args['passphrase']).get_credentials(profile_name=k8s_processor.profile, mode='kube-exec')
-    if creds:
-        from datetime import datetime  # lazy load
+    if args['refresh']:
+        refresh(args, k8s_processor)
+        exit()
 
-        expiration = datetime.fromisoformat(creds['expirationTime'].replace('Z', ''))
-        now = datetime.utcnow()
-        if now > expiration:  # creds have expired so set to none so new one get checked out
-            creds = None
-        else:
-            print(k8s_processor.construct_exec_credential(creds))
-            exit()
+    # a running agent already holds the session and decrypted credentials in memory
+    if creds := get_agent_credentials(args, k8s_processor):
+        print(k8s_processor.construct_exec_credential(creds))
+        exit()
 
-    if not creds:
-        from pybritive.britive_cli import BritiveCli  # lazy load for performance purposes
+    if entry := get_cached_entry(args, k8s_processor):
+        print(k8s_processor.construct_exec_credential(entry['credentials']))
+        from .credential_refresh import refresh_args, refresh_if_due  # lazy load
 
-        b = BritiveCli(
-            tenant_name=args['tenant'],
-            token=args['token'],
-            passphrase=args['passphrase'],
-            federation_provider=args['federation_provider'],
-            silent=True,
-            from_helper_console_script=True,
-        )
-        b.config.get_tenant()  # have to load the config here as that work is generally done elsewhere
-        b.checkout(
-            alias=None,
-            blocktime=None,
-            console=False,
-            justification=None,
+        # hand back the still valid credentials right away and renew them in the background if they expire soon
+        refresh_if_due(
             mode='kube-exec',
-            maxpolltime=None,
-            profile=k8s_processor.profile,
+            expiration_time=entry['credentials']['expirationTime'],
+            args=refresh_args(args),
             passphrase=args['passphrase'],
-            force_renew=None,
-            aws_credentials_file=None,
-            gcloud_key_file=None,
-            verbose=None,
-            extend=False,
-            otp=None,
+            token=args['token'],
+            window=entry['refresh_ahead_seconds'],
         )
         exit()
 
+    from .lock import credential_lock  # lazy load
+
+    # only one process checks out a given profile at a time - any others wait here and then pick up
+    # the credentials the first process wrote to the cache
+    with credential_lock(tenant=args['tenant'], mode='kube-exec', profile=k8s_processor.profile):
+        if creds := get_cached_credentials(args, k8s_processor):
+            print(k8s_processor.construct_exec_credential(creds))
+            exit()
+
+        checkout(args, k8s_processor)
+    exit()
+
 
 if __name__ == '__main__':
     main()
@@ -1,13 +1,24 @@
 import base64
+import hashlib
+import json
 import os
 import shutil
 from pathlib import Path
+from typing import Optional
 
 import yaml
 
 from pybritive.britive_cli import BritiveCli
 
 from .config import ConfigManager
+from .storage import atomic_write, locked
+
+# bump when the generated kube config changes shape so configs written by older releases are regenerated
+kube_config_format = 1
+
+# the libyaml backed loader and dumper are an order of magnitude faster, fall back to pure python without libyaml
+yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+yaml_dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
 
 
 def sanitize(name: str):
@@ -36,33 +47,83 @@ def check_env_var(filename, cli: BritiveCli):
 
 
 def merge_new_with_existing(clusters, contexts, users, filename, tenant):
-    # get the existing config, so we can pop out all
-    # items related to this tenant as we will be replacing
-    # them with the above created items
-    existing_kubeconfig = {}
-    if Path(filename).exists():
-        with open(filename, encoding='utf-8') as f:
-            existing_kubeconfig = yaml.safe_load(f) or {}
-
-    prefix = f'{tenant}-'
-    for cluster in existing_kubeconfig.get('clusters', []):
-        if not cluster.get('name', '').startswith(prefix):
-            clusters.append(cluster)
-
-    for context in existing_kubeconfig.get('contexts', []):
-        cluster_name = context.get('context', {}).get('cluster', '')
-        if not cluster_name.startswith(prefix):
-            contexts.append(context)
-
-    for user in existing_kubeconfig.get('users', []):
-        if not user.get('name', '').startswith(prefix):
-            users.append(user)
-
+    # other tenants refreshing at the same time merge into the same file, so hold the lock from reading to writing
+    with locked(filename):
+        # get the existing config, so we can pop out all
+        # items related to this tenant as we will be replacing
+        # them with the above created items
+        existing_kubeconfig = {}
+        if Path(filename).exists():
+            with open(filename, encoding='utf-8') as f:
+                existing_kubeconfig = yaml.load(f, Loader=yaml_loader) or {}
+
+        prefix = f'{tenant}-'
+        for cluster in existing_kubeconfig.get('clusters', []):
+            if not cluster.get('name', '').startswith(prefix):
+                clusters.append(cluster)
+
+        for context in existing_kubeconfig.get('contexts', []):
+            cluster_name = context.get('context', {}).get('cluster', '')
+            if not cluster_name.startswith(prefix):
+                contexts.append(context)
+
+        for user in existing_kubeconfig.get('users', []):
+            if not user.get('name', '').startswith(prefix):
+                users.append(user)
+
+        write_kube_config(clusters=clusters, contexts=contexts, users=users, filename=filename)
+
+
+def write_kube_config(clusters, contexts, users, filename):
     kubeconfig = {'apiVersion': 'v1', 'clusters': clusters, 'contexts': contexts, 'users': users, 'kind': 'Config'}
 
-    # write out the config file
-    with open(filename, 'w', encoding='utf-8') as f:
-        yaml.safe_dump(kubeconfig, f, default_flow_style=False, encoding='utf-8')
+    # write out the config file, readers never see it half written
+    atomic_write(filename, yaml.dump(kubeconfig, Dumper=yaml_dumper, default_flow_style=False))
+
+
+class KubeConfigFragments:
+    """Index of the per tenant kube config files under kube/tenants, used with the per-tenant layout.
+
+    The index is kube/tenants.json, mapping each tenant to its file. kube/kubeconfig-path holds the paths of all the
+    files joined with the path separator, ready to be appended to the KUBECONFIG environment variable.
+    """
+
+    def __init__(self, kube_dir: Path):
+        self.kube_dir = kube_dir
+        self.index_path = str(kube_dir / 'tenants.json')
+        self.helper_path = str(kube_dir / 'kubeconfig-path')
+
+    def path(self, tenant: str) -> str:
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in tenant)
+        return str(self.kube_dir / 'tenants' / f'{safe}.yaml')
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(Path(self.index_path).read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return {}
+
+    def _update(self, tenant: str, path: Optional[str]):
+        with locked(self.index_path):
+            index = self._read()
+            if path:
+                index[tenant] = path
+            else:
+                index.pop(tenant, None)
+            atomic_write(self.index_path, json.dumps(index, sort_keys=True))
+            atomic_write(self.helper_path, os.pathsep.join(index[t] for t in sorted(index)))
+
+    def write(self, tenant: str, clusters, contexts, users) -> str:
+        filename = self.path(tenant)
+        write_kube_config(clusters=clusters, contexts=contexts, users=users, filename=filename)
+        if self._read().get(tenant) != filename:
+            self._update(tenant, filename)
+        return filename
+
+    def remove(self, tenant: str):
+        Path(self.path(tenant)).unlink(missing_ok=True)
+        if tenant in self._read():
+            self._update(tenant, None)
 
 
 def parse_profiles(profiles, aliases):
@@ -105,10 +166,22 @@ def valid_cert(cert: str, profile: str, cli: BritiveCli):
         return False
 
 
-def build_tenant_config(tenant, cluster_names, username, cli: BritiveCli):
-    kube_exec_full_path = shutil.which('pybritive-kube-exec')
-    if not kube_exec_full_path:
-        kube_exec_full_path = 'pybritive-kube-exec'
+def kube_exec_path() -> str:
+    return shutil.which('pybritive-kube-exec') or 'pybritive-kube-exec'
+
+
+def cert_hash(cert: str) -> str:
+    return hashlib.sha256(cert.encode('utf-8')).hexdigest()
+
+
+def build_tenant_config(tenant, cluster_names, username, cli: BritiveCli, valid_certs: Optional[set] = None):
+    """Build the clusters, contexts and users of the tenant.
+
+    `valid_certs` holds the hashes of certificates already known to be valid, which are not decoded again. Newly
+    validated certificates are added to it.
+    """
+    kube_exec_full_path = kube_exec_path()
+    valid_certs = set() if valid_certs is None else valid_certs
     users = (
         [
             {
@@ -139,8 +212,10 @@ def build_tenant_config(tenant, cluster_names, username, cli: BritiveCli):
         cert = details['cert']
         url = details['url']
 
-        if not valid_cert(cert=cert, profile=details['profile'], cli=cli):
-            continue
+        if cert_hash(cert) not in valid_certs:
+            if not valid_cert(cert=cert, profile=details['profile'], cli=cli):
+                continue
+            valid_certs.add(cert_hash(cert))
 
         for name in names:
             clusters.append(
@@ -172,34 +247,106 @@ def build_tenant_config(tenant, cluster_names, username, cli: BritiveCli):
     return [clusters, contexts, users]
 
 
-def build_kube_config(profiles: list, config: ConfigManager, username: str, cli: BritiveCli):
-    tenant = config.get_tenant()['alias'].lower()  # must be run first to set the tenant alias in the config
+def fingerprint(tenant: str, profiles: list, aliases: dict, layout: str = 'shared') -> str:
+    """Hash of everything the tenant's part of the kube config is generated from, bar the username.
+
+    The username only names the user entry, the credentials themselves are resolved by pybritive-kube-exec for the
+    tenant, so it is left out rather than asking the tenant who the user is on every refresh.
+    """
+    inputs = {
+        'format': kube_config_format,
+        'layout': layout,
+        'tenant': tenant,
+        'exec': kube_exec_path(),
+        'profiles': sorted(profiles, key=lambda p: json.dumps(p, sort_keys=True, default=str)),
+        'aliases': aliases,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class KubeConfigState:
+    """Per tenant fingerprint of the last generated kube config and the certificates found valid, in kube/state.json."""
+
+    def __init__(self, kube_dir: Path):
+        self.path = str(kube_dir / 'state.json')
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(Path(self.path).read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return {}
+
+    def get(self, tenant: str) -> dict:
+        return self._read().get(tenant, {})
+
+    def save(self, tenant: str, fingerprint: str, clusters: int, valid_certs: set, layout: str = 'shared'):
+        with locked(self.path):
+            state = self._read()
+            state[tenant] = {
+                'fingerprint': fingerprint,
+                'layout': layout,
+                'clusters': clusters,
+                'valid_certs': sorted(valid_certs),
+            }
+            atomic_write(self.path, json.dumps(state))
 
-    # something unique that is not likely to clash with any other username that may be present in a kube config file
-    # add the tenant details which will mean 1 user per tenant
-    username = f'{tenant}-{username}'
+
+def build_kube_config(profiles: list, config: ConfigManager, cli: BritiveCli, username: Optional[str] = None):
+    """Generate the tenant's part of the Britive managed kube config, unless it is unchanged since the last refresh.
+
+    Without a `username` the user is looked up through the cli, which is only done when the config is regenerated.
+    """
+    tenant = config.get_tenant()['alias'].lower()  # must be run first to set the tenant alias in the config
 
     # grab the aliases
     aliases = config.get_profile_aliases(reverse_keys=True)
 
+    # calculate the path for the config
+    kube_dir = Path(config.base_path) / 'kube'
+    kube_dir.mkdir(exist_ok=True)
+    shared_filename = str(kube_dir / 'config')
+    fragments = KubeConfigFragments(kube_dir)
+    layout = config.kube_config_layout()
+    filename = fragments.path(tenant) if layout == 'per-tenant' else shared_filename
+
+    # nothing to do when the config was last generated from the very same profiles
+    state = KubeConfigState(kube_dir)
+    previous = state.get(tenant)
+    current = fingerprint(tenant=tenant, profiles=profiles, aliases=aliases, layout=layout)
+    if previous.get('fingerprint') == current and Path(filename).exists():
+        if previous.get('clusters'):
+            check_env_var(filename=filename, cli=cli)
+        return
+
+    # something unique that is not likely to clash with any other username that may be present in a kube config file
+    # add the tenant details which will mean 1 user per tenant
+    username = f'{tenant}-{username or cli.whoami()["username"]}'
+
     # parse all the profiles
     cluster_names, assigned_aliases = parse_profiles(profiles, aliases)
 
     # establish the 3 elements of the config
+    valid_certs = set(previous.get('valid_certs', []))
     clusters, contexts, users = build_tenant_config(
-        tenant=tenant, cluster_names=cluster_names, username=username, cli=cli
+        tenant=tenant, cluster_names=cluster_names, username=username, cli=cli, valid_certs=valid_certs
     )
-
-    # calculate the path for the config
-    kube_dir = Path(config.base_path) / 'kube'
-    kube_dir.mkdir(exist_ok=True)
-    filename = str(kube_dir / 'config')
-
-    # merge any existing config with the new config
-    # and write it to disk
-    merge_new_with_existing(clusters=clusters, contexts=contexts, users=users, tenant=tenant, filename=filename)
+    cluster_count = len(clusters)
+    valid_certs &= {cert_hash(details['cert']) for details in cluster_names.values()}  # forget removed clusters
+
+    if layout == 'per-tenant':
+        # only this tenant's file is written, other tenants are neither read nor rewritten
+        fragments.write(tenant=tenant, clusters=clusters, contexts=contexts, users=users)
+        if previous.get('layout', 'shared') == 'shared' and Path(shared_filename).exists():
+            # drop what an earlier refresh merged into the shared config so contexts are not defined twice
+            merge_new_with_existing(clusters=[], contexts=[], users=[], tenant=tenant, filename=shared_filename)
+    else:
+        # merge any existing config with the new config
+        # and write it to disk
+        merge_new_with_existing(clusters=clusters, contexts=contexts, users=users, tenant=tenant, filename=filename)
+        fragments.remove(tenant)
+    state.save(tenant=tenant, fingerprint=current, clusters=cluster_count, valid_certs=valid_certs, layout=layout)
 
     # if required ensure we tell the user they need to modify their KUBECONFIG env var
     # in order to pick up the Britive managed kube config file
-    if len(clusters) > 0:
+    if cluster_count > 0:
         check_env_var(filename=filename, cli=cli)
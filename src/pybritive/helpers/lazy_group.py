@@ -0,0 +1,24 @@
+import importlib
+from typing import Optional
+
+import click
+
+
+class LazyGroup(click.Group):
+    """Click group which only imports the module of a subcommand when that subcommand is resolved.
+
+    `lazy_subcommands` maps each command name to the `module:attribute` of the click command implementing it.
+    """
+
+    def __init__(self, *args, lazy_subcommands: Optional[dict] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.lazy_subcommands:
+            return super().get_command(ctx, cmd_name)
+        module_name, attribute = self.lazy_subcommands[cmd_name].split(':')
+        return getattr(importlib.import_module(module_name), attribute)
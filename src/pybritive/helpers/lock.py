@@ -0,0 +1,96 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class FileLock:
+    """Advisory, cross-process exclusive lock backed by a lock file.
+
+    The OS releases the lock if the holding process dies, so a crashed holder can never wedge other processes.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None, poll_interval: float = 0.05):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.fd = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking: bool = True) -> bool:
+        Path(self.path).parent.mkdir(exist_ok=True, parents=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        started = time.monotonic()
+        while not self._try_lock():
+            if not blocking or (self.timeout is not None and time.monotonic() - started >= self.timeout):
+                os.close(self.fd)
+                self.fd = None
+                if not blocking:
+                    return False
+                raise LockTimeout(f'could not acquire lock {self.path} within {self.timeout} seconds')
+            time.sleep(self.poll_interval)
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def _tenant_name(tenant: Optional[str]) -> Optional[str]:
+    # resolve the default tenant and aliases to the tenant name, so all spellings of a tenant share one lock
+    import click  # lazy load
+
+    from .config import ConfigManager  # lazy load
+
+    try:
+        return ConfigManager(cli=None, tenant_name=tenant).get_tenant()['name']
+    except click.ClickException:  # the checkout reports the problem with the config, lock on what we were given
+        return tenant
+
+
+def credential_lock_key(tenant: Optional[str], mode: str, profile: str) -> str:
+    # one lock per (tenant, mode, profile) so only a single process checks out a given profile at a time
+    key = '|'.join([(_tenant_name(tenant) or '').lower(), mode, profile.lower()])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def credential_lock(tenant: Optional[str], mode: str, profile: str, timeout: Optional[float] = None) -> FileLock:
+    home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+    name = credential_lock_key(tenant=tenant, mode=mode, profile=profile)
+    return FileLock(path=str(Path(home) / '.britive' / 'locks' / f'{name}.lock'), timeout=timeout)
@@ -0,0 +1,43 @@
+import functools
+import json
+from typing import Iterable, Iterator
+
+
+def json_array_chunks(rows: Iterable, indent: int = 2) -> Iterator[str]:
+    """Yield the text of `json.dumps(list(rows), indent=indent, default=str)` one element at a time."""
+    padding = ' ' * indent
+    first = True
+    for row in rows:
+        element = json.dumps(row, indent=indent, default=str).replace('\n', f'\n{padding}')
+        yield f'{"[" if first else ","}\n{padding}{element}'
+        first = False
+    yield '[]' if first else '\n]'
+
+
+def yaml_dump(data: object) -> str:
+    """Dump `data` as yaml directly, representing what json would via `default=str` as strings."""
+    import yaml  # lazy load
+
+    return yaml.dump(data, Dumper=_yaml_dumper())
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_dumper():
+    import datetime  # lazy load
+
+    import yaml  # lazy load
+
+    class Dumper(yaml.SafeDumper):
+        pass
+
+    def represent_other(dumper, data):
+        if isinstance(data, dict):
+            return dumper.represent_dict(data)
+        if isinstance(data, (list, tuple)):
+            return dumper.represent_list(data)
+        return dumper.represent_str(str(data))
+
+    for type_ in (datetime.date, datetime.datetime, tuple):
+        Dumper.add_representer(type_, represent_other)
+    Dumper.add_multi_representer(object, represent_other)
+    return Dumper
@@ -0,0 +1,98 @@
+from typing import Callable, Optional
+
+
+class PagedResponse:
+    """Items of a paginated listing, requesting each page only once the previous one has been consumed."""
+
+    def __init__(self, first: dict, items: Callable, next_page: Callable):
+        self.first = first
+        self.items = items
+        self.next_page = next_page
+
+    def pages(self):
+        page = self.first
+        self.first = None  # do not hold on to the first page while the rest are consumed
+        while page is not None:
+            yield self.items(page)
+            page = self.next_page(page)
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
+
+# number of items requested per page, as the sdk does
+page_size = 100
+
+
+def _identities(identity_type: str) -> Callable:
+    def listing(filter_expression: Optional[str] = None, include_tags: bool = False):
+        params = {'type': identity_type}
+        if filter_expression:
+            params['filter'] = filter_expression
+        if include_tags:
+            params['includeTags'] = 'true'
+        return 'users', params
+
+    return listing
+
+
+def _identity_search(identity_type: str) -> Callable:
+    def search(search_string: str):
+        return 'users', {'type': identity_type, 'searchText': search_string}
+
+    return search
+
+
+def _tags(filter_expression: Optional[str] = None):
+    return 'user-tags', {'filter': filter_expression} if filter_expression else {}
+
+
+def _tag_search(search_string: str):
+    return 'user-tags', {'searchText': search_string}
+
+
+def _tag_users(tag_id: str, filter_expression: Optional[str] = None):
+    return f'user-tags/{tag_id}/users', {'filter': filter_expression} if filter_expression else {}
+
+
+# the SDK methods which can be streamed, each mapped to a function taking the parameters of the method and returning
+# the endpoint (relative to the tenant api) and query parameters the method lists through inline pagination
+streamable_methods = {
+    'identity_management.users.list': _identities('User'),
+    'identity_management.users.search': _identity_search('User'),
+    'identity_management.service_identities.list': _identities('ServiceIdentity'),
+    'identity_management.service_identities.search': _identity_search('ServiceIdentity'),
+    'identity_management.tags.list': _tags,
+    'identity_management.tags.search': _tag_search,
+    'identity_management.tags.users_for_tag': _tag_users,
+}
+
+
+def inline_pages(get_page: Callable, url: str, params: dict) -> PagedResponse:
+    """Page through an endpoint paginated inline, i.e. with `count`, `page`, `size` and `data` in each response body.
+
+    `get_page` is called with the url and query parameters of a single page and returns the parsed response.
+    """
+    params = {**params, 'page': 0, 'size': page_size}
+
+    def next_page(page):
+        if page['size'] * (page['page'] + 1) >= page['count']:
+            return None
+        return get_page(url, {**params, 'page': page['page'] + 1})
+
+    return PagedResponse(get_page(url, params), items=lambda page: page['data'], next_page=next_page)
+
+
+def is_element_wise(parsed: dict) -> bool:
+    """Whether a parsed JMESPath expression maps or filters each element of a list on its own.
+
+    Such an expression gives the same result applied page by page as applied to the whole list, e.g. `[].email`,
+    `[*].name` or `[?status=='active'].email`.
+    """
+    if parsed['type'] not in ['projection', 'filter_projection']:
+        return False
+    left = parsed['children'][0]
+    if left['type'] == 'flatten':
+        left = left['children'][0]
+    return left['type'] == 'identity'
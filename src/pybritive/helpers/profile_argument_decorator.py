@@ -17,6 +17,10 @@ def validate_profile(ctx, param, value):
     return value
 
 
+def validate_profiles(ctx, param, value):
+    return (validate_profile(ctx, param, value),)
+
+
 def is_required():
     return 'KUBERNETES_EXEC_INFO' not in os.environ
 
@@ -30,3 +34,13 @@ def click_smart_profile_argument(func):
 
     dec = click.argument('profile', **kwargs)
     return dec(func)
+
+
+def click_smart_profiles_argument(func):
+    # same as above but accepting any number of profiles, the caller enforces that at least one is given
+    kwargs = {'nargs': -1, 'shell_complete': profile_completer}
+    if not is_required():
+        kwargs['callback'] = validate_profiles
+
+    dec = click.argument('profile', **kwargs)
+    return dec(func)
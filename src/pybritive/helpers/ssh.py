@@ -0,0 +1,247 @@
+import os
+import uuid
+from pathlib import Path
+from sys import argv, exit, stderr
+from typing import Optional
+
+
+def generate_key_pair() -> dict:
+    # doing imports here as these packages are not a requirement to use pybritive in general
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    pem_private_key = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+    pem_public_key = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH
+    )
+
+    return {'private': pem_private_key, 'public': pem_public_key}
+
+
+def generate_key(ssh_dir: Path, username: str, hostname: str, key_source: str) -> dict:
+    # these 3 ship with python3.x
+    import glob
+    import subprocess
+    import time
+
+    key_pair = generate_key_pair()
+
+    # let's do the right thing and clean up old ephemeral keys
+    ssh_dir.mkdir(exist_ok=True, parents=True)  # create the directory if it doesn't exist already
+    if key_source == 'ssh-agent':
+        # cleanup any old ssh keys that were randomly generated
+        now = int(time.time())
+        for key in glob.glob(f'{ssh_dir!s}/random-*'):
+            file = key.split('/')[-1].split('.')[0]
+            expiration = int(file.split('-')[2])
+            if expiration < now:
+                Path(key).unlink(missing_ok=True)
+
+        pem_file = ssh_dir / f'random-{uuid.uuid4().hex}-{now + 60}.pem'
+    elif key_source == 'static':
+        # clean up the specific key if it exists, so we can create a new one
+        pem_file = ssh_dir / f'{hostname}.{username}.pem'
+        pem_file.unlink(missing_ok=True)
+    else:
+        raise ValueError(f'invalid --key-source value {key_source}')
+
+    # we only need to persist the private key locally
+    # as the public key is just pushed to the ec2 instance
+    # as a string in the ec2 instance connect api call (no file
+    # reference)
+    with open(str(pem_file), 'w', encoding='utf-8') as f:
+        f.write(key_pair['private'].decode())
+    os.chmod(pem_file, 0o400)
+
+    # and if we are using ssh-agent we need to add the private key via ssh-add
+    if key_source == 'ssh-agent':
+        subprocess.run(['ssh-add', '-t', '60', '-q', str(pem_file)], check=False)
+
+    return {'private_key_filename': pem_file, 'key_pair': key_pair}
+
+
+def parse_aws_hostname(hostname: str) -> tuple:
+    """Split `instance-id[.aws-profile[.aws-region]]` into its parts, missing parts are None.
+
+    A missing profile or region drops to the standard aws boto3/cli provider chains.
+    """
+    helper = hostname.split('.')
+    instance_id = helper[0]
+    aws_profile = helper[1] if len(helper) > 1 else None
+    aws_region = helper[2] if len(helper) > 2 else None
+    return instance_id, aws_profile, aws_region
+
+
+def ssm_proxy_command(instance_id: str, port_number: str, aws_profile: Optional[str], aws_region: Optional[str]) -> str:
+    commands = [
+        'aws',
+        'ssm',
+        'start-session',
+        f'--parameters portNumber={port_number}',
+        '--document-name AWS-StartSSHSession',
+        f'--target {instance_id}',
+    ]
+
+    if aws_profile:
+        commands.append(f'--profile {aws_profile}')
+    if aws_region:
+        commands.append(f'--region {aws_region}')
+
+    return ' '.join(commands)
+
+
+def aws_client(aws_profile: Optional[str], aws_region: Optional[str], service: str):
+    """Return a boto3 client for the given profile and region.
+
+    Raises ImportError when boto3 is not installed.
+    """
+    import boto3  # lazy load
+
+    return boto3.Session(profile_name=aws_profile, region_name=aws_region).client(service)
+
+
+def push_aws_key(
+    cache, ttl: int, aws_profile: Optional[str], aws_region: Optional[str], instance_id: str, username: str, key_pair
+):
+    """Push the public key to the instance via EC2 Instance Connect.
+
+    The availability zone EC2 Instance Connect needs is kept in the lookup cache, so describing the instance is only
+    needed the first time an instance is connected to. An instance never leaves its availability zone, but a cached
+    zone which is rejected is looked up again once in case the entry is somehow stale.
+    """
+    from botocore.exceptions import ClientError  # lazy load
+
+    key = f'{aws_profile or ""}/{aws_region or ""}/{instance_id}'
+    cached = cache.get_lookup('aws-instance-zones', key)
+    eic = aws_client(aws_profile, aws_region, 'ec2-instance-connect')
+
+    while True:
+        if cached:
+            az = cached['zone']
+        else:
+            ec2 = aws_client(aws_profile, aws_region, 'ec2')
+            az = ec2.describe_instances(InstanceIds=[instance_id])['Reservations'][0]['Instances'][0]['Placement'][
+                'AvailabilityZone'
+            ]
+            cache.save_lookup('aws-instance-zones', key, value={'zone': az}, ttl=ttl)
+
+        try:
+            eic.send_ssh_public_key(
+                InstanceId=instance_id,
+                InstanceOSUser=username,
+                SSHPublicKey=key_pair['public'].decode(),
+                AvailabilityZone=az,
+            )
+            return
+        except ClientError:
+            if not cached:
+                raise
+            cache.clear_lookup('aws-instance-zones', key)
+            cached = None
+
+
+def get_args():
+    from getopt import GetoptError, getopt  # lazy load
+
+    try:
+        options = getopt(
+            argv[1:],
+            'h:u:p:Pk:v',
+            ['hostname=', 'username=', 'port-number=', 'push-public-key', 'key-source=', 'help', 'version'],
+        )[0]
+    except GetoptError as e:
+        print(str(e), file=stderr)
+        usage(status=1)
+
+    args = {
+        'hostname': None,
+        'username': None,
+        'port_number': None,
+        'push_public_key': False,
+        'key_source': 'ssh-agent',
+    }
+
+    for opt, arg in options:
+        if opt in ('-h', '--hostname'):
+            args['hostname'] = arg
+        if opt in ('-u', '--username'):
+            args['username'] = arg
+        if opt in ('-p', '--port-number'):
+            args['port_number'] = arg
+        if opt in ('-P', '--push-public-key'):
+            args['push_public_key'] = True
+        if opt in ('-k', '--key-source'):
+            args['key_source'] = arg
+        if opt == '--help':
+            usage()
+        if opt in ('-v', '--version'):
+            from importlib.metadata import version
+            from platform import platform, python_version  # lazy load
+
+            cli_version = version('pybritive')
+            print(f'pybritive: {cli_version} / platform: {platform()} / python: {python_version()}')
+            exit(0)
+
+    if not args['hostname'] or not args['port_number'] or (args['push_public_key'] and not args['username']):
+        usage(status=1)
+    if args['key_source'] not in ('ssh-agent', 'static'):
+        print(f'invalid --key-source value {args["key_source"]}', file=stderr)
+        exit(1)
+    return args
+
+
+def usage(status=0):
+    print(
+        f'Usage : {argv[0]} -h/--hostname HOST -p/--port-number PORT '
+        '[-u/--username USER -P/--push-public-key -k/--key-source ssh-agent|static]',
+        file=stderr if status else None,
+    )
+    exit(status)
+
+
+def main():
+    """Fast path of `pybritive ssh aws ssm-proxy` for use as an OpenSSH ProxyCommand.
+
+    Neither the cli nor the Britive SDK is loaded and boto3 is only imported when a key has to be pushed.
+    """
+    args = get_args()
+    instance_id, aws_profile, aws_region = parse_aws_hostname(args['hostname'])
+
+    if args['push_public_key']:
+        from .cache import Cache  # lazy load
+        from .config import ConfigManager  # lazy load
+
+        home = os.getenv('PYBRITIVE_HOME_DIR', str(Path.home()))
+        details = generate_key(
+            ssh_dir=Path(home) / '.britive' / 'ssh',
+            username=args['username'],
+            hostname=args['hostname'],
+            key_source=args['key_source'],
+        )
+        try:
+            push_aws_key(
+                cache=Cache(),
+                ttl=ConfigManager(cli=None).cloud_lookup_ttl_seconds(),
+                aws_profile=aws_profile,
+                aws_region=aws_region,
+                instance_id=instance_id,
+                username=args['username'],
+                key_pair=details['key_pair'],
+            )
+        except ImportError:
+            print('required packages not found. run `pip3 install pybritive[aws]`', file=stderr)
+            exit(1)
+
+    print(ssm_proxy_command(instance_id, args['port_number'], aws_profile, aws_region))
+    exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+from .lock import FileLock
+
+# generous upper bound - writers only hold these locks for the duration of a small read-modify-write
+default_lock_timeout = 30
+
+
+def locked(path: str, timeout: Optional[float] = default_lock_timeout) -> FileLock:
+    """Exclusive advisory lock guarding read-modify-write cycles of the file at `path`."""
+    return FileLock(path=f'{path}.lock', timeout=timeout)
+
+
+def read_text(path: str, default: str = '') -> str:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return default
+
+
+def atomic_write(path: str, content: str, mode: Optional[int] = None):
+    """Write `content` to a temp file in the same directory and atomically swap it into place.
+
+    Readers see either the previous or the new content in full, never a truncated file.
+    """
+    target = Path(path)
+    target.parent.mkdir(exist_ok=True, parents=True)
+    tmp = target.with_name(f'.{target.name}.{os.urandom(16).hex()}.tmp')
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,11 @@
+import click
+
+option = click.option(
+    '--all',
+    '-A',
+    'all_checked_out',
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help='Checkin every currently checked out profile.',
+)
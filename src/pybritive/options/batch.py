@@ -0,0 +1,10 @@
+import click
+
+option = click.option(
+    '--batch',
+    default=None,
+    type=click.File('r', encoding='utf-8'),
+    help='Path to a file, or - for stdin, with one json object per line holding the `method` to run and optionally '
+    'its `parameters`, a `query` and an `id`. Calls run concurrently over one session and each result is written '
+    'as a line of json.',
+)
@@ -0,0 +1,10 @@
+import click
+
+option = click.option(
+    '--manifest',
+    '-M',
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help='Path to a YAML or JSON file listing the profiles to checkout, each optionally with its own mode, alias, '
+    'justification, console, profile_type, ticket_type and ticket_id. Other options are the defaults for each entry.',
+)
@@ -0,0 +1,9 @@
+import click
+
+option = click.option(
+    '--ordered',
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help='Write batch results in input order instead of as calls complete.',
+)
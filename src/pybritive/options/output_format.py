@@ -8,7 +8,7 @@ option = click.option(
     'output_format',  # format is a reserved word so method parameter will be output_format
     default=None,
     help=(
-        'Display output format. Valid values are (json, yaml, csv, table[-format]). '
+        'Display output format. Valid values are (json, ndjson, yaml, csv, table[-format]). '
         'If `table` is used an optional table format can be specified as `table-format`. '
         'Valid table formats can be found here: https://github.com/astanin/python-tabulate#table_format. '
         'Example: `table-pretty`.'
@@ -0,0 +1,10 @@
+import click
+
+option = click.option(
+    '--stream',
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help='Consume identity listings page by page, writing results as each page arrives. A --query mapping or '
+    'filtering each element, e.g. `[].email`, is applied to each page.',
+)
@@ -1,12 +1,12 @@
-import platform
-from importlib.metadata import version
-
 import click
 
 
 # for --version we need to print the version and exit - nothing more, nothing less
 def version_callback(ctx, self, value):
     if value:
+        import platform  # lazy load
+        from importlib.metadata import version  # lazy load
+
         cli_version = version('pybritive')
         click.echo(f'pybritive: {cli_version} / platform: {platform.platform()} / python: {platform.python_version()}')
         raise click.exceptions.Exit
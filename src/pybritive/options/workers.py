@@ -0,0 +1,10 @@
+import click
+
+option = click.option(
+    '--workers',
+    '-w',
+    default=8,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help='Maximum number of profiles or calls processed at the same time.',
+)
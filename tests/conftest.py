@@ -1,10 +1,13 @@
 import os
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
 from click.testing import CliRunner
 
 from pybritive import cli_interface
+from pybritive.britive_cli import BritiveCli
 
 
 def rm_tree(pth: Path):
@@ -56,3 +59,98 @@ def cli():
 def unset_api_token_env_var():
     if os.getenv(name := 'BRITIVE_API_TOKEN'):
         del os.environ[name]
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """A home directory with the `example` tenant configured."""
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    (tmp_path / '.britive').mkdir()
+    (tmp_path / '.britive' / 'pybritive.config').write_text('[tenant-example]\nname = example\n', encoding='utf-8')
+    return tmp_path
+
+
+def new_cli(sdk=None, output_format: str = 'json', silent: bool = True) -> BritiveCli:
+    """A cli for the `example` tenant which talks to the given fake sdk instead of logging in."""
+    cli = BritiveCli(tenant_name='example', silent=silent)
+    cli.tenant_name = 'example'
+    cli.b = sdk
+    cli.login = lambda *args, **kwargs: None
+    cli.set_output_format(output_format)
+    return cli
+
+
+class FakeMyAccess:
+    """My access of a single application with a single profile, available in each of the given environments.
+
+    Environments are given as `(id, name, alternate name)` tuples or as plain names, which double as the id.
+    """
+
+    def __init__(self, environments=(), profile: str = 'Reader', app: str = 'Application', app_type: str = 'AWS'):
+        self.environments = [e if isinstance(e, tuple) else (e, e, e.lower()) for e in environments]
+        self.profile = profile
+        self.app = app
+        self.app_type = app_type
+        self.lists = 0
+        self.user_id = 'user-1'
+
+    def whoami(self):
+        return {'userId': self.user_id, 'username': f'{self.user_id}@example.com'}
+
+    def list(self, search_text=None, size=None):
+        self.lists += 1
+        return {
+            'count': len(self.environments),
+            'accesses': [
+                {'appContainerId': 'app-1', 'environmentId': env_id, 'papId': 'pap-1'}
+                for env_id, _, _ in self.environments
+            ],
+            'apps': [
+                {
+                    'appContainerId': 'app-1',
+                    'appDescription': None,
+                    'catalogAppDisplayName': self.app,
+                    'catalogAppName': self.app_type,
+                    'requiresHierarchicalModel': False,
+                }
+            ],
+            'environments': [
+                {
+                    'environmentId': env_id,
+                    'environmentName': name,
+                    'alternateEnvironmentName': alternate_name,
+                    'environmentDescription': None,
+                    'profileEnvironmentProperties': {},
+                }
+                for env_id, name, alternate_name in self.environments
+            ],
+            'profiles': [{'papId': 'pap-1', 'papName': self.profile, 'papDescription': None, 'sessionAttributes': []}],
+        }
+
+
+class FakeSdk:
+    def __init__(self, my_access=None, my_resources=None, feature_flags=None, **components):
+        self.my_access = my_access
+        self.my_resources = my_resources
+        self.feature_flags = feature_flags or {}
+        for name, component in components.items():
+            setattr(self, name, component)
+
+
+def run_python(*args, check: bool = False, **env) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter, with the given variables added to the environment."""
+    environment = {**os.environ, **env}
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)  # measure imports, not compiling them
+    return subprocess.run([sys.executable, *args], capture_output=True, check=check, text=True, env=environment)
+
+
+def total_import_ms(stderr: str) -> float:
+    # sum the cumulative time of the top level imports reported by -X importtime
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isnumeric() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1000
@@ -0,0 +1,161 @@
+import json
+from pathlib import Path
+
+import pytest
+from cryptography.fernet import Fernet
+
+from pybritive.helpers import credentials, encryption
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.credentials import EncryptedFileCredentialManager
+from pybritive.helpers.encryption import InvalidPassphraseException, StringEncryption
+
+from .conftest import run_python
+
+CREDENTIALS = {
+    'accessKeyID': 'AKIAEXAMPLE',
+    'secretAccessKey': 'secret',
+    'sessionToken': 'token',
+    'expirationTime': '2099-01-01T00:00:00Z',
+}
+
+
+@pytest.fixture(autouse=True)
+def local_home(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    forget_keys(monkeypatch)
+    encryption.machine_passphrase.cache_clear()  # remembers the machine.json of the home it was first asked in
+    yield tmp_path
+    encryption.machine_passphrase.cache_clear()
+
+
+def forget_keys(monkeypatch):
+    # start over with nothing derived or unwrapped, as a new process would
+    monkeypatch.setattr(encryption, '_derived_keys', {})
+    monkeypatch.setattr(encryption, '_unwrapped_keys', {})
+
+
+def test_keyed_round_trip():
+    ciphertext = StringEncryption(passphrase='test').encrypt('hello')
+    assert ciphertext.startswith('v2:')
+    assert StringEncryption(passphrase='test').decrypt(ciphertext) == 'hello'
+
+
+def test_keyed_wrong_passphrase(monkeypatch):
+    ciphertext = StringEncryption(passphrase='test').encrypt('hello')
+    forget_keys(monkeypatch)
+    with pytest.raises(InvalidPassphraseException):
+        StringEncryption(passphrase='wrong').decrypt(ciphertext)
+
+
+def test_legacy_entries_are_migrated(local_home):
+    legacy = StringEncryption(passphrase='test').encrypt_legacy(json.dumps(CREDENTIALS))
+    legacy_cache = local_home / '.britive' / 'pybritive.cache'
+    legacy_cache.parent.mkdir(parents=True)
+    legacy_cache.write_text(json.dumps({'profiles': [], 'awscredentialprocess': {'app/env/profile': legacy}}))
+
+    cache = Cache(passphrase='test')
+    assert not legacy_cache.exists()
+    assert cache.get_credentials(profile_name='App/Env/Profile') == CREDENTIALS
+
+    shard = json.loads(Path(cache.credentials_path('app/env/profile')).read_text(encoding='utf-8'))
+    assert not StringEncryption.is_legacy(shard['ciphertext'])
+    assert Cache(passphrase='test').get_credentials(profile_name='app/env/profile') == CREDENTIALS
+
+
+def test_key_of_a_passphrase_is_found_with_one_derivation(monkeypatch):
+    for i in range(5):
+        StringEncryption(passphrase=f'other-{i}').encrypt('value')
+    ciphertext = StringEncryption(passphrase='test').encrypt('hello')
+    forget_keys(monkeypatch)
+
+    derivations = []
+    kdf = encryption.PBKDF2HMAC
+
+    def counting_kdf(**kwargs):
+        derivations.append(kwargs['salt'])
+        return kdf(**kwargs)
+
+    monkeypatch.setattr(encryption, 'PBKDF2HMAC', counting_kdf)
+    assert StringEncryption(passphrase='test').encrypt('hello').split(':')[1] == ciphertext.split(':')[1]
+    assert len(derivations) == 1
+
+
+def test_keys_in_use_are_never_pruned(monkeypatch):
+    monkeypatch.setattr(encryption, 'keyring_prune_age', 0)
+    Cache(passphrase='test').save_credentials(profile_name='app/env/profile', credentials=CREDENTIALS)
+    for i in range(5):  # mistyped passphrases, each minting a key nothing is encrypted with
+        Cache(passphrase=f'typo-{i}').string_encryptor.encrypt('value')
+    forget_keys(monkeypatch)
+
+    assert Cache(passphrase='test').get_credentials(profile_name='app/env/profile') == CREDENTIALS
+    keyring = json.loads(Path(StringEncryption().keyring_path).read_text(encoding='utf-8'))
+    assert len(keyring['keys']) == 2  # the key in use and the newest typo
+
+
+def test_keys_of_earlier_releases_are_upgraded_in_place(monkeypatch):
+    # a data key wrapped the way earlier releases did, with a salt of its own and no verifier
+    encryptor = StringEncryption(passphrase='test')
+    data_key = Fernet.generate_key()
+    salt = encryptor._salt()
+    wrapped_key = Fernet(encryptor._key(salt)).encrypt(data_key).decode('utf-8')
+    keyring = {'keys': {'old': {'salt': salt, 'iterations': encryption.kdf_iterations, 'wrapped_key': wrapped_key}}}
+    Path(encryptor.keyring_path).parent.mkdir(parents=True)
+    Path(encryptor.keyring_path).write_text(json.dumps(keyring), encoding='utf-8')
+    ciphertext = f'v2:old:{Fernet(data_key).encrypt(b"hello").decode("utf-8")}'
+
+    assert encryptor.decrypt(ciphertext) == 'hello'
+    forget_keys(monkeypatch)
+    assert 'verifier' in json.loads(Path(encryptor.keyring_path).read_text(encoding='utf-8'))['keys']['old']
+    assert StringEncryption(passphrase='test').decrypt(ciphertext) == 'hello'
+    assert StringEncryption(passphrase='test').encrypt('hello').startswith('v2:old:')
+
+
+HIT = """
+import sys
+import time
+
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.encryption import StringEncryption  # both paths import cryptography, leave that out
+
+started = time.perf_counter()
+assert Cache().get_credentials(profile_name='app/env/profile')
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def hit_ms(home, shard: Path, entry: dict, runs: int = 3) -> float:
+    timings = []
+    for _ in range(runs):
+        shard.write_text(json.dumps(entry), encoding='utf-8')  # a legacy entry is rewritten as keyed on each hit
+        timings.append(float(run_python('-c', HIT, check=True, PYBRITIVE_HOME_DIR=str(home)).stdout))
+    return min(timings)
+
+
+def test_hit_path_latency_in_a_new_process(local_home):
+    # the helpers run as a new process for every call, with the machine passphrase unless one is configured
+    cache = Cache()
+    cache.save_credentials(profile_name='app/env/profile', credentials=CREDENTIALS)
+    shard = Path(cache.credentials_path('app/env/profile'))
+    keyed = json.loads(shard.read_text(encoding='utf-8'))
+    legacy = {**keyed, 'ciphertext': StringEncryption().encrypt_legacy(json.dumps(CREDENTIALS))}
+
+    before = hit_ms(local_home, shard, legacy)
+    after = hit_ms(local_home, shard, keyed)
+    print(f'\ncache hit in a new process - salted per entry: {before:.1f} ms, keyed: {after:.1f} ms')
+    assert after * 5 < before
+
+
+@pytest.mark.parametrize('ciphertext', ['v2:only-key-id', 'v2:a:b:c', 'no-salt', 'not base64!:c2FsdA=='])
+def test_malformed_ciphertext(ciphertext):
+    with pytest.raises(InvalidPassphraseException):
+        StringEncryption(passphrase='test').decrypt(ciphertext)
+
+
+def test_stored_token_does_not_depend_on_keyring(local_home, monkeypatch):
+    monkeypatch.setattr(credentials, 'parse_tenant', lambda tenant: f'{tenant}.britive-app.com')
+    cli = type('Cli', (), {'print': staticmethod(print)})()
+    manager = EncryptedFileCredentialManager(tenant_name='example', tenant_alias='example', cli=cli, passphrase='test')
+    ciphertext = manager.encrypt('token')
+    StringEncryption(passphrase='test').encrypt('value')
+    (local_home / '.britive' / 'pybritive.keyring').unlink()
+    assert StringEncryption(passphrase='test').decrypt(ciphertext) == 'token'
@@ -0,0 +1,112 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from pybritive import britive_cli
+from pybritive.helpers import aws_credential_process, k8s_exec, lock
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.k8s_exec_credential_builder import KubernetesExecCredentialProcessor
+
+CREDENTIALS = {
+    'accessKeyID': 'AKIAEXAMPLE',
+    'secretAccessKey': 'secret',
+    'sessionToken': 'token',
+    'expirationTime': '2099-01-01T00:00:00Z',
+    'jwt': 'kube-token',
+}
+PROFILE = 'app/env/profile'
+PROCESSES = 8
+
+
+def credential_process_worker(home: str, helper: str, tenant, queue, blocked):
+    os.environ['PYBRITIVE_HOME_DIR'] = home
+    os.environ['KUBERNETES_EXEC_INFO'] = json.dumps(
+        {
+            'apiVersion': 'client.authentication.k8s.io/v1',
+            'spec': {'cluster': {'config': {'britive-profile': PROFILE}}},
+        }
+    )
+
+    try_lock = lock.FileLock._try_lock
+
+    def counting_try_lock(self):
+        # count each process once it finds the credential lock taken
+        acquired = try_lock(self)
+        if not acquired and 'locks' in Path(self.path).parts and not getattr(self, 'counted', False):
+            self.counted = True
+            blocked.release()
+        return acquired
+
+    lock.FileLock._try_lock = counting_try_lock
+
+    class FakeConfig:
+        @staticmethod
+        def get_tenant():
+            return {'name': 'example', 'alias': 'example'}
+
+    class FakeBritiveCli:
+        def __init__(self, **kwargs):
+            self.config = FakeConfig()
+
+        def checkout(self, profile, passphrase, mode, **kwargs):
+            with open(Path(home) / 'checkouts', 'a', encoding='utf-8') as f:
+                f.write(f'{os.getpid()}\n')
+            for _ in range(PROCESSES - 1):  # hold the lock until every other process is blocked on it
+                assert blocked.acquire(timeout=60)
+            Cache(passphrase=passphrase).save_credentials(profile_name=profile, credentials=CREDENTIALS, mode=mode)
+            if mode == 'awscredentialprocess':
+                aws_credential_process.print_credentials(CREDENTIALS)
+            else:
+                print(KubernetesExecCredentialProcessor().construct_exec_credential(CREDENTIALS))
+
+    britive_cli.BritiveCli = FakeBritiveCli
+    tenant_args = ['--tenant', tenant] if tenant else []
+    if helper == 'aws':
+        sys.argv[:] = ['pybritive-aws-cred-process', '--profile', PROFILE, '--passphrase', 'test', *tenant_args]
+        main = aws_credential_process.main
+    else:
+        sys.argv[:] = ['pybritive-kube-exec', '--passphrase', 'test', *tenant_args]
+        k8s_exec.argv = sys.argv  # bound when the module was imported
+        main = k8s_exec.main
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.suppress(SystemExit):
+            main()
+    finally:
+        queue.put(output.getvalue())
+
+
+@pytest.mark.parametrize('helper', ['aws', 'kube'])
+def test_concurrent_cache_misses_checkout_once(tmp_path, helper):
+    # the default tenant and the same tenant named explicitly, by name or alias, must share a lock
+    (tmp_path / '.britive').mkdir()
+    (tmp_path / '.britive' / 'pybritive.config').write_text(
+        '[global]\ndefault_tenant = example\n\n[tenant-example]\nname = example.britive-app.com\n', encoding='utf-8'
+    )
+    tenants = [None, 'example', 'example.britive-app.com', 'EXAMPLE']
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    blocked = context.Semaphore(0)
+    workers = [
+        context.Process(target=credential_process_worker, args=(str(tmp_path), helper, tenants[i % 4], queue, blocked))
+        for i in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    outputs = [queue.get(timeout=90) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    checkouts = (tmp_path / 'checkouts').read_text(encoding='utf-8').splitlines()
+    assert len(checkouts) == 1
+    for output in outputs:
+        if helper == 'aws':
+            assert json.loads(output)['AccessKeyId'] == CREDENTIALS['accessKeyID']
+        else:
+            assert json.loads(output)['status']['token'] == CREDENTIALS['jwt']
@@ -0,0 +1,78 @@
+import configparser
+import json
+import multiprocessing
+import os
+from pathlib import Path
+
+from britive.helpers import utils
+
+from pybritive.helpers import credentials
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.config import ConfigManager
+
+WORKERS = 8
+WRITES = 15
+
+
+class FakeCli:
+    class config:  # noqa: N801
+        global_ca_bundle = None
+
+    @staticmethod
+    def debug(data, ignore_silent=False):
+        pass
+
+    @staticmethod
+    def print(data, ignore_silent=False):
+        pass
+
+
+def writer(home: str, worker: int):
+    os.environ['PYBRITIVE_HOME_DIR'] = home
+
+    # avoid the tenant health check
+    credentials.parse_tenant = utils.parse_tenant = lambda tenant: f'{tenant}.britive-app.com'
+
+    for i in range(WRITES):
+        Cache().save_profiles([f'app/env/profile-{worker}-{i}'])
+        Cache().save_banner(tenant=f'tenant-{worker}-{i}', banner={'message': 'hello'})
+        Cache(passphrase='test').save_credentials(
+            profile_name=f'app/env/profile-{worker}-{i}', credentials={'worker': worker, 'write': i}
+        )
+        credentials.FileCredentialManager(
+            tenant_name='example', tenant_alias=f'alias-{worker}-{i}', cli=FakeCli()
+        ).save({'accessToken': f'token-{worker}-{i}', 'safeExpirationTime': 0})
+        ConfigManager(cli=FakeCli()).save_tenant(tenant=f'{worker}-{i}.britive-app.com', alias=f'alias-{worker}-{i}')
+
+
+def test_concurrent_writers_lose_no_entries(tmp_path, monkeypatch):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=writer, args=(str(tmp_path), w)) for w in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    expected = {f'{w}-{i}' for w in range(WORKERS) for i in range(WRITES)}
+    cache = Cache(passphrase='test')
+    assert {p.replace('app/env/profile-', '') for p in cache.get_profiles()} == expected
+
+    banners = json.loads(Path(cache.banners_path).read_text(encoding='utf-8'))
+    assert {t.replace('tenant-', '') for t in banners} == expected
+
+    for key in expected:
+        worker, write = key.split('-')
+        assert cache.get_credentials(profile_name=f'app/env/profile-{key}') == {
+            'worker': int(worker),
+            'write': int(write),
+        }
+
+    stored = configparser.ConfigParser()
+    stored.read(str(tmp_path / '.britive' / 'pybritive.credentials'))
+    assert {s.replace('alias-', '') for s in stored.sections()} == expected
+
+    stored = configparser.ConfigParser()
+    stored.read(str(tmp_path / '.britive' / 'pybritive.config'))
+    assert {s.replace('tenant-alias-', '') for s in stored.sections()} == expected
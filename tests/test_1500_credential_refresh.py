@@ -0,0 +1,235 @@
+import contextlib
+import io
+import json
+import subprocess
+from datetime import datetime, timedelta
+
+import pytest
+from britive.exceptions import TransactionNotFound
+
+from pybritive import britive_cli
+from pybritive.helpers import aws_credential_process, credential_refresh
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.config import ConfigManager
+from pybritive.helpers.lock import credential_lock
+
+PROFILE = 'app/env/profile'
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    (tmp_path / '.britive').mkdir()
+    return tmp_path
+
+
+def configure(home, **settings):
+    lines = ['[global]'] + [f'{k} = {v}' for k, v in settings.items()]
+    (home / '.britive' / 'pybritive.config').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def cache_credentials(expires_in: int, refresh_ahead_seconds=None):
+    expiration = (datetime.utcnow() + timedelta(seconds=expires_in)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    credentials = {
+        'accessKeyID': 'AKIAEXAMPLE',
+        'secretAccessKey': 'secret',
+        'sessionToken': 'token',
+        'expirationTime': expiration,
+    }
+    Cache(passphrase='test').save_credentials(
+        profile_name=PROFILE, credentials=credentials, refresh_ahead_seconds=refresh_ahead_seconds
+    )
+    return credentials
+
+
+def run_helper(monkeypatch, *args):
+    monkeypatch.setattr(aws_credential_process, 'argv', ['pybritive-aws-cred-process', *args])
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.suppress(SystemExit):
+        aws_credential_process.main()
+    return output.getvalue()
+
+
+def record_checkouts(monkeypatch):
+    checkouts = []
+
+    class FakeConfig:
+        @staticmethod
+        def get_tenant():
+            return {'name': 'example', 'alias': 'example'}
+
+    class FakeBritiveCli:
+        def __init__(self, **kwargs):
+            self.config = FakeConfig()
+
+        def checkout(self, **kwargs):
+            checkouts.append(kwargs)
+
+    monkeypatch.setattr(britive_cli, 'BritiveCli', FakeBritiveCli)
+    return checkouts
+
+
+def record_spawns(monkeypatch):
+    spawned = []
+    monkeypatch.setattr(credential_refresh, 'spawn_refresh', lambda **kwargs: spawned.append(kwargs))
+    return spawned
+
+
+def test_mode_setting_overrides_global_setting(home):
+    configure(home, credential_refresh_ahead_seconds=300, kube_exec_refresh_ahead_seconds=120)
+    config = ConfigManager(cli=None)
+    assert config.credential_refresh_ahead_seconds(mode='awscredentialprocess') == 300
+    assert config.credential_refresh_ahead_seconds(mode='kube-exec') == 120
+
+
+def test_refresh_disabled_by_default(home):
+    configure(home)
+    assert ConfigManager(cli=None).credential_refresh_ahead_seconds(mode='awscredentialprocess') == 0
+
+
+def test_credentials_inside_window_are_returned_and_renewed_in_background(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    credentials = cache_credentials(expires_in=60)
+    spawned = record_spawns(monkeypatch)
+    checkouts = record_checkouts(monkeypatch)
+
+    output = run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test')
+
+    assert json.loads(output)['Expiration'] == credentials['expirationTime']
+    assert not checkouts
+    assert len(spawned) == 1
+    assert spawned[0]['mode'] == 'awscredentialprocess'
+
+
+def test_credentials_outside_window_are_not_renewed(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    cache_credentials(expires_in=3600)
+    spawned = record_spawns(monkeypatch)
+
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test')
+
+    assert not spawned
+
+
+def test_window_saved_with_credentials_spares_reading_the_config(home, monkeypatch):
+    configure(home)
+    cache_credentials(expires_in=60, refresh_ahead_seconds=300)
+    spawned = record_spawns(monkeypatch)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('config read on the cache hit path')
+
+    monkeypatch.setattr(ConfigManager, 'load', fail)
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test')
+
+    assert len(spawned) == 1
+
+
+def test_cache_hit_reads_the_entry_once(home, monkeypatch):
+    configure(home)
+    cache_credentials(expires_in=60, refresh_ahead_seconds=300)
+    spawned = record_spawns(monkeypatch)
+    reads = []
+    read = Cache._read
+    monkeypatch.setattr(Cache, '_read', staticmethod(lambda path, default: reads.append(path) or read(path, default)))
+
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test')
+
+    assert reads == [Cache().credentials_path(PROFILE)]
+    assert len(spawned) == 1
+
+
+def test_background_refresh_renews_without_checkin(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    cache_credentials(expires_in=60)
+    checkouts = record_checkouts(monkeypatch)
+
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test', '--refresh')
+
+    assert len(checkouts) == 1
+    assert checkouts[0]['renew']
+    assert not checkouts[0]['force_renew']  # checking the profile in would revoke the credentials handed out
+
+
+def test_background_refresh_skipped_while_checkout_in_flight(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    cache_credentials(expires_in=60)
+    checkouts = record_checkouts(monkeypatch)
+
+    with credential_lock(tenant=None, mode='awscredentialprocess', profile=PROFILE):
+        run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test', '--refresh')
+
+    assert not checkouts
+
+
+def test_background_refresh_skipped_once_already_renewed(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    cache_credentials(expires_in=3600)
+    checkouts = record_checkouts(monkeypatch)
+
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test', '--refresh')
+
+    assert not checkouts
+
+
+def test_secrets_are_kept_out_of_the_refresh_command_line(home, monkeypatch):
+    configure(home, awscredentialprocess_refresh_ahead_seconds=300)
+    cache_credentials(expires_in=60)
+    popens = []
+    monkeypatch.setattr(subprocess, 'Popen', lambda command, env, **kwargs: popens.append((command, env)))
+
+    run_helper(monkeypatch, '--profile', PROFILE, '--passphrase', 'test', '--token', 'secret-token')
+
+    [(command, env)] = popens
+    assert command[3:] == ['--profile', PROFILE, '--refresh']
+    assert not {'secret-token', 'test', '--token', '--passphrase'} & set(command)
+    assert env['BRITIVE_API_TOKEN'] == 'secret-token'
+    assert env['PYBRITIVE_ENCRYPTED_CREDENTIAL_PASSPHRASE'] == 'test'
+
+
+class FakeMyAccess:
+    def __init__(self, calls, checked_out=True):
+        self.calls = calls
+        self.checked_out = checked_out
+
+    def extend_checkout_by_name(self, **kwargs):
+        self.calls.append('extend')
+        if not self.checked_out:
+            raise TransactionNotFound
+
+
+@pytest.mark.parametrize('checked_out', [True, False])
+def test_renewal_extends_the_checkout_instead_of_checking_in(home, checked_out):
+    configure(home)
+    renewed = {**cache_credentials(expires_in=3600), 'sessionToken': 'renewed'}
+    cache_credentials(expires_in=60)  # the credentials handed out so far, inside the refresh window
+    calls = []
+
+    cli = britive_cli.BritiveCli(tenant_name='example', passphrase='test', silent=True)
+    cli.login = lambda *args, **kwargs: None
+    cli.b = type('Sdk', (), {'my_access': FakeMyAccess(calls, checked_out=checked_out)})()
+    cli.checkin = lambda **kwargs: calls.append('checkin')
+    cli._get_app_type = lambda app_container_id: 'AWS'
+    cli._checkout = lambda **params: calls.append('checkout') or {'appContainerId': 'app', 'credentials': renewed}
+
+    credentials = cli._access_checkout(
+        alias=None,
+        blocktime=None,
+        console=False,
+        extend=False,
+        force_renew=None,
+        justification=None,
+        maxpolltime=None,
+        mode='awscredentialprocess',
+        otp=None,
+        passphrase='test',
+        profile=PROFILE,
+        ticket_id=None,
+        ticket_type=None,
+        verbose=None,
+        renew=True,
+    )[2]
+
+    assert calls == ['extend', 'checkout']
+    assert credentials == renewed
+    assert Cache(passphrase='test').get_credentials(profile_name=PROFILE) == renewed
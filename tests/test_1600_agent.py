@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+import click
+import pytest
+from britive.exceptions import UnauthorizedRequest
+
+from pybritive.helpers import agent
+
+from .conftest import run_python
+
+PROFILE = 'app/env/profile'
+CREDENTIALS = {
+    'accessKeyID': 'AKIAEXAMPLE',
+    'secretAccessKey': 'secret',
+    'sessionToken': 'token',
+    'expirationTime': '2099-01-01T00:00:00Z',
+}
+
+HELPER = f"""
+import json, sys
+from pybritive.helpers import aws_credential_process
+sys.argv[:] = ['pybritive-aws-cred-process', '--profile', '{PROFILE}', '--passphrase', 'test']
+try:
+    aws_credential_process.main()
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+class FakeConfig:
+    @staticmethod
+    def credential_refresh_ahead_seconds(mode):
+        return 0
+
+
+class FakeCli:
+    tenant_name = 'example'
+
+    def __init__(self):
+        self.checkouts = []
+        self.config = FakeConfig()
+        self.logins = 0
+        self.token_valid = True
+        self.login_error = None
+        self.released = {}  # profiles whose checkout waits on the event
+        self.waiting = threading.Event()
+
+    @staticmethod
+    def _locked_lookups():
+        return {}
+
+    def login(self):
+        if self.login_error:
+            raise self.login_error
+        self.logins += 1
+        self.token_valid = True
+
+    def _access_checkout(self, **kwargs):
+        if not self.token_valid:
+            raise UnauthorizedRequest('401 - e0000 - unauthorized')
+        if kwargs['profile'] in self.released:
+            self.waiting.set()
+            assert self.released[kwargs['profile']].wait(timeout=5)
+        self.checkouts.append(kwargs)
+        return None, False, CREDENTIALS, None
+
+
+@pytest.fixture
+def running_agent(home):
+    credential_agent = agent.CredentialAgent(cli=FakeCli(), passphrase='test')
+    thread = threading.Thread(target=credential_agent.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if agent.request({'op': 'ping'}, timeout=1):
+            break
+        time.sleep(0.05)
+    yield credential_agent
+    agent.request({'op': 'stop'}, timeout=1)
+    thread.join(timeout=5)
+
+
+def test_no_agent_running(home):
+    assert agent.get_credentials(mode='awscredentialprocess', profile=PROFILE) is None
+
+
+def test_agent_checks_out_once_and_serves_from_memory(running_agent):
+    for _ in range(3):
+        assert agent.get_credentials(mode='awscredentialprocess', profile=PROFILE) == CREDENTIALS
+    assert len(running_agent.cli.checkouts) == 1
+
+
+def test_agent_declines_other_tenants_and_modes(running_agent):
+    assert agent.get_credentials(mode='awscredentialprocess', profile=PROFILE, tenant='other') is None
+    assert agent.get_credentials(mode='console', profile=PROFILE) is None
+    assert not running_agent.cli.checkouts
+
+
+def test_slow_checkout_does_not_hold_up_other_profiles(running_agent):
+    released = running_agent.cli.released[PROFILE] = threading.Event()
+    slow = threading.Thread(target=agent.get_credentials, kwargs={'mode': 'awscredentialprocess', 'profile': PROFILE})
+    slow.start()
+    assert running_agent.cli.waiting.wait(timeout=5)
+    # served while the checkout of the other profile is still waiting on its approval
+    assert agent.get_credentials(mode='awscredentialprocess', profile='app/env/other', tenant=None) == CREDENTIALS
+    assert [c['profile'] for c in running_agent.cli.checkouts] == ['app/env/other']
+    assert slow.is_alive()
+    released.set()
+    slow.join(timeout=5)
+    assert len(running_agent.cli.checkouts) == 2
+
+
+def test_agent_logs_in_again_when_the_token_is_rejected(running_agent):
+    running_agent.cli.token_valid = False
+    assert agent.get_credentials(mode='awscredentialprocess', profile=PROFILE) == CREDENTIALS
+    assert running_agent.cli.logins == 1
+    assert agent.request({'op': 'ping'})['logins'] == 1
+
+
+def test_agent_reports_failed_login(running_agent):
+    running_agent.cli.token_valid = False
+    running_agent.cli.login_error = click.ClickException('Invalid API token provided.')
+    assert agent.get_credentials(mode='awscredentialprocess', profile=PROFILE) is None
+    assert agent.get_credentials(mode='kube-exec', profile=PROFILE) is None  # not tried again
+    status = agent.request({'op': 'ping'})
+    assert not status['authenticated']
+    assert status['error'] == 'Invalid API token provided.'
+    assert not running_agent.cli.checkouts
+
+
+def test_agent_stop_removes_socket(running_agent):
+    assert agent.request({'op': 'stop'})['stopped']
+    for _ in range(100):
+        if not os.path.exists(agent.socket_path()):
+            break
+        time.sleep(0.05)
+    assert not os.path.exists(agent.socket_path())
+
+
+def test_helper_served_by_agent_skips_the_local_cache(home, running_agent):
+    # the agent saves the helper deriving the passphrase key and decrypting the cached credentials
+    for _ in range(2):
+        result = run_python('-c', HELPER, check=True, PYBRITIVE_HOME_DIR=str(home))
+        assert json.loads(result.stdout)['AccessKeyId'] == CREDENTIALS['accessKeyID']
+        modules = json.loads(result.stderr)
+        assert [m for m in modules if m.split('.')[0] == 'cryptography' or m == 'pybritive.helpers.cache'] == []
+    assert len(running_agent.cli.checkouts) == 1
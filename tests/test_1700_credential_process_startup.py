@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from pybritive.helpers.cache import Cache
+
+from .conftest import run_python, total_import_ms
+
+PROFILE = 'app/env/profile'
+
+# generous upper bound for the imports done by a cache hit, well above what it takes today, so that only a real
+# regression (e.g. pulling click, the SDK or requests back onto the hit path) trips it
+IMPORT_BUDGET_MS = 100
+
+# modules a cache hit must never need
+FORBIDDEN = ['britive', 'click', 'jmespath', 'platform', 'requests', 'subprocess', 'yaml']
+
+CACHE_HIT = f"""
+import json, sys
+from pybritive.helpers import aws_credential_process
+sys.argv[:] = ['pybritive-aws-cred-process', '--profile', '{PROFILE}']
+try:
+    aws_credential_process.main()
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    Cache().save_credentials(
+        profile_name=PROFILE,
+        credentials={
+            'accessKeyID': 'AKIAEXAMPLE',
+            'secretAccessKey': 'secret',
+            'sessionToken': 'token',
+            'expirationTime': '2099-01-01T00:00:00Z',
+        },
+    )
+    return tmp_path
+
+
+def run(home, *args):
+    return run_python(*args, check=True, PYBRITIVE_HOME_DIR=str(home))
+
+
+def test_cache_hit_imports_minimal_module_set(home):
+    result = run(home, '-c', CACHE_HIT)
+    assert json.loads(result.stdout)['AccessKeyId'] == 'AKIAEXAMPLE'
+    modules = json.loads(result.stderr)
+    assert [m for m in modules if m.split('.')[0] in FORBIDDEN] == []
+
+
+def test_cache_hit_import_time_within_budget(home):
+    run(home, '-c', CACHE_HIT)  # warm the bytecode cache
+    interpreter = min(total_import_ms(run(home, '-X', 'importtime', '-c', 'pass').stderr) for _ in range(3))
+    hit = min(total_import_ms(run(home, '-X', 'importtime', '-c', CACHE_HIT).stderr) for _ in range(3))
+    print(f'\ncache hit imports: {hit - interpreter:.1f} ms on top of interpreter startup ({interpreter:.1f} ms)')
+    assert hit - interpreter < IMPORT_BUDGET_MS
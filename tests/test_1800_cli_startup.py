@@ -0,0 +1,59 @@
+import json
+
+from .conftest import run_python, total_import_ms
+
+# well above what resolving a command takes today, but far below importing every command, the SDK and their
+# dependencies up front
+IMPORT_BUDGET_MS = 150
+
+# nothing needed to resolve a command or complete its name should pull these in
+FORBIDDEN = ['britive', 'colored', 'cryptography', 'jmespath', 'jwt', 'requests', 'tabulate', 'yaml']
+
+RESOLVE_CHECKOUT = """
+import json, sys
+import click
+from pybritive.cli_interface import cli
+cli.get_command(click.Context(cli), 'checkout')
+sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+COMPLETE = """
+import json, sys
+from pybritive.cli_interface import cli
+try:
+    cli(prog_name='pybritive')
+finally:
+    sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+def heavy(modules: list) -> list:
+    return [m for m in modules if m.split('.')[0] in FORBIDDEN]
+
+
+def test_resolving_a_command_only_imports_that_command():
+    modules = json.loads(run_python('-c', RESOLVE_CHECKOUT).stderr)
+    assert 'pybritive.commands.checkout' in modules
+    assert [m for m in modules if m.startswith('pybritive.commands.')] == ['pybritive.commands.checkout']
+    assert heavy(modules) == []
+
+
+def test_completing_command_names_stays_light(tmp_path):
+    result = run_python(
+        '-c',
+        COMPLETE,
+        _PYBRITIVE_COMPLETE='bash_complete',
+        COMP_WORDS='pybritive che',
+        COMP_CWORD='1',
+        PYBRITIVE_HOME_DIR=str(tmp_path),
+    )
+    assert result.stdout.split() == ['plain,checkin', 'plain,checkout']
+    assert heavy(json.loads(result.stderr)) == []
+
+
+def test_resolving_a_command_within_import_budget():
+    run_python('-c', RESOLVE_CHECKOUT)  # warm the bytecode cache
+    interpreter = min(total_import_ms(run_python('-X', 'importtime', '-c', 'pass').stderr) for _ in range(3))
+    resolve = min(total_import_ms(run_python('-X', 'importtime', '-c', RESOLVE_CHECKOUT).stderr) for _ in range(3))
+    print(f'\nresolving checkout imports: {resolve - interpreter:.1f} ms on top of interpreter startup')
+    assert resolve - interpreter < IMPORT_BUDGET_MS
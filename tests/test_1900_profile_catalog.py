@@ -0,0 +1,100 @@
+import pytest
+from britive import exceptions
+
+from pybritive.helpers import credentials
+
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+
+class CheckoutMyAccess(FakeMyAccess):
+    def __init__(self):
+        super().__init__(
+            environments=[('env-1', 'Development', 'dev'), ('env-2', 'Production', 'prod')],
+            profile='Admin',
+            app='AWS Sandbox',
+        )
+        self.checkouts = []
+        self.revoked = set()
+
+    def checkout(self, environment_id, profile_id, **kwargs):
+        if (environment_id, profile_id) in self.revoked:
+            raise exceptions.ForbiddenRequest('profile no longer available')
+        self.checkouts.append((environment_id, profile_id))
+        return {'appContainerId': 'app-1'}
+
+
+@pytest.fixture
+def my_access():
+    return CheckoutMyAccess()
+
+
+def checkout(cli, env='Development'):
+    return cli._checkout(
+        app_name='AWS Sandbox',
+        blocktime=None,
+        env_name=env,
+        justification=None,
+        maxpolltime=None,
+        otp=None,
+        profile_name='Admin',
+        programmatic=True,
+        ticket_id=None,
+        ticket_type=None,
+    )
+
+
+def test_second_checkout_resolves_ids_from_catalog(home, my_access):
+    checkout(new_cli(FakeSdk(my_access)))
+    checkout(new_cli(FakeSdk(my_access)), env='prod')
+    checkout(new_cli(FakeSdk(my_access)), env='env-1')
+    assert my_access.lists == 1
+    assert my_access.checkouts == [('env-1', 'pap-1'), ('env-2', 'pap-1'), ('env-1', 'pap-1')]
+
+
+def test_unknown_names_fall_back_to_listing(home, my_access):
+    checkout(new_cli(FakeSdk(my_access)))
+    my_access.environments.append(('env-3', 'Staging', 'stage'))
+    checkout(new_cli(FakeSdk(my_access)), env='Staging')
+    assert my_access.lists == 2
+    assert my_access.checkouts[-1] == ('env-3', 'pap-1')
+
+
+def test_stale_ids_are_resolved_again(home, my_access):
+    checkout(new_cli(FakeSdk(my_access)))
+    my_access.revoked.add(('env-1', 'pap-1'))
+    my_access.environments[0] = ('env-9', 'Development', 'dev')
+    checkout(new_cli(FakeSdk(my_access)))
+    assert my_access.lists == 2
+    assert my_access.checkouts[-1] == ('env-9', 'pap-1')
+
+
+def test_catalog_can_be_disabled(home, my_access):
+    (home / '.britive' / 'pybritive.config').write_text(
+        '[global]\nprofile_catalog_ttl_seconds = 0\n\n[tenant-example]\nname = example\n', encoding='utf-8'
+    )
+    checkout(new_cli(FakeSdk(my_access)))
+    checkout(new_cli(FakeSdk(my_access)))
+    assert my_access.lists == 2
+
+
+def test_app_type_from_catalog(home, my_access):
+    checkout(new_cli(FakeSdk(my_access)))
+    cli = new_cli(FakeSdk(my_access))
+    cli.login()
+    assert cli._get_app_type('app-1') == 'AWS'
+    assert my_access.lists == 1
+
+
+def test_catalog_is_kept_per_identity(home, my_access):
+    checkout(new_cli(FakeSdk(my_access)))
+    my_access.user_id = 'user-2'
+    checkout(new_cli(FakeSdk(my_access)))
+    assert my_access.lists == 2
+
+
+def test_logout_clears_catalog(home, my_access, monkeypatch):
+    monkeypatch.setattr(credentials, 'parse_tenant', lambda tenant: f'{tenant}.britive-app.com')  # no dns lookups
+    checkout(new_cli(FakeSdk(my_access)))
+    new_cli(FakeSdk(my_access)).logout()
+    checkout(new_cli(FakeSdk(my_access)))
+    assert my_access.lists == 2
@@ -0,0 +1,94 @@
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+SIZES = [1_000, 10_000]
+
+# slack for the per access comparisons of the larger listing, a quadratic dedupe does 10x as many per access
+MAX_GROWTH = 1.1
+
+
+class CountedId(str):
+    """An ID counting how often it is compared, which is what a quadratic dedupe does for every pair of accesses."""
+
+    comparisons = 0
+    __hash__ = str.__hash__
+
+    def __eq__(self, other):
+        CountedId.comparisons += 1
+        return str.__eq__(self, other)
+
+
+def synthetic_access_data(size: int) -> dict:
+    # 100 applications with 10 profiles each, the environments make up the rest - every 20th access is listed twice
+    accesses = [
+        {
+            'appContainerId': CountedId(f'app-{i % 100}'),
+            'environmentId': CountedId(f'env-{i // 1000}-{i % 100}'),
+            'papId': CountedId(f'pap-{i % 1000}'),
+        }
+        for i in range(size)
+    ]
+    accesses += accesses[::20]
+    return {
+        'count': len(accesses),
+        'accesses': accesses,
+        'apps': [
+            {
+                'appContainerId': f'app-{a}',
+                'appDescription': None,
+                'catalogAppDisplayName': f'Application {a}',
+                'catalogAppName': 'AWS',
+                'requiresHierarchicalModel': False,
+            }
+            for a in range(100)
+        ],
+        'environments': [
+            {
+                'environmentId': f'env-{e}-{a}',
+                'environmentName': f'Environment {e}-{a}',
+                'alternateEnvironmentName': f'{e}-{a}',
+                'environmentDescription': None,
+                'profileEnvironmentProperties': {},
+            }
+            for e in range(size // 1000 + 1)
+            for a in range(100)
+        ],
+        'profiles': [
+            {'papId': f'pap-{p}', 'papName': f'Profile {p}', 'papDescription': None, 'sessionAttributes': []}
+            for p in range(1000)
+        ],
+    }
+
+
+class SyntheticMyAccess(FakeMyAccess):
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+        self.data = synthetic_access_data(size)
+
+    def list(self, search_text=None, size=None):
+        return self.data
+
+
+def comparisons_per_access(size: int, list_profiles) -> float:
+    cli = new_cli(FakeSdk(SyntheticMyAccess(size)))
+    CountedId.comparisons = 0
+    list_profiles(cli)
+    return CountedId.comparisons / size
+
+
+def test_set_available_profiles_scales_linearly(home):
+    def list_profiles(cli):
+        cli._set_available_profiles()
+        assert len(cli.available_profiles) == cli.b.my_access.size
+
+    per_access = {size: comparisons_per_access(size, list_profiles) for size in SIZES}
+    assert per_access[SIZES[-1]] <= per_access[SIZES[0]] * MAX_GROWTH
+
+
+def test_list_profiles_scales_linearly(home, capsys):
+    def list_profiles(cli):
+        cli.list_profiles()
+        assert capsys.readouterr().out.count('"Name"') == cli.b.my_access.size
+
+    per_access = {size: comparisons_per_access(size, list_profiles) for size in SIZES}
+    assert per_access[SIZES[-1]] <= per_access[SIZES[0]] * MAX_GROWTH
@@ -0,0 +1,168 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+# each profile is available in 20 environments so every access has to be read to find all 5000 profiles
+ACCESSES = 100_000
+PROFILES_PER_ENVIRONMENT = 20
+LIMIT = ACCESSES // PROFILES_PER_ENVIRONMENT
+
+# how long a page request waits for the page requested alongside it, only reached when pages are fetched one by one
+OVERLAP_TIMEOUT = 5
+
+
+def access_listing(accesses: list, count: int) -> dict:
+    return {
+        'count': count,
+        'accesses': accesses,
+        'apps': [
+            {
+                'appContainerId': 'app-1',
+                'appDescription': None,
+                'catalogAppDisplayName': 'Application',
+                'catalogAppName': 'AWS',
+                'requiresHierarchicalModel': False,
+            }
+        ],
+        'environments': [
+            {
+                'environmentId': env_id,
+                'environmentName': env_id,
+                'alternateEnvironmentName': env_id,
+                'environmentDescription': None,
+                'profileEnvironmentProperties': {},
+            }
+            for env_id in sorted({a['environmentId'] for a in accesses})
+        ],
+        'profiles': [
+            {'papId': pap_id, 'papName': pap_id, 'papDescription': None, 'sessionAttributes': []}
+            for pap_id in sorted({a['papId'] for a in accesses})
+        ],
+    }
+
+
+class FakeApi(BaseHTTPRequestHandler):
+    accesses = [
+        {
+            'appContainerId': 'app-1',
+            'environmentId': f'env-{i % PROFILES_PER_ENVIRONMENT}',
+            'papId': f'pap-{i // PROFILES_PER_ENVIRONMENT}',
+        }
+        for i in range(ACCESSES)
+    ]
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        size = int(query.get('size', len(self.accesses)))
+        start = 0 if self.server.ignore_page else int(query.get('page', 0)) * size
+        body = json.dumps(access_listing(self.accesses[start : start + size], len(self.accesses))).encode('utf-8')
+        self.server.served += len(self.accesses[start : start + size])
+        if query.get('page') in ('1', '2'):  # requested together, so both have to be in flight at the same time
+            self.server.overlap.wait()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpMyAccess(FakeMyAccess):
+    def __init__(self, sdk):
+        super().__init__()
+        self.sdk = sdk
+
+    def list(self, search_text=None, size=None):
+        return self.sdk.get(f'{self.sdk.base_url}/access', params={'type': 'sdk', 'size': size})
+
+
+class HttpSdk(FakeSdk):
+    def __init__(self, base_url: str):
+        super().__init__(my_access=HttpMyAccess(self))
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def get(self, url, params=None):
+        return self.session.get(url, params=params).json()
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApi)
+    server.served = 0
+    server.ignore_page = False
+    server.overlap = threading.Barrier(2, timeout=OVERLAP_TIMEOUT)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def home(home):
+    (home / '.britive' / 'pybritive.config').write_text(
+        f'[global]\nmy_access_retrieval_limit = {LIMIT}\n\n[tenant-example]\nname = example\n', encoding='utf-8'
+    )
+    return home
+
+
+def new_paging_cli(api):
+    return new_cli(HttpSdk(base_url=f'http://127.0.0.1:{api.server_port}/api'))
+
+
+def grow_and_refetch(cli, access_limit: int) -> dict:
+    # the listing as it was done before paging, kept here as the baseline
+    increase = 0
+    while (access_data := cli.b.my_access.list(size=access_limit + increase))['count'] > len(
+        access_data['accesses']
+    ) and len({a['papId'] for a in access_data['accesses']}) < access_limit:
+        increase += max(25, round(access_data['count'] * 0.25))
+    return access_data
+
+
+def test_paging_stops_once_enough_profiles_are_found(home, api):
+    cli = new_paging_cli(api)
+    access_data = cli._list_my_access(search_text=None, access_limit=250)
+    assert len({a['papId'] for a in access_data['accesses']}) == 250
+    assert access_data['count'] == ACCESSES
+    assert len(access_data['accesses']) == 250 * PROFILES_PER_ENVIRONMENT
+
+
+def test_paging_returns_every_profile_in_order(home, api):
+    cli = new_paging_cli(api)
+    cli._set_available_profiles()
+    assert [p['profile_id'] for p in cli.available_profiles[:2]] == ['pap-0', 'pap-0']
+    assert len(cli.available_profiles) == LIMIT
+    assert api.served == ACCESSES
+    # limited to my_access_retrieval_limit, so neither the completion index nor the catalog are replaced by it
+    assert not cli.available_profiles_complete
+    assert not Path(cli.profile_catalog.path).exists()
+
+
+def test_ignored_page_parameter_falls_back_to_the_full_listing(home, api):
+    api.ignore_page = True
+    access_data = new_paging_cli(api)._list_my_access(search_text=None, access_limit=LIMIT)
+    assert len({a['papId'] for a in access_data['accesses']}) == LIMIT
+    assert len(access_data['accesses']) == ACCESSES
+
+
+def test_paging_transfers_each_access_once(home, api):
+    cli = new_paging_cli(api)
+    paged = cli._list_my_access(search_text=None, access_limit=LIMIT)  # serialized pages break the barrier
+    paged_served = api.served
+
+    api.served = 0
+    grown = grow_and_refetch(cli, access_limit=LIMIT)
+    print(f'\naccesses transferred - paged: {paged_served}, grow and refetch: {api.served}')
+    assert paged['accesses'] == grown['accesses']
+    assert paged_served == ACCESSES < api.served
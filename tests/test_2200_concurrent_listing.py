@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from pybritive.helpers.concurrency import run_concurrently
+
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+# how long a fake api call waits for the call it has to overlap with, only reached when the calls are serialized
+OVERLAP_TIMEOUT = 5
+
+
+class Overlap:
+    """Pairs of calls which must be in flight at the same time, each call waits until its counterpart arrives."""
+
+    def __init__(self):
+        self.listing = threading.Barrier(2, timeout=OVERLAP_TIMEOUT)
+        self.checked_out = threading.Barrier(2, timeout=OVERLAP_TIMEOUT)
+
+
+class OverlappingMyAccess(FakeMyAccess):
+    def __init__(self, overlap):
+        super().__init__(environments=[('env-1', 'Environment', 'env')], profile='Profile')
+        self.overlap = overlap
+
+    def list(self, search_text=None, size=None):
+        self.overlap.listing.wait()
+        return super().list(search_text=search_text, size=size)
+
+    def list_checked_out_profiles(self):
+        self.overlap.checked_out.wait()
+        return [{'papId': 'pap-1', 'environmentId': 'env-1', 'expiration': '2099-01-01T00:00:00Z'}]
+
+
+class OverlappingMyResources:
+    def __init__(self, overlap):
+        self.overlap = overlap
+
+    def list(self, search_text=None, size=None):
+        self.overlap.listing.wait()
+        return [{'resourceId': 'res-1', 'resourceName': 'server', 'profileId': 'rp-1', 'profileName': 'ssh'}]
+
+    def list_checked_out_profiles(self):
+        self.overlap.checked_out.wait()
+        return [{'profileId': 'rp-1', 'resourceId': 'res-1', 'expirationDuration': '2099-01-01T00:00:00Z'}]
+
+
+def new_listing_cli():
+    overlap = Overlap()
+    sdk = FakeSdk(OverlappingMyAccess(overlap), OverlappingMyResources(overlap), feature_flags={'server-access': True})
+    return new_cli(sdk)
+
+
+def test_run_concurrently_keeps_order_and_skips_missing_calls():
+    assert run_concurrently(lambda: 1, None, lambda: 3) == [1, None, 3]
+    assert run_concurrently(None, lambda: 2) == [None, 2]
+
+
+def test_run_concurrently_raises_first_error():
+    def fail():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError, match='failed'):
+        run_concurrently(lambda: 1, fail)
+
+
+def test_listings_are_fetched_concurrently(home):
+    cli = new_listing_cli()
+    cli._set_available_profiles()  # a serialized listing breaks the barrier
+    assert [p['profile_id'] for p in cli.available_profiles] == ['pap-1', 'rp-1']
+
+
+def test_checked_out_profiles_are_fetched_concurrently(home, capsys):
+    cli = new_listing_cli()
+    cli.list_profiles(checked_out=True)
+    assert capsys.readouterr().out.count('"Expiration"') == 2
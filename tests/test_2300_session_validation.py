@@ -0,0 +1,137 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import pytest
+import requests
+from britive import britive
+from britive.exceptions import UnauthorizedRequest
+
+from pybritive import britive_cli
+from pybritive.britive_cli import BritiveCli
+
+
+class FakeMyAccess:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def whoami(self):
+        self.calls.append('whoami')
+        return {'username': 'user@example.com'}
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        with self.backend['lock']:
+            response.status_code = 401 if self.backend['rejections'] else 200
+            self.backend['rejections'] = max(self.backend['rejections'] - 1, 0)
+        if response.status_code == 401 and self.backend['barrier']:
+            self.backend['barrier'].wait(timeout=5)  # every request is rejected before any is retried
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def backend():
+    return {'rejections': 0, 'revoked': set(), 'lock': threading.Lock(), 'barrier': None}
+
+
+@pytest.fixture
+def calls(monkeypatch, backend):
+    calls = []
+
+    class FakeBritive:
+        def __init__(self, tenant, token, query_features=True):
+            self.token = token
+            self.session = requests.Session()
+            self.session.headers['Authorization'] = f'TOKEN {token}'
+            self.session.mount('https://', FakeAdapter(backend))
+            self.my_access = FakeMyAccess(calls)
+            self.feature_flags = self.features() if query_features else {}
+
+        def features(self):
+            calls.append('features')
+            if self.token in backend['revoked']:
+                raise UnauthorizedRequest('401 - e0000 - unauthorized')
+            return {'server-access': True}
+
+        def get(self):
+            return self.session.get('https://example.britive-app.com/api/access').status_code
+
+    monkeypatch.setattr(britive, 'Britive', FakeBritive)
+    return calls
+
+
+def login(token='token') -> BritiveCli:
+    cli = BritiveCli(tenant_name='example', token=token, silent=True)
+    cli.login()
+    return cli
+
+
+def test_whoami_fetched_once_per_invocation(home, calls, capsys):
+    cli = login()
+    cli.user()
+    cli.whoami()
+    assert calls == ['features', 'whoami']
+    assert 'user@example.com @ example' in capsys.readouterr().out
+
+
+def test_recently_validated_token_skips_round_trips(home, calls):
+    login()
+    cli = login()
+    assert calls == ['features', 'whoami']
+    assert cli.b.feature_flags == {'server-access': True}
+    assert cli.whoami() == {'username': 'user@example.com'}
+
+
+def test_other_tokens_are_validated(home, calls):
+    login()
+    login(token='other')
+    assert calls == ['features', 'whoami', 'features', 'whoami']
+
+
+def test_validation_expires(home, calls, monkeypatch):
+    monkeypatch.setattr(britive_cli, 'session_validation_ttl', 0)
+    login()
+    login()
+    assert calls == ['features', 'whoami', 'features', 'whoami']
+
+
+def test_rejected_recent_validation_is_validated_again(home, calls, backend):
+    login()
+    cli = login()
+    backend['rejections'] = 1
+    assert cli.b.get() == 200
+    assert calls == ['features', 'whoami', 'features', 'whoami']
+
+
+def test_revoked_token_is_detected_despite_recent_validation(home, calls, backend):
+    login()
+    cli = login()
+    backend['rejections'] = 1
+    backend['revoked'].add('token')
+    with pytest.raises(click.ClickException, match='Invalid API token'):
+        cli.b.get()
+    assert cli.cache.get_session(cli._session_key(token='token')) is None
+
+
+def test_concurrent_rejections_validate_again_once(home, calls, backend):
+    login()
+    cli = login()
+    b = cli.b
+    backend['rejections'] = 4
+    backend['barrier'] = threading.Barrier(4)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        statuses = list(executor.map(lambda _: cli.b.get(), range(4)))
+    assert statuses == [200] * 4
+    assert calls == ['features', 'whoami', 'features', 'whoami']
+    assert cli.b is b
+    assert cli.b.session.hooks['response'] == [cli._revalidate_on_unauthorized]
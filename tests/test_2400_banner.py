@@ -0,0 +1,100 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from .conftest import new_cli
+
+BANNER = {'messageType': 'INFO', 'message': 'scheduled maintenance tonight'}
+
+
+class BannerAdapter(requests.adapters.BaseAdapter):
+    def __init__(self, sdk):
+        super().__init__()
+        self.sdk = sdk
+
+    def send(self, request, timeout=None, **kwargs):
+        assert request.url == f'{self.sdk.base_url}/banner'
+        assert request.headers['Authorization'] == 'TOKEN token'
+        assert timeout
+        self.sdk.banner_requests += 1
+        self.sdk.released.wait(timeout=5)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(BANNER).encode('utf-8')
+        return response
+
+    def close(self):
+        pass
+
+
+class BannerSdk:
+    def __init__(self):
+        self.base_url = 'https://example.britive-app.com/api'
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = 'TOKEN token'
+        self.session.mount('https://', BannerAdapter(self))
+        self.banner_requests = 0
+        self.released = threading.Event()
+        self.released.set()
+
+
+@pytest.fixture
+def sdk():
+    return BannerSdk()
+
+
+def new_banner_cli(sdk):
+    return new_cli(sdk, silent=False)
+
+
+def test_banner_fetched_in_time_is_displayed_before_output(home, sdk, capsys):
+    cli = new_banner_cli(sdk)
+    cli._display_banner()
+    cli.banner_thread.join()
+    cli.print('output')
+    lines = capsys.readouterr().out.splitlines()
+    assert 'scheduled maintenance tonight' in lines[0]
+    assert lines[1] == 'output'
+
+
+def test_late_banner_is_displayed_by_next_invocation(home, sdk, capsys):
+    sdk.released.clear()
+    cli = new_banner_cli(sdk)
+    cli._display_banner()
+    cli.print('output')
+    assert capsys.readouterr().out == 'output\n'  # the command did not wait on the banner
+
+    sdk.released.set()
+    cli.banner_thread.join()
+    cli = new_banner_cli(sdk)
+    cli._display_banner()
+    assert 'scheduled maintenance tonight' in capsys.readouterr().out
+    assert cli.banner_thread is None  # still fresh, nothing to fetch
+    assert sdk.banner_requests == 1
+
+
+def expire_banner(cli):
+    banners = cli.cache._read(cli.cache.banners_path, {})
+    banners['example']['expires'] = 0
+    cli.cache._write(cli.cache.banners_path, banners)
+
+
+def test_unchanged_banner_is_displayed_once(home, sdk, capsys):
+    for _ in range(2):
+        cli = new_banner_cli(sdk)
+        cli._display_banner()
+        cli.banner_thread.join()
+        cli.print('output')
+        expire_banner(cli)
+    assert capsys.readouterr().out.count('scheduled maintenance tonight') == 1
+    assert sdk.banner_requests == 2
+
+
+def test_silent_invocations_do_not_fetch_banner(home, sdk):
+    cli = new_banner_cli(sdk)
+    cli.silent = True
+    cli._display_banner()
+    assert cli.banner_thread is None
+    assert sdk.banner_requests == 0
@@ -0,0 +1,145 @@
+import threading
+
+import click
+import pytest
+from britive.exceptions import ForbiddenRequest
+
+from pybritive.helpers.catalog import ProfileCatalog
+
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+PROFILES = ['Application/Development/Reader', 'Application/Production/Reader', 'Application/Staging/Reader']
+
+
+class CheckoutMyAccess(FakeMyAccess):
+    def __init__(self):
+        super().__init__(environments=['Development', 'Production', 'Staging'], app_type='Generic')
+        self.checkouts = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+        self.barrier = None  # when set, the checkouts which succeed wait on each other
+        self.revoked = set()
+
+    def checkout(self, environment_id, profile_id, justification, progress_func, **kwargs):
+        progress_func('checkout in progress')
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            if environment_id == 'Staging':
+                raise click.ClickException('approval required and no justification provided.')
+            if environment_id in self.revoked:
+                raise ForbiddenRequest('no access to the environment')
+            if self.barrier:
+                self.barrier.wait()
+            with self.lock:
+                self.checkouts.append((environment_id, justification))
+            return {'appContainerId': 'app-1', 'credentials': {'environment': environment_id}}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def cli():
+    return new_cli(FakeSdk(CheckoutMyAccess()), silent=False)
+
+
+def checkout_many(cli, profiles, manifest=None, justification=None, otp=None, **kwargs):
+    cli.checkout_many(
+        profiles=profiles,
+        manifest=manifest,
+        aws_credentials_file=None,
+        blocktime=None,
+        console=False,
+        force_renew=None,
+        gcloud_key_file=None,
+        justification=justification,
+        maxpolltime=None,
+        mode=None,
+        otp=otp,
+        passphrase=None,
+        verbose=False,
+        **kwargs,
+    )
+
+
+def test_profiles_are_checked_out_concurrently(home, cli, capsys):
+    # both successful checkouts have to be in flight at the same time to get past the barrier
+    cli.b.my_access.barrier = threading.Barrier(2, timeout=5)
+    with pytest.raises(click.ClickException, match='1 of 3 profiles could not be checked out'):
+        checkout_many(cli, PROFILES)
+
+    captured = capsys.readouterr()
+    assert captured.out.index('Development') < captured.out.index('Production')
+    assert 'Staging' not in captured.out
+    assert f'{PROFILES[2]}: failed - approval required and no justification provided.' in captured.err
+    assert f'{PROFILES[0]}: checked out' in captured.err
+    assert cli.b.my_access.lists == 1
+
+
+def test_workers_limit_concurrent_checkouts(home, cli):
+    with pytest.raises(click.ClickException, match='1 of 3 profiles could not be checked out'):
+        checkout_many(cli, PROFILES, workers=1)
+    assert cli.b.my_access.most_running == 1
+    assert len(cli.b.my_access.checkouts) == 2
+
+
+def test_names_are_resolved_once(home, cli, monkeypatch):
+    checkout_many(cli, PROFILES[:2])
+    lookups = []
+    lookup = ProfileCatalog.lookup
+    monkeypatch.setattr(
+        ProfileCatalog, 'lookup', lambda catalog, **names: lookups.append(names) or lookup(catalog, **names)
+    )
+
+    checkout_many(new_cli(cli.b, silent=False), PROFILES[:2])
+    assert len(lookups) == 2  # by the parent, the workers are handed the ids
+    assert len(cli.b.my_access.checkouts) == 4
+
+
+def test_stale_catalog_ids_are_resolved_again_once(home, cli):
+    checkout_many(cli, PROFILES[:2])
+    assert cli.b.my_access.lists == 1
+
+    # the catalog now holds the ids of profiles the user has since lost access to
+    my_access = cli.b.my_access
+    my_access.revoked = {'Development', 'Production'}
+    my_access.environments = [(f'{name}-2', name, name.lower()) for _, name, _ in my_access.environments]
+    my_access.checkouts.clear()
+    my_access.barrier = threading.Barrier(2, timeout=5)
+    checkout_many(new_cli(cli.b, silent=False), PROFILES[:2])
+
+    # the workers ask the parent to resolve the names again, so the profiles are listed once rather than per worker
+    assert my_access.lists == 2
+    assert sorted(my_access.checkouts) == [('Development-2', None), ('Production-2', None)]
+
+
+def test_one_time_password_is_refused_for_several_profiles(home, cli):
+    with pytest.raises(click.ClickException, match='--otp can only be used when checking out a single profile'):
+        checkout_many(cli, PROFILES[:2], otp='123456')
+    assert cli.b.my_access.checkouts == []
+
+
+def test_manifest_entries_override_options(home, cli, tmp_path):
+    manifest = tmp_path / 'manifest.yaml'
+    manifest.write_text(
+        f'profiles:\n  - profile: {PROFILES[1]}\n    justification: release\n  - {PROFILES[0]}\n', encoding='utf-8'
+    )
+    checkout_many(cli, [], manifest=str(manifest), justification='daily')
+    assert sorted(cli.b.my_access.checkouts) == [('Development', 'daily'), ('Production', 'release')]
+
+
+def test_unknown_profiles_do_not_stop_the_others(home, cli, capsys):
+    with pytest.raises(click.ClickException, match='1 of 2 profiles could not be checked out'):
+        checkout_many(cli, ['Application/Missing/Reader', PROFILES[0]])
+    assert 'Application/Missing/Reader: failed - no profile found' in capsys.readouterr().err
+    assert cli.b.my_access.checkouts == [('Development', None)]
+
+
+def test_invalid_manifest(home, cli, tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text('[{"profile": "a/b/c", "color": "blue"}]', encoding='utf-8')
+    with pytest.raises(click.ClickException, match='unknown fields color'):
+        checkout_many(cli, [], manifest=str(manifest))
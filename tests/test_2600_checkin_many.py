@@ -0,0 +1,100 @@
+import threading
+
+import click
+import pytest
+
+from .conftest import FakeMyAccess, FakeSdk, new_cli
+
+ENVIRONMENTS = ['Development', 'Production', 'Staging']
+
+
+class CheckinMyAccess(FakeMyAccess):
+    def __init__(self):
+        super().__init__(environments=ENVIRONMENTS)
+        self.barrier = None  # when set, the checkins which succeed wait on each other
+        self.checked_out_lists = 0
+        self.checkins = []
+        self.lock = threading.Lock()
+
+    def list_checked_out_profiles(self):
+        self.checked_out_lists += 1
+        return [
+            {'papId': 'pap-1', 'environmentId': e, 'accessType': 'PROGRAMMATIC', 'transactionId': f'tx-{e}'}
+            for e in ENVIRONMENTS
+        ]
+
+    def checkin(self, transaction_id):
+        if transaction_id == 'tx-Staging':
+            raise click.ClickException('checkin failed.')
+        if self.barrier:
+            self.barrier.wait()
+        with self.lock:
+            self.checkins.append(transaction_id)
+
+
+class CheckinMyResources:
+    def __init__(self):
+        self.barrier = None
+        self.checkins = []
+
+    def list(self, search_text=None, size=None):
+        return [{'resourceId': 'res-1', 'resourceName': 'server', 'profileId': 'rp-1', 'profileName': 'ssh'}]
+
+    def list_checked_out_profiles(self):
+        return [
+            {
+                'resourceId': 'res-1',
+                'resourceName': 'server',
+                'profileId': 'rp-1',
+                'profileName': 'ssh',
+                'transactionId': 'tx-res',
+            }
+        ]
+
+    def checkin(self, transaction_id):
+        if self.barrier:
+            self.barrier.wait()
+        self.checkins.append(transaction_id)
+
+
+@pytest.fixture
+def cli():
+    sdk = FakeSdk(CheckinMyAccess(), CheckinMyResources(), feature_flags={'server-access': True})
+    return new_cli(sdk, silent=False)
+
+
+def test_all_checked_out_profiles_are_checked_in_concurrently(home, cli, capsys, monkeypatch):
+    cleared = []
+    monkeypatch.setattr(cli, 'clear_cached_aws_credentials', cleared.append)
+    # the three checkins which succeed only get past the barrier when they are in flight at the same time
+    cli.b.my_access.barrier = cli.b.my_resources.barrier = threading.Barrier(3, timeout=5)
+    with pytest.raises(click.ClickException, match='1 of 4 profiles could not be checked in'):
+        cli.checkin_many(profiles=[], all_checked_out=True, console=False)
+
+    assert sorted(cli.b.my_access.checkins) == ['tx-Development', 'tx-Production']
+    assert cli.b.my_resources.checkins == ['tx-res']
+    assert cli.b.my_access.checked_out_lists == 1
+    assert sorted(cleared) == ['Application/Development/Reader', 'Application/Production/Reader']
+    err = capsys.readouterr().err
+    assert 'Application/Staging/Reader: failed - checkin failed.' in err
+    assert 'resources/server/ssh: checked in' in err
+
+
+def test_named_profiles_are_matched_to_checked_out_profiles(home, cli, capsys, monkeypatch):
+    monkeypatch.setattr(cli, 'clear_cached_aws_credentials', lambda profile: None)
+    with pytest.raises(click.ClickException, match='1 of 3 profiles could not be checked in'):
+        cli.checkin_many(
+            profiles=['Application/Production/Reader', 'resources/server/ssh', 'Application/Missing/Reader'],
+            all_checked_out=False,
+            console=False,
+        )
+    assert cli.b.my_access.checkins == ['tx-Production']
+    assert cli.b.my_resources.checkins == ['tx-res']
+    assert 'Application/Missing/Reader: failed - no profile found' in capsys.readouterr().err
+
+
+def test_console_access_is_not_matched_to_programmatic_checkouts(home, cli, capsys):
+    with pytest.raises(click.ClickException, match='1 of 1 profiles could not be checked in'):
+        cli.checkin_many(profiles=['Application/Production/Reader'], all_checked_out=False, console=True)
+    assert 'no checked out profile found' in capsys.readouterr().err
+    assert cli.b.my_access.checkins == []
@@ -0,0 +1,92 @@
+import io
+import json
+import time
+
+import click
+import pytest
+
+from pybritive.helpers.concurrency import run_bounded
+
+from .conftest import FakeSdk, new_cli
+
+# round trip latency of every fake api call
+LATENCY = 0.1
+
+
+class FakeUsers:
+    def get(self, user_id):
+        time.sleep(LATENCY * (3 - int(user_id[-1])))  # earlier users take longer
+        if user_id == 'missing-0':
+            raise ValueError('user not found')
+        return {'userId': user_id, 'email': f'{user_id}@example.com'}
+
+
+class FakeIdentityManagement:
+    def __init__(self):
+        self.users = FakeUsers()
+
+
+@pytest.fixture
+def cli():
+    return new_cli(FakeSdk(identity_management=FakeIdentityManagement()))
+
+
+def batch(*calls) -> io.StringIO:
+    return io.StringIO('\n'.join(c if isinstance(c, str) else json.dumps(c) for c in calls) + '\n')
+
+
+def results(capsys) -> list:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_run_bounded_keeps_a_window_of_items_in_flight():
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    pairs = run_bounded(lambda i: i * 2, items(), workers=2, ordered=True)
+    assert next(pairs)[1].result() == 0
+    assert len(consumed) < 20
+    assert [future.result() for _, future in pairs] == [i * 2 for i in range(1, 100)]
+
+
+def test_batch_calls_run_concurrently_in_completion_order(home, cli, capsys):
+    calls = [
+        {'id': i, 'method': 'identity_management.users.get', 'parameters': {'user-id': f'user-{i}'}} for i in range(3)
+    ]
+    started = time.perf_counter()
+    cli.api_batch(batch=batch(*calls), query='email')
+    elapsed = time.perf_counter() - started
+    assert [r['id'] for r in results(capsys)] == [2, 1, 0]
+    assert elapsed < 4 * LATENCY
+
+
+def test_batch_results_in_input_order(home, cli, capsys):
+    calls = [{'method': 'identity_management.users.get', 'parameters': {'user_id': f'user-{i}'}} for i in range(3)]
+    cli.api_batch(batch=batch(*calls), ordered=True)
+    assert [(r['line'], r['response']['userId']) for r in results(capsys)] == [
+        (1, 'user-0'),
+        (2, 'user-1'),
+        (3, 'user-2'),
+    ]
+
+
+def test_failed_lines_do_not_stop_the_others(home, cli, capsys):
+    lines = batch(
+        {'method': 'identity_management.users.get', 'parameters': {'user_id': 'missing-0'}},
+        'not json',
+        '',
+        {'method': 'identity_management.nothing'},
+        {'method': 'identity_management.users.get', 'parameters': {'user_id': 'user-2'}, 'query': 'email'},
+    )
+    with pytest.raises(click.ClickException, match='3 of 4 batch calls failed'):
+        cli.api_batch(batch=lines, ordered=True)
+    output = results(capsys)
+    assert output[0] == {'line': 1, 'method': 'identity_management.users.get', 'error': 'user not found'}
+    assert output[1]['line'] == 2
+    assert output[1]['error'].startswith('invalid json')
+    assert output[2]['error'] == 'invalid method identity_management.nothing provided.'
+    assert output[3] == {'line': 5, 'method': 'identity_management.users.get', 'response': 'user-2@example.com'}
@@ -0,0 +1,62 @@
+import datetime
+import json
+import os
+import tracemalloc
+
+import pytest
+import yaml
+
+from .conftest import new_cli
+
+ROWS = [{'id': i, 'email': f'user-{i}@example.com', 'created': datetime.date(2024, 1, 1)} for i in range(3)]
+
+
+@pytest.mark.parametrize('output_format', ['json', 'csv', 'list', 'yaml', 'table'])
+def test_iterators_render_like_lists(home, capsys, output_format):
+    cli = new_cli(output_format=output_format)
+    cli.print(ROWS, ignore_silent=True)
+    from_list = capsys.readouterr().out
+    cli.print(iter(ROWS), ignore_silent=True)
+    assert capsys.readouterr().out == from_list
+
+
+def test_json_output_is_unchanged(home, capsys):
+    new_cli(output_format='json').print(ROWS, ignore_silent=True)
+    assert capsys.readouterr().out == json.dumps(ROWS, indent=2, default=str) + '\n'
+    new_cli(output_format='json').print(iter([]), ignore_silent=True)
+    assert capsys.readouterr().out == '[]\n'
+
+
+def test_yaml_output_is_unchanged(home, capsys):
+    data = {'users': ROWS, 'tags': ('a', 'b'), 'at': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)}
+    new_cli(output_format='yaml').print(data, ignore_silent=True)
+    expected = yaml.safe_dump(yaml.safe_load(json.dumps(data, default=str)))
+    assert capsys.readouterr().out == expected + '\n'
+
+
+def test_rows_are_written_as_they_arrive(home, capsys):
+    def rows():
+        for row in ROWS:
+            yield row
+            assert capsys.readouterr().out == json.dumps(row, default=str) + '\n'
+
+    new_cli(output_format='ndjson').print(rows(), ignore_silent=True)
+
+
+def test_streaming_keeps_memory_flat(home, monkeypatch):
+    def rows():
+        for i in range(20000):
+            yield {'id': i, 'email': f'user-{i}@example.com', 'name': f'User {i}', 'status': 'active'}
+
+    cli = new_cli(output_format='json')
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        monkeypatch.setattr('sys.stdout', devnull)
+        tracemalloc.start()
+        cli.print(rows(), ignore_silent=True)
+        streamed = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        data = list(rows())
+        json.dumps(data, indent=2, default=str)
+        materialized = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    assert streamed * 20 < materialized
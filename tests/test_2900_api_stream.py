@@ -0,0 +1,147 @@
+import json
+
+import click
+import jmespath
+import pytest
+
+from pybritive.helpers.paging import is_element_wise
+
+from .conftest import new_cli
+
+USERS = [
+    {'userId': f'user-{i}', 'email': f'user-{i}@example.com', 'status': 'active' if i % 2 else 'disabled'}
+    for i in range(25)
+]
+PAGE_SIZE = 10
+
+
+class FakeUsers:
+    def __init__(self, sdk):
+        self.sdk = sdk
+
+    def list(self):
+        return self.sdk.get('https://example.britive-app.com/api/users')
+
+    def get(self, user_id):
+        return self.sdk.get(f'https://example.britive-app.com/api/users/{user_id}')
+
+
+class FakeIdentityManagement:
+    def __init__(self, sdk):
+        self.users = FakeUsers(sdk)
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, sdk):
+        self.sdk = sdk
+
+    def get(self, url, params=None):
+        return FakeResponse(self.sdk.page(url, params))
+
+
+class PagingSdk:
+    """Serves the users inline paginated, the sdk accumulating every page and the session returning a single one."""
+
+    def __init__(self, log):
+        self.log = log
+        self.base_url = 'https://example.britive-app.com/api'
+        self.session = FakeSession(self)
+        self.identity_management = FakeIdentityManagement(self)
+
+    def page(self, url, params):
+        assert url == f'{self.base_url}/users'
+        assert params['type'] == 'User'
+        page, size = params.get('page', 0), params.get('size', PAGE_SIZE)
+        self.log.append(f'page {page}')
+        return {'count': len(USERS), 'page': page, 'size': size, 'data': USERS[page * size : (page + 1) * size]}
+
+    def get(self, url, params=None):
+        self.log.append('sdk get')
+        if not url.endswith('/users'):
+            return USERS[0]
+        params = {'type': 'User', 'page': 0, 'size': PAGE_SIZE}
+        data = []
+        while True:
+            result = self.page(url, params)
+            data += result['data']
+            if result['size'] * (result['page'] + 1) >= result['count']:
+                return data
+            params = {**params, 'page': params['page'] + 1}
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def cli(log, monkeypatch):
+    cli = new_cli(PagingSdk(log), output_format='ndjson')
+
+    echo = click.echo
+
+    def logged_echo(message=None, **kwargs):
+        log.append('row')
+        echo(message, **kwargs)
+
+    monkeypatch.setattr('click.echo', logged_echo)
+    return cli
+
+
+def rows(capsys) -> list:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize('query', ['[].email', '[*].userId', "[?status=='active'].email", 'length(@)', None])
+def test_streamed_results_match_buffered_results(home, cli, capsys, query):
+    cli.api(method='identity_management.users.list', parameters={}, query=query)
+    buffered = rows(capsys)
+    cli.api(method='identity_management.users.list', parameters={}, query=query, stream=True)
+    assert rows(capsys) == buffered
+
+
+def test_rows_are_written_before_the_next_page_is_requested(home, cli, log, monkeypatch):
+    monkeypatch.setattr('pybritive.helpers.paging.page_size', PAGE_SIZE)
+    cli.api(method='identity_management.users.list', parameters={}, query='[].email', stream=True)
+    assert log[:12] == ['page 0'] + ['row'] * 10 + ['page 1']
+    assert log.count('page 0') == 1
+
+
+def test_responses_which_are_not_paginated_are_unchanged(home, cli, capsys):
+    cli.api(method='identity_management.users.get', parameters={'user-id': 'user-0'}, query='email', stream=True)
+    assert capsys.readouterr().out == 'user-0@example.com\n'
+
+
+def test_pages_are_requested_without_the_sdk_get(home, cli, log):
+    cli.api(method='identity_management.users.list', parameters={}, query='[].email', stream=True)
+    assert 'sdk get' not in log
+    assert 'get' not in vars(cli.b)
+
+
+def test_streamed_parameters_are_checked(home, cli):
+    with pytest.raises(click.ClickException, match='invalid parameters'):
+        cli.api(method='identity_management.users.list', parameters={'color': 'blue'}, stream=True)
+
+
+@pytest.mark.parametrize(
+    ('query', 'expected'),
+    [
+        ('[].email', True),
+        ('[*]', True),
+        ("[?a=='b'].c", True),
+        ('[0]', False),
+        ('length(@)', False),
+        ('[].a | [0]', False),
+    ],
+)
+def test_element_wise_queries(query, expected):
+    assert is_element_wise(jmespath.compile(query).parsed) == expected
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from britive import britive
+
+from pybritive.completers import api_index
+from pybritive.completers.api import api_completer
+from pybritive.completers.api_command import get_dynamic_method_parameters
+
+# generous bound for a completion answered from the index, loading it included
+LOOKUP_BUDGET = 0.1
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    monkeypatch.setenv('BRITIVE_TENANT', 'example')
+    monkeypatch.setattr(britive, 'parse_tenant', lambda tenant: f'{tenant}.britive-app.com')  # no dns lookups
+    monkeypatch.setattr(api_index, '_index', None)
+    return tmp_path
+
+
+def completions(incomplete) -> dict:
+    return {item.value: item.help for item in api_completer(None, None, incomplete)}
+
+
+def test_base_level_offers_groups_only(home):
+    items = completions('')
+    assert 'identity_management' in items
+    assert 'my_access' in items
+    assert 'features' not in items
+    assert all('.' not in item for item in items)
+
+
+def test_prefix_lookups_are_case_insensitive_and_one_level_deep(home):
+    assert list(completions('Identity_Management.Us')) == ['identity_management.users']
+    items = completions('identity_management.users.')
+    assert 'identity_management.users.list' in items
+    assert all(item.count('.') == 2 for item in items)
+
+
+def test_method_parameters(home):
+    flags = [p['flag'] for p in get_dynamic_method_parameters('identity_management.users.get')]
+    assert '--user-id' in flags
+    assert flags[-1] == '---------------------'
+    assert get_dynamic_method_parameters('identity_management.nothing') == []
+
+
+def test_completion_answers_from_disk_without_the_sdk(home, monkeypatch):
+    completions('')
+    assert api_index.index_path().is_file()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the sdk should not be instantiated')
+
+    monkeypatch.setattr(api_index, '_index', None)
+    monkeypatch.setattr(britive.Britive, '__init__', fail)
+    started = time.perf_counter()
+    items = completions('identity_management.users.l')
+    elapsed = time.perf_counter() - started
+    print(f'\ncompletion from the index: {elapsed * 1000:.1f} ms')
+    assert 'identity_management.users.list' in items
+    assert elapsed < LOOKUP_BUDGET
+
+
+def test_indexes_of_other_sdk_versions_are_removed(home):
+    stale = api_index.index_path().with_name('api-0.0.1-1.json')
+    stale.parent.mkdir(parents=True)
+    stale.write_text('{}', encoding='utf-8')
+    completions('')
+    assert not stale.exists()
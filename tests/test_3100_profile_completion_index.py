@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from pybritive.britive_cli import BritiveCli
+from pybritive.completers.profile import profile_completer
+from pybritive.helpers.cache import Cache
+from pybritive.helpers.completion_index import ProfileCompletionIndex
+from pybritive.helpers.config import ConfigManager
+
+# generous bound for one completion against 20k profiles, loading the index included
+LOOKUP_BUDGET = 0.1
+CONFIG = """[global]
+default_tenant = example
+
+[tenant-example]
+name = example
+
+[tenant-other]
+name = other.britive-app.com
+
+[profile-aliases]
+prod = AWS/Production/Admin
+"""
+
+
+class Ctx:
+    def __init__(self, **params):
+        self.params = params
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYBRITIVE_HOME_DIR', str(tmp_path))
+    monkeypatch.delenv('BRITIVE_TENANT', raising=False)
+    (tmp_path / '.britive').mkdir()
+    (tmp_path / '.britive' / 'pybritive.config').write_text(CONFIG, encoding='utf-8')
+    return tmp_path
+
+
+def complete(incomplete, **params) -> list:
+    return profile_completer(Ctx(**params), None, incomplete)
+
+
+def test_prefix_matches_come_before_substring_matches(home):
+    ProfileCompletionIndex('example').save(['AWS/Production/Admin', 'GCP/Production/Viewer', 'Azure/Dev/Reader'])
+    assert complete('prod') == ['AWS/Production/Admin', 'GCP/Production/Viewer', 'prod']
+    assert complete('a') == ['AWS/Production/Admin', 'Azure/Dev/Reader']
+    assert complete('aws/prod') == ['AWS/Production/Admin']
+    assert complete('/production/') == ['AWS/Production/Admin', 'GCP/Production/Viewer']
+    assert complete('VIEWER') == ['GCP/Production/Viewer']
+
+
+def test_profiles_are_scoped_to_the_tenant(home):
+    ProfileCompletionIndex('example').save(['AWS/Production/Admin'])
+    ProfileCompletionIndex('other.britive-app.com').save(['GCP/Sandbox/Owner'])
+    assert complete('') == ['AWS/Production/Admin', 'prod']
+    assert complete('', tenant='other') == ['GCP/Sandbox/Owner', 'prod']
+
+
+def test_refresh_prunes_profiles_which_are_gone(home):
+    cli = BritiveCli(tenant_name='example', silent=True)
+    cli.tenant_name = 'example'
+    cli.available_profiles_complete = True
+    for profiles in (['AWS/Production/Admin', 'AWS/Staging/Admin'], ['AWS/Production/Admin']):
+        cli.available_profiles = [
+            {
+                'app_name': 'AWS',
+                'env_name': p.split('/')[1],
+                'profile_name': 'Admin',
+                '2_part_profile_format_allowed': False,
+            }
+            for p in profiles
+        ]
+        cli.cache_profiles()
+    assert complete('aws/') == ['AWS/Production/Admin']
+    assert len(Cache().get_profiles()) == 2  # the shared list only ever grows
+
+
+def test_partial_listings_do_not_prune(home):
+    ProfileCompletionIndex('example').save(['AWS/Production/Admin'])
+    cli = BritiveCli(tenant_name='example', silent=True)
+    cli.tenant_name = 'example'
+    cli.available_profiles = []
+    cli.cache_profiles()
+    assert complete('aws') == ['AWS/Production/Admin']
+
+
+def test_falls_back_to_shared_profiles_without_an_index(home):
+    Cache().save_profiles(['AWS/Production/Admin'])
+    assert complete('admin') == ['AWS/Production/Admin']
+
+
+def test_config_is_only_parsed_when_it_changes(home, monkeypatch):
+    ProfileCompletionIndex('example').save(['AWS/Production/Admin'])
+    complete('')
+
+    def fail(self, force=False):
+        raise AssertionError('the config should not be parsed')
+
+    monkeypatch.setattr(ConfigManager, 'load', fail)
+    assert complete('prod') == ['AWS/Production/Admin', 'prod']
+
+
+def test_completion_latency_is_flat(home):
+    index = ProfileCompletionIndex('example')
+    index.save([f'Application {i}/Environment {i % 50}/Profile {i % 7}' for i in range(20000)])
+    complete('')
+    for incomplete in ['application 19', 'environment 4', 'profile 6', 'nothing']:
+        started = time.perf_counter()
+        complete(incomplete)
+        elapsed = time.perf_counter() - started
+        print(f'\ncompleting {incomplete!r} over 20k profiles: {elapsed * 1000:.1f} ms')
+        assert elapsed < LOOKUP_BUDGET
@@ -0,0 +1,176 @@
+import base64
+import contextlib
+import os
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+from pybritive.britive_cli import BritiveCli
+from pybritive.helpers import kube_config_builder
+from pybritive.helpers.config import ConfigManager
+
+CLUSTERS = 2000
+
+
+def cert(i: int) -> str:
+    body = f'{i:08d}'.encode() * 150
+    return base64.b64encode(b'-----BEGIN CERTIFICATE-----\n' + body + b'\n-----END CERTIFICATE-----\n').decode()
+
+
+@pytest.fixture
+def validated(monkeypatch):
+    validated = []
+    valid_cert = kube_config_builder.valid_cert
+
+    def counting_valid_cert(cert, profile, cli):
+        validated.append(profile)
+        return valid_cert(cert=cert, profile=profile, cli=cli)
+
+    monkeypatch.setattr(kube_config_builder, 'valid_cert', counting_valid_cert)
+    return validated
+
+
+def profiles(count: int) -> list:
+    return [
+        {
+            'app': 'EKS',
+            'env': f'Cluster {i}',
+            'profile': 'Admin',
+            'url': f'https://cluster-{i}.example.com',
+            'cert': cert(i),
+            'session_attributes': [],
+        }
+        for i in range(count)
+    ]
+
+
+def build(profiles: list) -> float:
+    cli = BritiveCli(tenant_name='example', silent=True)
+    started = time.perf_counter()
+    kube_config_builder.build_kube_config(
+        profiles=profiles, config=ConfigManager(cli=cli, tenant_name='example'), username='user', cli=cli
+    )
+    return time.perf_counter() - started
+
+
+def kubeconfig(home) -> Path:
+    return home / '.britive' / 'kube' / 'config'
+
+
+def test_unchanged_profiles_skip_the_rewrite(home, validated):
+    full = build(profiles(CLUSTERS))
+    written = kubeconfig(home).stat().st_mtime_ns
+    skipped = build(profiles(CLUSTERS))
+    print(f'\n{CLUSTERS} clusters: generated in {full * 1000:.0f} ms, unchanged refresh in {skipped * 1000:.0f} ms')
+    assert kubeconfig(home).stat().st_mtime_ns == written
+    assert len(validated) == CLUSTERS
+    assert skipped * 5 < full
+
+
+def test_only_new_certs_are_validated(home, validated):
+    build(profiles(10))
+    build(profiles(12))
+    assert validated[10:] == ['eks/cluster 10/admin', 'eks/cluster 11/admin']
+    config = yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))
+    assert len(config['clusters']) == 12
+    assert len(config['contexts']) == 12
+
+
+def test_removed_config_is_regenerated(home, validated):
+    build(profiles(3))
+    kubeconfig(home).unlink()
+    build(profiles(3))
+    assert len(yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))['clusters']) == 3
+
+
+def test_other_entries_are_kept(home, validated):
+    kubeconfig(home).parent.mkdir(parents=True)
+    other = {'name': 'other-cluster', 'cluster': {'server': 'https://other.example.com'}}
+    kubeconfig(home).write_text(yaml.safe_dump({'clusters': [other]}), encoding='utf-8')
+    build(profiles(2))
+    config = yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))
+    assert other in config['clusters']
+    assert len(config['clusters']) == 3
+
+
+def use_layout(home, layout: str, tenants=('example',)):
+    config = f'[global]\nkube_config_layout = {layout}\n\n'
+    config += ''.join(f'[tenant-{t}]\nname = {t}\n\n' for t in tenants)
+    (home / '.britive' / 'pybritive.config').write_text(config, encoding='utf-8')
+
+
+def build_for(tenant: str, profiles: list):
+    cli = BritiveCli(tenant_name=tenant, silent=True)
+    kube_config_builder.build_kube_config(
+        profiles=profiles, config=ConfigManager(cli=cli, tenant_name=tenant), username='user', cli=cli
+    )
+
+
+def test_per_tenant_layout_touches_only_its_own_file(home, validated):
+    use_layout(home, 'per-tenant', tenants=('example', 'other'))
+    build_for('example', profiles(2))
+    build_for('other', profiles(3))
+    kube_dir = home / '.britive' / 'kube'
+    example = kube_dir / 'tenants' / 'example.yaml'
+    written = example.stat().st_mtime_ns
+
+    build_for('other', profiles(4))
+    assert example.stat().st_mtime_ns == written
+    assert not kubeconfig(home).exists()
+    other = yaml.safe_load((kube_dir / 'tenants' / 'other.yaml').read_text(encoding='utf-8'))
+    assert len(other['clusters']) == 4
+    assert all(c['name'].startswith('other-') for c in other['clusters'])
+    assert (kube_dir / 'kubeconfig-path').read_text(encoding='utf-8').split(os.pathsep) == [
+        str(example),
+        str(kube_dir / 'tenants' / 'other.yaml'),
+    ]
+
+
+def test_switching_layouts_moves_the_tenant(home, validated):
+    build(profiles(2))
+    use_layout(home, 'per-tenant')
+    build(profiles(2))
+    assert yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))['clusters'] == []
+    assert (home / '.britive' / 'kube' / 'tenants' / 'example.yaml').exists()
+
+    use_layout(home, 'shared')
+    build(profiles(2))
+    assert len(yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))['clusters']) == 2
+    assert not (home / '.britive' / 'kube' / 'tenants' / 'example.yaml').exists()
+    assert (home / '.britive' / 'kube' / 'kubeconfig-path').read_text(encoding='utf-8') == ''
+
+
+def test_unchanged_profiles_do_not_look_up_the_user(home, validated, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(BritiveCli, 'whoami', lambda cli: lookups.append(cli) or {'username': 'user'})
+    for _ in range(2):
+        cli = BritiveCli(tenant_name='example', silent=True)
+        kube_config_builder.build_kube_config(
+            profiles=profiles(2), config=ConfigManager(cli=cli, tenant_name='example'), cli=cli
+        )
+    assert len(lookups) == 1
+    assert yaml.safe_load(kubeconfig(home).read_text(encoding='utf-8'))['users'][0]['name'] == 'example-user'
+
+
+def test_shared_config_is_merged_under_its_lock(home, validated, monkeypatch):
+    events = []
+    lock = kube_config_builder.locked
+    write = kube_config_builder.write_kube_config
+
+    @contextlib.contextmanager
+    def recording_lock(path, **kwargs):
+        with lock(path, **kwargs):
+            events.append(f'lock {Path(path).name}')
+            yield
+            events.append(f'unlock {Path(path).name}')
+
+    def recording_write(filename, **kwargs):
+        events.append(f'write {Path(filename).name}')
+        write(filename=filename, **kwargs)
+
+    monkeypatch.setattr(kube_config_builder, 'locked', recording_lock)
+    monkeypatch.setattr(kube_config_builder, 'write_kube_config', recording_write)
+    build(profiles(2))
+    assert events[:3] == ['lock config', 'write config', 'unlock config']
@@ -0,0 +1,92 @@
+import json
+import subprocess
+
+import pytest
+
+from .conftest import new_cli
+
+INSTANCE = {
+    'name': 'web',
+    'zone': 'https://www.googleapis.com/compute/v1/projects/project/zones/us-east1-b',
+    'metadata': {'items': [{'key': 'ssh-keys', 'value': 'admin:ssh-ed25519 AAAA'}]},
+}
+
+
+@pytest.fixture
+def home(home, monkeypatch):
+    monkeypatch.setenv('CLOUDSDK_CONFIG', str(home / 'gcloud'))
+    (home / 'gcloud').mkdir()
+    (home / 'gcloud' / 'active_config').write_text('default', encoding='utf-8')
+    return home
+
+
+@pytest.fixture
+def gcloud(monkeypatch):
+    commands = []
+
+    def check_output(command, **kwargs):
+        commands.append(command[:4])
+        if command[:3] == ['gcloud', 'auth', 'list']:
+            return b'user@example.com\n'
+        if command[3] == 'describe':
+            return json.dumps(INSTANCE).encode('utf-8')
+        return json.dumps([{**INSTANCE, 'name': 'web-2'}, INSTANCE]).encode('utf-8')
+
+    monkeypatch.setattr(subprocess, 'check_output', check_output)
+    return commands
+
+
+def test_instance_zone_is_looked_up_once(home, gcloud, capsys):
+    for _ in range(2):
+        new_cli().ssh_gcp_identity_aware_proxy(
+            username='admin', hostname='gcp.web.project', push_public_key=None, port_number='22', key_source=None
+        )
+    assert gcloud == [['gcloud', 'compute', 'instances', 'list']]
+    assert capsys.readouterr().out.count('--zone=us-east1-b') == 2
+
+
+def test_cached_zone_still_fetches_current_metadata(home, gcloud):
+    new_cli()._gcp_instance_zone(instance_name='web', project='project')
+    zone, metadata = new_cli()._gcp_instance_zone(instance_name='web', project='project', with_metadata=True)
+    assert (zone, metadata) == ('us-east1-b', INSTANCE['metadata'])
+    assert [c[3] for c in gcloud] == ['list', 'describe']
+
+
+def test_moved_instance_is_looked_up_again(home, gcloud, monkeypatch):
+    new_cli()._gcp_instance_zone(instance_name='web', project='project')
+    check_output = subprocess.check_output
+
+    def describe_fails(command, **kwargs):
+        if command[3] == 'describe':
+            gcloud.append(command[:4])
+            raise subprocess.CalledProcessError(1, command)
+        return check_output(command, **kwargs)
+
+    monkeypatch.setattr(subprocess, 'check_output', describe_fails)
+    zone, _ = new_cli()._gcp_instance_zone(instance_name='web', project='project', with_metadata=True)
+    assert zone == 'us-east1-b'
+    assert [c[3] for c in gcloud] == ['list', 'describe', 'list']
+
+
+def test_no_caching_with_zero_ttl(home, gcloud):
+    (home / '.britive' / 'pybritive.config').write_text(
+        '[global]\ncloud_lookup_ttl_seconds = 0\n\n[tenant-example]\nname = example\n', encoding='utf-8'
+    )
+    for _ in range(2):
+        new_cli()._gcp_instance_zone(instance_name='web', project='project')
+    assert [c[3] for c in gcloud] == ['list', 'list']
+
+
+def test_active_account_is_remembered_until_gcloud_config_changes(home, gcloud, monkeypatch):
+    assert new_cli()._gcloud_active_account() == 'user@example.com'
+    assert new_cli()._gcloud_active_account() == 'user@example.com'
+    assert len(gcloud) == 1
+
+    monkeypatch.setenv('CLOUDSDK_CORE_ACCOUNT', 'other@example.com')
+    new_cli()._gcloud_active_account()
+    assert len(gcloud) == 2
+
+    (home / 'gcloud' / 'configurations').mkdir()
+    (home / 'gcloud' / 'configurations' / 'config_default').write_text('[core]\n', encoding='utf-8')
+    new_cli()._gcloud_active_account()
+    assert len(gcloud) == 3
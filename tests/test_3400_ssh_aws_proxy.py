@@ -0,0 +1,95 @@
+import subprocess
+import sys
+
+import pytest
+
+from pybritive.britive_cli import BritiveCli
+from pybritive.helpers import ssh
+
+COMMAND = 'aws ssm start-session --parameters portNumber=22 --document-name AWS-StartSSHSession --target i-123'
+
+
+def test_parse_aws_hostname():
+    assert ssh.parse_aws_hostname('i-123') == ('i-123', None, None)
+    assert ssh.parse_aws_hostname('i-123.dev.us-west-2') == ('i-123', 'dev', 'us-west-2')
+
+
+def test_proxy_entry_point_loads_neither_cli_nor_sdk(home):
+    code = (
+        'import sys\n'
+        "sys.argv = ['pybritive-ssh-aws-proxy', '--hostname', 'i-123.dev', '--port-number', '22']\n"
+        'from pybritive.helpers import ssh\n'
+        'try:\n'
+        '    ssh.main()\n'
+        'except SystemExit:\n'
+        '    pass\n'
+        "print(sorted(m for m in ('click', 'britive', 'boto3', 'pybritive.britive_cli') if m in sys.modules))\n"
+    )
+    out = subprocess.check_output([sys.executable, '-c', code]).decode('utf-8').splitlines()
+    assert out == [f'{COMMAND} --profile dev', '[]']
+
+
+def test_ssm_proxy_output_is_unchanged(home, capsys):
+    BritiveCli(tenant_name='example').ssh_aws_ssm_proxy(
+        username='ec2-user', hostname='i-123..us-west-2', push_public_key=None, port_number='22', key_source=None
+    )
+    assert capsys.readouterr().out == f'{COMMAND} --region us-west-2\n'
+
+
+def test_openssh_config_output_is_unchanged(home, capsys):
+    BritiveCli(tenant_name='example').ssh_aws_openssh_config(push_public_key=False, key_source=None)
+    assert capsys.readouterr().out.endswith(
+        'Match host i-*,mi-*\n\tProxyCommand eval $(pybritive ssh aws ssm-proxy --hostname %h --username %r '
+        '--port-number %p)\n'
+    )
+
+
+class FakeEc2:
+    def __init__(self):
+        self.describes = 0
+
+    def describe_instances(self, InstanceIds):  # noqa: N803
+        self.describes += 1
+        return {'Reservations': [{'Instances': [{'Placement': {'AvailabilityZone': 'us-west-2a'}}]}]}
+
+
+class FakeEic:
+    def __init__(self, client_error):
+        self.client_error = client_error
+        self.zones = []
+        self.reject = None
+
+    def send_ssh_public_key(self, InstanceId, InstanceOSUser, SSHPublicKey, AvailabilityZone):  # noqa: N803
+        self.zones.append(AvailabilityZone)
+        if AvailabilityZone == self.reject:
+            raise self.client_error({'Error': {'Code': 'InvalidArgsException'}}, 'SendSSHPublicKey')
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    client_error = pytest.importorskip('botocore.exceptions').ClientError
+    clients = {'ec2': FakeEc2(), 'ec2-instance-connect': FakeEic(client_error)}
+    monkeypatch.setattr(ssh, 'aws_client', lambda profile, region, service: clients[service])
+    return clients
+
+
+def push_key(cli):
+    cli._ssh_aws_push_key(
+        aws_profile='dev', aws_region=None, instance_id='i-123', username='ec2-user', key_pair={'public': b'ssh-rsa A'}
+    )
+
+
+def test_availability_zone_is_described_once(home, clients):
+    for _ in range(2):
+        push_key(BritiveCli(tenant_name='example'))
+    assert clients['ec2'].describes == 1
+    assert clients['ec2-instance-connect'].zones == ['us-west-2a', 'us-west-2a']
+
+
+def test_rejected_cached_zone_is_looked_up_again(home, clients):
+    cli = BritiveCli(tenant_name='example')
+    cli.cache.save_lookup('aws-instance-zones', 'dev//i-123', value={'zone': 'us-west-2b'}, ttl=60)
+    clients['ec2-instance-connect'].reject = 'us-west-2b'
+    push_key(cli)
+    assert clients['ec2-instance-connect'].zones == ['us-west-2b', 'us-west-2a']
+    assert cli.cache.get_lookup('aws-instance-zones', 'dev//i-123') == {'zone': 'us-west-2a'}